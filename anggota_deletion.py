@@ -0,0 +1,149 @@
+"""
+Kartu Pintar - Hapus Anggota (cascade, per chunk, background)
+==============================================================
+
+Sebelumnya `anggota_delete` memuat semua Transaksi anggota ke memory
+(hanya untuk list id yang tidak dipakai), lalu DELETE transaksi &
+lokasi_history tanpa batas dalam SATU transaksi. Anggota dengan riwayat
+GPS bertahun-tahun → lock range besar lama → pembayaran lain ikut macet.
+
+Di sini:
+  1. Kartu anggota langsung di-set 'Diblokir' (commit) — pembayaran &
+     scan baru ditolak selama proses berjalan.
+  2. Child rows (transaksi, lokasi_history) dihapus per chunk
+     (`DELETE ... WHERE id IN (<= chunk_size id>)`), commit per chunk,
+     jeda singkat antar chunk supaya transaksi lain dapat giliran lock.
+     Rollup harian dikurangi per chunk di transaksi yang sama.
+  3. Terakhir tracker, jejak lokasi harian, link akun user, foto, dan
+     baris anggota — satu transaksi kecil.
+
+Bisa untuk satu anggota maupun penghapusan massal (angkatan lulus):
+  - POST /anggota/delete/<kartu_id>, POST /anggota/delete-bulk → background job (jobs.py)
+  - python manage.py delete-anggota --kartu-prefix KP-2022- [--nrp-prefix ...] [kartu_id ...]
+"""
+
+import os
+import time
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, Anggota, Transaksi, LokasiHistory, LokasiTrackHarian, FindMyTracker, User
+from rollups import subtract_transaksi
+
+DEFAULT_FOTO_PATH = '/static/img/avatar-default.svg'
+
+
+def resolve_anggota_ids(kartu_ids=(), kartu_prefix=None, nrp_prefix=None):
+    """id anggota dari daftar kartu_id/NRP dan/atau prefix kartu_id / NRP."""
+    conditions = []
+    kartu_ids = [k.strip() for k in kartu_ids if k and k.strip()]
+    if kartu_ids:
+        conditions.append(db.or_(Anggota.kartu_id.in_(kartu_ids), Anggota.nrp.in_(kartu_ids)))
+    if kartu_prefix:
+        conditions.append(Anggota.kartu_id.like(f'{kartu_prefix}%'))
+    if nrp_prefix:
+        conditions.append(Anggota.nrp.like(f'{nrp_prefix}%'))
+    if not conditions:
+        return []
+    return [i for (i,) in db.session.query(Anggota.id).filter(db.or_(*conditions)).order_by(Anggota.id)]
+
+
+def _count_children(anggota_ids):
+    total = 0
+    for model in (Transaksi, LokasiHistory):
+        total += db.session.query(func.count(model.id)).filter(model.anggota_id.in_(anggota_ids)).scalar() or 0
+    return total
+
+
+def _delete_in_chunks(model, anggota_id, chunk_size, pause, on_chunk):
+    """DELETE child rows per chunk id, commit per chunk. Return jumlah baris terhapus."""
+    deleted = 0
+    while True:
+        ids = [i for (i,) in db.session.execute(
+            select(model.id).where(model.anggota_id == anggota_id).order_by(model.id).limit(chunk_size))]
+        if not ids:
+            return deleted
+        if model is Transaksi:
+            subtract_transaksi(Transaksi.id.in_(ids))  # bulk delete melewati listener rollup
+        db.session.execute(model.__table__.delete().where(model.__table__.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        on_chunk(len(ids))
+        if pause:
+            time.sleep(pause)
+
+
+def _remove_foto(foto):
+    try:
+        if foto and foto != DEFAULT_FOTO_PATH and foto.startswith('/static/uploads/'):
+            upload_folder = current_app.config.get('UPLOAD_FOLDER', 'static/uploads')
+            foto_path = os.path.join(upload_folder, foto.rsplit('/', 1)[-1])
+            if os.path.exists(foto_path):
+                os.remove(foto_path)
+    except Exception:
+        pass  # foto cleanup is optional
+
+
+def delete_anggota(anggota_ids, progress=None, chunk_size=None, pause=None):
+    """
+    Hapus anggota beserta transaksi, riwayat lokasi, dan tracker-nya.
+    Return ringkasan {'anggota', 'transaksi_lokasi', 'nama'}.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config.get('DELETE_CHUNK_SIZE', 1000)
+    if pause is None:
+        pause = current_app.config.get('DELETE_CHUNK_PAUSE', 0.05)
+    chunk_size = max(1, chunk_size)
+    anggota_ids = list(anggota_ids)
+
+    # 1. Blokir kartu dulu supaya tidak ada transaksi / scan baru selama penghapusan
+    Anggota.query.filter(Anggota.id.in_(anggota_ids))\
+        .update({'status_kartu': 'Diblokir'}, synchronize_session=False)
+    db.session.commit()
+
+    total = _count_children(anggota_ids) + len(anggota_ids)
+    done = 0
+    summary = {'anggota': 0, 'transaksi_lokasi': 0, 'nama': []}
+
+    def on_chunk(n):
+        nonlocal done
+        done += n
+        if progress:
+            progress(done, total, f"{summary['anggota']}/{len(anggota_ids)} anggota, {done} baris terhapus")
+
+    if progress:
+        progress(0, total, f'Menghapus {len(anggota_ids)} anggota...')
+    try:
+        for anggota_id in anggota_ids:
+            # 2. Child rows per chunk (transaksi pendek)
+            for model in (Transaksi, LokasiHistory):
+                summary['transaksi_lokasi'] += _delete_in_chunks(model, anggota_id, chunk_size, pause, on_chunk)
+
+            # 3. Sisa kecil: tracker, link user, anggota
+            a = db.session.get(Anggota, anggota_id)
+            if not a:
+                continue
+            nama, foto = a.nama, a.foto
+            FindMyTracker.query.filter_by(anggota_id=anggota_id).delete(synchronize_session=False)
+            # lokasi_history & jejak harian tanpa foreign key (tabel dipartisi, lokasi_retention.py)
+            LokasiTrackHarian.query.filter_by(anggota_id=anggota_id).delete(synchronize_session=False)
+            # Lepaskan akun User dari anggota (jangan hapus user-nya, supaya history login tetap)
+            User.query.filter_by(anggota_id=anggota_id).update(
+                {'anggota_id': None, 'token_version': User.token_version + 1}, synchronize_session=False)
+            db.session.delete(a)
+            db.session.commit()
+            _remove_foto(foto)
+
+            summary['anggota'] += 1
+            if len(summary['nama']) < 20:
+                summary['nama'].append(nama)
+            on_chunk(1)
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def delete_anggota_job(progress, anggota_ids):
+    return delete_anggota(anggota_ids, progress=progress)
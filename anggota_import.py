@@ -0,0 +1,413 @@
+"""
+Kartu Pintar - Bulk Import Anggota (CSV / XLSX)
+================================================
+
+Import ribuan anggota sekaligus (angkatan baru, migrasi data satuan).
+
+Kenapa tidak loop `anggota_tambah`:
+  per anggota ada `Anggota.query.count()` + probe `filter_by(kartu_id=...)`
+  sampai ketemu nomor kosong + cek unik NRP/NFC/QR/MiLi → puluhan query
+  per baris.
+
+Di sini (streaming, memory konstan per batch):
+  1. Semua nilai unik yang sudah ada (kartu_id, nrp, nfc_uid, qr_data,
+     mili_id) di-prefetch dengan SATU query ke set di memory.
+  2. Baris dibaca satu-satu (csv.reader / openpyxl read_only),
+     divalidasi terhadap set tsb (termasuk duplikat di dalam file).
+  3. kartu_id `KP-YYYY-NNN` dialokasikan saat validasi dari blok yang
+     di-reserve sekaligus di sequence (id_allocator.reserve_kartu_ids) —
+     satu UPDATE per blok. Nomor yang sudah dipakai (kartu_id / qr_data di
+     DB atau baris sebelumnya) dilewati; kartu_id manual langsung
+     memajukan sequence begitu barisnya diterima.
+  4. Baris valid di-INSERT per batch (executemany → multi-row INSERT)
+     + commit per batch. Baris invalid masuk laporan error per baris.
+
+FORMAT FILE:
+  Baris pertama = header. Wajib: nrp, nama, pangkat.
+  Opsional: kartu_id, satuan, jabatan, jurusan, tempat_lahir, tanggal_lahir,
+  golongan_darah, agama, alamat, no_telepon, nfc_uid, qr_data, mili_id,
+  saldo, korp, suku_bangsa, sumber_ba, tmt_tni, tmt_jabatan, ...
+  (lihat IMPORT_FIELDS). Tanggal: YYYY-MM-DD atau DD/MM/YYYY.
+  CSV boleh pakai pemisah , ; atau TAB (export Excel Indonesia pakai ;).
+  XLSX butuh `openpyxl`.
+
+DIPAKAI OLEH:
+  - POST /anggota/import  → background job (jobs.py)
+  - python manage.py import-anggota <file> [--dry-run] [--report err.csv]
+"""
+
+import csv
+import os
+import re
+from datetime import datetime, date
+
+from flask import current_app
+
+from models import db, Anggota
+from id_allocator import reserve_kartu_ids, bump_kartu_sequence
+
+REQUIRED_FIELDS = ('nrp', 'nama', 'pangkat')
+
+IMPORT_FIELDS = (
+    'kartu_id', 'nrp', 'nama', 'pangkat', 'satuan', 'jabatan', 'jurusan',
+    'tempat_lahir', 'tanggal_lahir', 'golongan_darah', 'agama', 'alamat',
+    'no_telepon', 'nfc_uid', 'qr_data', 'mili_id', 'saldo',
+    'korp', 'suku_bangsa', 'sumber_ba', 'tmt_tni', 'tmt_jabatan',
+    'status_pernikahan', 'nama_pasangan', 'jml_anak', 'alamat_tinggal',
+    'nama_ayah', 'nama_ibu', 'alamat_orang_tua',
+)
+DATE_FIELDS = ('tanggal_lahir', 'tmt_tni', 'tmt_jabatan')
+INT_FIELDS = ('saldo', 'jml_anak')
+UNIQUE_FIELDS = ('kartu_id', 'nrp', 'nfc_uid', 'qr_data', 'mili_id')
+
+# Header alternatif yang sering muncul di file satuan
+HEADER_ALIASES = {
+    'no_hp': 'no_telepon',
+    'telepon': 'no_telepon',
+    'tgl_lahir': 'tanggal_lahir',
+    'gol_darah': 'golongan_darah',
+    'goldar': 'golongan_darah',
+    'nfc': 'nfc_uid',
+    'qr': 'qr_data',
+    'mili': 'mili_id',
+    'id_kartu': 'kartu_id',
+}
+
+GOLONGAN_DARAH = ('A', 'B', 'AB', 'O')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y')
+MAX_ERROR_DETAIL = 500  # baris error yang disimpan di hasil job (laporan CLI tetap lengkap)
+
+class ImportFileError(ValueError):
+    """File tidak bisa dibaca (format / header salah)."""
+
+
+# ============================================================
+# READER
+# ============================================================
+
+def _normalize_header(h):
+    key = re.sub(r'[\s\-/]+', '_', str(h or '').strip().lower())
+    return HEADER_ALIASES.get(key, key)
+
+
+def _check_header(header):
+    missing = [f for f in REQUIRED_FIELDS if f not in header]
+    if missing:
+        raise ImportFileError(f"Kolom wajib tidak ada: {', '.join(missing)}")
+
+
+def _iter_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = [_normalize_header(h) for h in next(reader, [])]
+        _check_header(header)
+        for line_no, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values):
+                continue
+            yield line_no, dict(zip(header, values))
+
+
+def _iter_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("Import XLSX butuh paket 'openpyxl' (pip install openpyxl), atau simpan sebagai CSV.")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [_normalize_header(h) for h in next(rows, ())]
+        _check_header(header)
+        for line_no, values in enumerate(rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield line_no, dict(zip(header, values))
+    finally:
+        wb.close()
+
+
+def iter_rows(path, filename=None):
+    """Yield (nomor_baris, dict kolom→nilai mentah) dari file CSV/XLSX."""
+    ext = os.path.splitext(filename or path)[1].lower()
+    if ext in ('.xlsx', '.xlsm'):
+        return _iter_xlsx(path)
+    if ext in ('.csv', '.txt'):
+        return _iter_csv(path)
+    raise ImportFileError(f"Format file tidak didukung: {ext or '(tanpa ekstensi)'} — pakai .csv atau .xlsx")
+
+
+def estimate_rows(path, filename=None):
+    """Perkiraan jumlah baris data (untuk progress). Murah: tidak parse isi."""
+    ext = os.path.splitext(filename or path)[1].lower()
+    try:
+        if ext in ('.xlsx', '.xlsm'):
+            from openpyxl import load_workbook
+            wb = load_workbook(path, read_only=True)
+            try:
+                return max(0, (wb.active.max_row or 1) - 1)
+            finally:
+                wb.close()
+        with open(path, 'rb') as f:
+            return max(0, sum(1 for _ in f) - 1)
+    except Exception:
+        return 0
+
+
+# ============================================================
+# VALIDASI
+# ============================================================
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # NRP/no HP dari Excel sering terbaca float
+    return str(value).strip()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError
+
+
+def _column_lengths():
+    return {
+        f: getattr(Anggota.__table__.c[f].type, 'length', None)
+        for f in IMPORT_FIELDS
+    }
+
+
+def validate_row(raw, lengths):
+    """Return (values, errors). values hanya berisi kolom yang terisi."""
+    from app import extract_mili_id  # helper yang sama dengan form tambah/edit
+
+    values = {}
+    errors = []
+    for field in IMPORT_FIELDS:
+        raw_value = raw.get(field)
+        if field in DATE_FIELDS and isinstance(raw_value, (date, datetime)):
+            values[field] = _parse_date(raw_value)
+            continue
+        text = _text(raw_value)
+        if not text:
+            if field in REQUIRED_FIELDS:
+                errors.append(f'{field} wajib diisi')
+            continue
+
+        if field in DATE_FIELDS:
+            try:
+                values[field] = _parse_date(text)
+            except ValueError:
+                errors.append(f'{field} bukan tanggal valid: {text}')
+            continue
+        if field in INT_FIELDS:
+            if field == 'saldo':
+                # "Rp 1.500.000" / "1,500,000" → 1500000
+                text = re.sub(r'^rp\.?|[\s.,]', '', text, flags=re.IGNORECASE)
+            try:
+                values[field] = int(text)
+            except ValueError:
+                errors.append(f'{field} harus angka: {text}')
+                continue
+            if values[field] < 0:
+                errors.append(f'{field} tidak boleh negatif')
+            continue
+
+        if field == 'golongan_darah':
+            text = text.upper()
+            if text not in GOLONGAN_DARAH:
+                errors.append(f'golongan_darah harus salah satu dari {"/".join(GOLONGAN_DARAH)}')
+                continue
+        elif field == 'mili_id':
+            text = extract_mili_id(text)
+        elif field == 'kartu_id':
+            text = text.upper()
+
+        max_len = lengths.get(field)
+        if max_len and len(text) > max_len:
+            errors.append(f'{field} maksimal {max_len} karakter')
+            continue
+        values[field] = text
+    return values, errors
+
+
+# ============================================================
+# IMPORT
+# ============================================================
+
+class _Uniques:
+    """Set nilai unik yang sudah dipakai (DB + baris sebelumnya di file). Case-insensitive."""
+
+    def __init__(self):
+        self.sets = {f: set() for f in UNIQUE_FIELDS}
+        for row in db.session.query(*[getattr(Anggota, f) for f in UNIQUE_FIELDS]):
+            for field, value in zip(UNIQUE_FIELDS, row):
+                if value:
+                    self.sets[field].add(value.lower())
+
+    def conflicts(self, values):
+        return [f for f in UNIQUE_FIELDS if values.get(f) and values[f].lower() in self.sets[f]]
+
+    def add(self, values):
+        for f in UNIQUE_FIELDS:
+            if values.get(f):
+                self.sets[f].add(values[f].lower())
+
+
+class _KartuIdPool:
+    """
+    kartu_id dari blok reserve sequence. Nomor yang sudah ada di set unik
+    (kartu_id, atau qr_data kalau qr_data-nya akan default = kartu_id)
+    dilewati — blok bisa berisi nomor yang diketik manual di file.
+    """
+
+    def __init__(self, uniques):
+        self.uniques = uniques
+        self.pool = []
+
+    def take(self, need_qr, block_size):
+        while True:
+            if not self.pool:
+                self.pool = reserve_kartu_ids(max(1, block_size))[::-1]
+            kartu_id = self.pool.pop()
+            key = kartu_id.lower()
+            if key in self.uniques.sets['kartu_id'] or (need_qr and key in self.uniques.sets['qr_data']):
+                continue
+            return kartu_id
+
+
+def _insert_batch(batch):
+    """INSERT satu batch (kartu_id sudah terisi semua). Return list kartu_id."""
+    now = datetime.now()
+    default_satuan = Anggota.__table__.c.satuan.default.arg
+    default_foto = Anggota.__table__.c.foto.default.arg
+    rows = []
+    for values in batch:
+        row = {f: values.get(f) for f in IMPORT_FIELDS}
+        row['satuan'] = row['satuan'] or default_satuan
+        row['saldo'] = row['saldo'] or 0
+        row['jml_anak'] = row['jml_anak'] or 0
+        row.update({
+            'foto': default_foto,
+            'hutang': 0,
+            'status_kartu': 'Aktif',
+            'created_at': now,
+            'updated_at': now,
+        })
+        rows.append(row)
+    db.session.execute(db.insert(Anggota), rows)
+    db.session.commit()
+    return [values['kartu_id'] for values in batch]
+
+
+def import_anggota(path, filename=None, dry_run=False, batch_size=None, progress=None, on_error=None):
+    """
+    Import anggota dari file CSV/XLSX.
+
+    - dry_run: validasi saja, tidak ada yang ditulis.
+    - on_error(dict): dipanggil untuk SETIAP baris invalid (mis. tulis laporan CSV).
+    Return ringkasan (errors dipotong ke MAX_ERROR_DETAIL baris pertama).
+    """
+    if batch_size is None:
+        batch_size = current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    batch_size = max(1, batch_size)
+
+    rows = iter_rows(path, filename)
+    total_estimate = estimate_rows(path, filename)
+    lengths = _column_lengths()
+    uniques = _Uniques()
+    kartu_ids = _KartuIdPool(uniques)
+
+    summary = {
+        'total': 0, 'imported': 0, 'invalid': 0, 'dry_run': dry_run,
+        'kartu_id_first': None, 'kartu_id_last': None,
+        'errors': [], 'errors_truncated': False,
+    }
+    batch = []
+
+    def reject(line_no, nrp, errors):
+        summary['invalid'] += 1
+        error = {'baris': line_no, 'nrp': nrp, 'errors': errors}
+        if len(summary['errors']) < MAX_ERROR_DETAIL:
+            summary['errors'].append(error)
+        else:
+            summary['errors_truncated'] = True
+        if on_error:
+            on_error(error)
+
+    def flush():
+        if batch and not dry_run:
+            inserted = _insert_batch(batch)
+            summary['kartu_id_first'] = summary['kartu_id_first'] or inserted[0]
+            summary['kartu_id_last'] = inserted[-1]
+        summary['imported'] += len(batch)
+        batch.clear()
+        if progress:
+            progress(summary['total'], max(total_estimate, summary['total']),
+                     f"{summary['total']} baris diproses, {summary['invalid']} invalid")
+
+    try:
+        for line_no, raw in rows:
+            summary['total'] += 1
+            values, errors = validate_row(raw, lengths)
+            if not errors:
+                errors = [f'{f} sudah terdaftar: {values[f]}' for f in uniques.conflicts(values)]
+            if errors:
+                reject(line_no, values.get('nrp') or _text(raw.get('nrp')), errors)
+                continue
+
+            if values.get('kartu_id') and not values.get('qr_data'):
+                if values['kartu_id'].lower() in uniques.sets['qr_data']:
+                    reject(line_no, values['nrp'],
+                           [f"kartu_id {values['kartu_id']} sudah dipakai sebagai qr_data anggota lain"])
+                    continue
+                values['qr_data'] = values['kartu_id']
+            if not dry_run:
+                if values.get('kartu_id'):
+                    bump_kartu_sequence(values['kartu_id'])
+                else:
+                    # Blok secukupnya sisa baris (perkiraan), maks satu batch
+                    block = min(batch_size, total_estimate - summary['total'] + 1)
+                    values['kartu_id'] = kartu_ids.take(not values.get('qr_data'), block)
+                    values['qr_data'] = values.get('qr_data') or values['kartu_id']
+            uniques.add(values)
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def write_error_report(errors, fp):
+    """Tulis laporan error per baris ke file CSV (fp = file object teks)."""
+    writer = csv.writer(fp)
+    writer.writerow(['baris', 'nrp', 'error'])
+    for e in errors:
+        writer.writerow([e['baris'], e['nrp'], '; '.join(e['errors'])])
+
+
+def import_anggota_job(progress, path, filename, dry_run=False):
+    """Wrapper background job: hapus file upload sementara setelah selesai."""
+    try:
+        return import_anggota(path, filename=filename, dry_run=dry_run, progress=progress)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -10,9 +10,25 @@ from datetime import datetime, timedelta
 import os
 import uuid
 import jwt as pyjwt
+from sqlalchemy.orm import joinedload
 
-from config import config_map
+from config import config_map, pool_budget
 from models import db, User, Anggota, Transaksi, LokasiHistory, MenuKantin, FindMyTracker
+from live_events import publish_lokasi, event_stream, parse_cursor
+from jobs import start_job, get_job
+from provisioning import bulk_create_users
+from id_allocator import next_kartu_id, next_trx_id, bump_kartu_sequence
+from exports import export_chunks, ExportFilterError
+from rollups import laporan_harian, laporan_operator, laporan_hutang, total_transaksi as rollup_total_transaksi
+from anggota_import import import_anggota_job, IMPORT_FIELDS, REQUIRED_FIELDS
+from anggota_deletion import delete_anggota_job, resolve_anggota_ids
+from identity import current_identity
+from jwt_auth import decode_token, check_revocation
+from throttle import check as throttle_check, fail as throttle_fail, stats as throttle_stats
+import profiling
+import metrics
+import db_pool
+from findmy_ext import FindMy
 from totp_utils import (
     generate_secret as totp_generate_secret,
     verify_totp,
@@ -29,12 +45,21 @@ def create_app(config_name=None):
         config_name = os.environ.get('FLASK_ENV', 'development')
     app = Flask(__name__)
     app.config.from_object(config_map.get(config_name, config_map['default']))
+    if app.config.get('TRUST_PROXY_HOPS'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['TRUST_PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
     os.makedirs(app.config.get('UPLOAD_FOLDER', 'static/uploads'), exist_ok=True)
+    db_pool.configure_pool(app)
     db.init_app(app)
+    db_pool.init_pool_monitoring(app)
+    profiling.init_profiling(app)
+    metrics.init_metrics(app)
     register_filters(app)
     register_context_processors(app)
     register_routes(app)
     register_api_routes(app)
+    FindMy(app)  # setelah route app.py: safe_route melewati endpoint yang sudah ada
     register_error_handlers(app)
     return app
 
@@ -66,19 +91,18 @@ def register_context_processors(app):
 
     @app.context_processor
     def inject_current_user_foto():
-        """Expose current logged-in user's foto (via their anggota) to all templates.
+        """Expose current logged-in user (identity snapshot, see identity.py) and
+        their foto (via their anggota) to all templates.
         Used by base.html sidebar footer avatar.
         """
         foto = None
         try:
-            uid = session.get('user_id')
-            if uid:
-                u = User.query.get(uid)
-                if u and u.anggota and u.anggota.foto and u.anggota.foto != DEFAULT_FOTO_PATH:
-                    foto = u.anggota.foto
+            identity = current_identity()
         except Exception:
-            foto = None
-        return {'current_user_foto': foto}
+            identity = None
+        if identity and identity.foto and identity.foto != DEFAULT_FOTO_PATH:
+            foto = identity.foto
+        return {'current_user': identity, 'current_user_foto': foto}
 
 
 # ============================================================
@@ -159,12 +183,29 @@ def generate_jwt_token(user):
         'role': user.role,
         'nama': user.nama,
         'anggota_id': user.anggota_id,
+        'tv': user.token_version or 0,
         'exp': datetime.utcnow() + timedelta(days=7),
         'iat': datetime.utcnow(),
     }
     return pyjwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
 
 
+def _authenticate_jwt(token):
+    """Verifikasi bearer token (cache, lihat jwt_auth.py) → (payload, error_response)."""
+    try:
+        payload = decode_token(token)
+    except pyjwt.ExpiredSignatureError:
+        return None, (jsonify({'success': False, 'message': 'Token expired'}), 401)
+    except pyjwt.InvalidTokenError:
+        return None, (jsonify({'success': False, 'message': 'Token invalid'}), 401)
+    if payload.get('purpose') or 'user_id' not in payload:
+        # Token 2FA (totp_pending / totp_setup) bukan token login penuh
+        return None, (jsonify({'success': False, 'message': 'Token invalid'}), 401)
+    if not check_revocation(payload):
+        return None, (jsonify({'success': False, 'message': 'Token dicabut, silakan login ulang'}), 401)
+    return payload, None
+
+
 def jwt_required(f):
     """Decorator for JWT-protected API endpoints (mobile)"""
     @wraps(f)
@@ -179,19 +220,17 @@ def jwt_required(f):
             if 'user_id' in session:
                 request.current_user_id = session['user_id']
                 request.current_role = session.get('role')
+                identity = current_identity()
+                request.current_anggota_id = identity.anggota_id if identity else None
                 return f(*args, **kwargs)
             return jsonify({'success': False, 'message': 'Token required'}), 401
 
-        try:
-            from flask import current_app
-            payload = pyjwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            request.current_user_id = payload['user_id']
-            request.current_role = payload.get('role')
-        except pyjwt.ExpiredSignatureError:
-            return jsonify({'success': False, 'message': 'Token expired'}), 401
-        except pyjwt.InvalidTokenError:
-            return jsonify({'success': False, 'message': 'Token invalid'}), 401
-
+        payload, err = _authenticate_jwt(token)
+        if err:
+            return err
+        request.current_user_id = payload['user_id']
+        request.current_role = payload.get('role')
+        request.current_anggota_id = payload.get('anggota_id')
         return f(*args, **kwargs)
     return decorated
 
@@ -212,24 +251,21 @@ def jwt_admin_required(f):
                 return f(*args, **kwargs)
             return jsonify({'success': False, 'message': 'Admin token required'}), 401
 
-        try:
-            from flask import current_app
-            payload = pyjwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            if payload.get('role') != 'admin':
-                return jsonify({'success': False, 'message': 'Admin access required'}), 403
-            request.current_user_id = payload['user_id']
-            request.current_role = 'admin'
-        except pyjwt.ExpiredSignatureError:
-            return jsonify({'success': False, 'message': 'Token expired'}), 401
-        except pyjwt.InvalidTokenError:
-            return jsonify({'success': False, 'message': 'Token invalid'}), 401
-
+        payload, err = _authenticate_jwt(token)
+        if err:
+            return err
+        if payload.get('role') != 'admin':
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        request.current_user_id = payload['user_id']
+        request.current_role = 'admin'
+        request.current_anggota_id = payload.get('anggota_id')
         return f(*args, **kwargs)
     return decorated
 
 
 def generate_trx_id():
-    return f"TRX-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
+    """TRX-YYYYMMDD-NNNNNN dari sequence harian (id_allocator.py) — tidak bisa bentrok."""
+    return next_trx_id()
 
 
 def extract_mili_id(raw_data):
@@ -352,6 +388,18 @@ def trx_to_dict(t):
     }
 
 
+def _export_response(kind, fmt, filters):
+    """Response streaming untuk exports.py (generator jalan di dalam request context)."""
+    from flask import Response, stream_with_context
+    try:
+        chunks, mimetype, filename = export_chunks(kind, fmt, filters)
+    except ExportFilterError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}',
+                             'X-Accel-Buffering': 'no'})
+
+
 # ============================================================
 # WEB ROUTES
 # ============================================================
@@ -371,6 +419,10 @@ def register_routes(app):
         if request.method == 'POST':
             username = request.form.get('username', '').strip()
             password = request.form.get('password', '')
+            retry = throttle_check('login', username=username, ip=request.remote_addr)
+            if retry:
+                flash(f'Terlalu banyak percobaan login. Coba lagi dalam {retry} detik.', 'danger')
+                return render_template('auth/login.html'), 429
             user = User.query.filter_by(username=username).first()
             if user and user.check_password(password):
                 if not user.is_active:
@@ -384,6 +436,7 @@ def register_routes(app):
                     return redirect(url_for('totp_verify'))
                 return redirect(url_for('totp_setup'))
             else:
+                throttle_fail('login', username=username, ip=request.remote_addr)
                 flash('Username atau password salah.', 'danger')
         return render_template('auth/login.html')
 
@@ -475,6 +528,10 @@ def register_routes(app):
             return redirect(url_for('totp_setup'))
 
         if request.method == 'POST':
+            retry = throttle_check('totp', user_id=user.id, ip=request.remote_addr)
+            if retry:
+                flash(f'Terlalu banyak percobaan. Coba lagi dalam {retry} detik.', 'danger')
+                return render_template('auth/totp_verify.html', user=user), 429
             code = request.form.get('code', '').strip()
             use_backup = request.form.get('use_backup') == '1'
             ok = False
@@ -487,6 +544,7 @@ def register_routes(app):
             else:
                 ok = verify_totp(user.totp_secret, code)
             if not ok:
+                throttle_fail('totp', user_id=user.id, ip=request.remote_addr)
                 flash('Kode tidak valid.', 'danger')
                 return render_template('auth/totp_verify.html', user=user)
             _finalize_login(user)
@@ -528,14 +586,18 @@ def register_routes(app):
         kartu_aktif = Anggota.query.filter_by(status_kartu='Aktif').count()
         kartu_hilang = Anggota.query.filter_by(status_kartu='Hilang').count()
         total_saldo = db.session.query(db.func.coalesce(db.func.sum(Anggota.saldo), 0)).scalar()
-        total_transaksi = Transaksi.query.count()
+        total_transaksi = rollup_total_transaksi()
         transaksi_terbaru = Transaksi.query.order_by(Transaksi.created_at.desc()).limit(5).all()
         anggota_raw = Anggota.query.limit(5).all()
+        today = datetime.now().date()
+        penjualan_7_hari = laporan_harian(today - timedelta(days=6), today)
 
         return render_template('dashboard.html',
             total_anggota=total_anggota, kartu_aktif=kartu_aktif,
             kartu_hilang=kartu_hilang, total_saldo=total_saldo,
             total_transaksi=total_transaksi,
+            penjualan_7_hari=penjualan_7_hari,
+            penjualan_max=max([d['pendapatan_kantin'] for d in penjualan_7_hari] + [1]),
             transaksi_terbaru=[trx_to_dict(t) for t in transaksi_terbaru],
             anggota_data=[anggota_to_dict(a) for a in anggota_raw],
         )
@@ -559,7 +621,8 @@ def register_routes(app):
             query = query.filter_by(status_kartu=status)
         all_anggota = query.order_by(Anggota.nama).all()
         return render_template('anggota_list.html',
-            anggota_data=[anggota_to_dict(a, include_lokasi=False) for a in all_anggota])
+            anggota_data=[anggota_to_dict(a, include_lokasi=False) for a in all_anggota],
+            job_id=request.args.get('job', ''))
 
     @app.route('/anggota/<anggota_id>')
     @pam_or_admin_required
@@ -587,12 +650,7 @@ def register_routes(app):
                     flash('NRP sudah terdaftar!', 'danger')
                     return render_template('admin/anggota_form.html', mode='tambah')
 
-                count = Anggota.query.count() + 1
-                year = datetime.now().strftime('%Y')
-                kartu_id = f"KP-{year}-{count:03d}"
-                while Anggota.query.filter_by(kartu_id=kartu_id).first():
-                    count += 1
-                    kartu_id = f"KP-{year}-{count:03d}"
+                kartu_id = next_kartu_id()
 
                 mili_raw = request.form.get('mili_id', '').strip()
                 qr_input = request.form.get('qr_data', '').strip()
@@ -706,6 +764,42 @@ def register_routes(app):
                 flash(f'Gagal: {str(e)}', 'danger')
         return render_template('admin/anggota_form.html', mode='tambah')
 
+    @app.route('/anggota/import', methods=['GET', 'POST'])
+    @admin_required
+    def anggota_import():
+        """Bulk import anggota dari CSV/XLSX (background job, laporan error per baris)"""
+        if request.method == 'POST':
+            import tempfile
+            request.max_content_length = app.config.get('IMPORT_MAX_CONTENT_LENGTH')
+            f = request.files.get('file')
+            if not f or not f.filename:
+                flash('Pilih file CSV / XLSX dulu.', 'danger')
+                return redirect(url_for('anggota_import'))
+            ext = os.path.splitext(f.filename)[1].lower()
+            if ext not in ('.csv', '.txt', '.xlsx', '.xlsm'):
+                flash('Format file harus .csv atau .xlsx', 'danger')
+                return redirect(url_for('anggota_import'))
+
+            # Simpan ke file sementara — job berjalan setelah request selesai
+            fd, path = tempfile.mkstemp(prefix='import_anggota_', suffix=ext)
+            with os.fdopen(fd, 'wb') as out:
+                f.save(out)
+            job = start_job(app, 'import_anggota', import_anggota_job, path, f.filename,
+                            dry_run=request.form.get('dry_run') == '1',
+                            user_id=session.get('user_id'))
+            return redirect(url_for('anggota_import', job=job['job_id']))
+        return render_template('admin/anggota_import.html',
+            job_id=request.args.get('job', ''),
+            import_fields=IMPORT_FIELDS, required_fields=REQUIRED_FIELDS)
+
+    @app.route('/anggota/import/template.csv')
+    @admin_required
+    def anggota_import_template():
+        """Contoh file CSV (header saja) untuk import anggota"""
+        from flask import Response
+        return Response(','.join(IMPORT_FIELDS) + '\n', mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=template_import_anggota.csv'})
+
     @app.route('/anggota/edit/<anggota_id>', methods=['GET', 'POST'])
     @admin_required
     def anggota_edit(anggota_id):
@@ -749,6 +843,7 @@ def register_routes(app):
                         return redirect(url_for('anggota_edit', anggota_id=anggota_id))
                     a.kartu_id = new_kartu_id
                     kartu_id_changed = True
+                    bump_kartu_sequence(new_kartu_id)
 
                 a.pangkat = request.form.get('pangkat', a.pangkat).strip()
                 a.satuan = request.form.get('satuan', a.satuan).strip()
@@ -883,35 +978,25 @@ def register_routes(app):
         if not a:
             flash('Data anggota tidak ditemukan.', 'danger')
             return redirect(url_for('anggota_list'))
-        try:
-            nama = a.nama  # save before delete
-            # 1. Hapus Transaksi milik anggota
-            trx_ids = [t.id for t in Transaksi.query.filter_by(anggota_id=a.id).all()]
-            if trx_ids:
-                Transaksi.query.filter_by(anggota_id=a.id).delete(synchronize_session=False)
-            # 2. Hapus LokasiHistory
-            LokasiHistory.query.filter_by(anggota_id=a.id).delete(synchronize_session=False)
-            # 3. Hapus FindMyTracker terkait
-            FindMyTracker.query.filter_by(anggota_id=a.id).delete(synchronize_session=False)
-            # 4. Lepaskan akun User dari anggota (jangan hapus user-nya, supaya history login tetap)
-            User.query.filter_by(anggota_id=a.id).update({'anggota_id': None}, synchronize_session=False)
-            # 5. Hapus foto file jika bukan default
-            try:
-                if a.foto and a.foto != DEFAULT_FOTO_PATH and a.foto.startswith('/static/uploads/'):
-                    upload_folder = app.config.get('UPLOAD_FOLDER', 'static/uploads')
-                    foto_path = os.path.join(upload_folder, a.foto.rsplit('/', 1)[-1])
-                    if os.path.exists(foto_path):
-                        os.remove(foto_path)
-            except Exception:
-                pass  # foto cleanup is optional
-            # 6. Akhirnya hapus anggota
-            db.session.delete(a)
-            db.session.commit()
-            flash(f'Anggota {nama} berhasil dihapus.', 'success')
-        except Exception as e:
-            db.session.rollback()
-            flash(f'Gagal menghapus anggota: {str(e)}', 'danger')
-        return redirect(url_for('anggota_list'))
+        # Transaksi & riwayat lokasi dihapus per chunk di background (lihat anggota_deletion.py)
+        job = start_job(app, 'hapus_anggota', delete_anggota_job, [a.id], user_id=session.get('user_id'))
+        flash(f'Anggota {a.nama} sedang dihapus di background — kartu sudah diblokir.', 'info')
+        return redirect(url_for('anggota_list', job=job['job_id']))
+
+    @app.route('/anggota/delete-bulk', methods=['POST'])
+    @admin_required
+    def anggota_delete_bulk():
+        """Hapus banyak anggota sekaligus (mis. angkatan lulus): daftar kartu_id/NRP dan/atau prefix."""
+        daftar = request.form.get('daftar', '').replace(',', '\n').splitlines()
+        kartu_prefix = request.form.get('kartu_prefix', '').strip()
+        nrp_prefix = request.form.get('nrp_prefix', '').strip()
+        anggota_ids = resolve_anggota_ids(daftar, kartu_prefix or None, nrp_prefix or None)
+        if not anggota_ids:
+            flash('Tidak ada anggota yang cocok dengan daftar / prefix.', 'warning')
+            return redirect(url_for('anggota_list'))
+        job = start_job(app, 'hapus_anggota', delete_anggota_job, anggota_ids, user_id=session.get('user_id'))
+        flash(f'{len(anggota_ids)} anggota sedang dihapus di background — kartu sudah diblokir.', 'info')
+        return redirect(url_for('anggota_list', job=job['job_id']))
 
     @app.route('/anggota/<anggota_id>/buat-user', methods=['POST'])
     @admin_required
@@ -965,7 +1050,8 @@ def register_routes(app):
         ).order_by(Anggota.nama).all()
         return render_template('admin/user_list.html',
             users=users, search=search,
-            anggota_tanpa_user=anggota_tanpa_user)
+            anggota_tanpa_user=anggota_tanpa_user,
+            job_id=request.args.get('job', ''))
 
     @app.route('/users/tambah', methods=['GET', 'POST'])
     @admin_required
@@ -1084,24 +1170,10 @@ def register_routes(app):
     @app.route('/users/bulk-create', methods=['POST'])
     @admin_required
     def user_bulk_create():
-        """Bulk create user untuk semua anggota yang belum punya akun"""
-        anggota_tanpa_user = Anggota.query.filter(
-            ~Anggota.id.in_(db.session.query(User.anggota_id).filter(User.anggota_id.isnot(None)))
-        ).all()
-        created = 0
-        skipped = 0
-        for a in anggota_tanpa_user:
-            username = a.nrp.lower()
-            if User.query.filter_by(username=username).first():
-                skipped += 1
-                continue
-            u = User(username=username, nama=a.nama, role='user', is_active=True, anggota_id=a.id)
-            u.set_password(a.nrp)
-            db.session.add(u)
-            created += 1
-        db.session.commit()
-        flash(f'Bulk create selesai: {created} akun dibuat, {skipped} dilewati (username sudah ada).', 'success')
-        return redirect(url_for('user_list'))
+        """Bulk create user untuk semua anggota yang belum punya akun (background job)"""
+        job = start_job(app, 'bulk_create_user', bulk_create_users, user_id=session.get('user_id'))
+        flash('Bulk create berjalan di background — progress tampil di halaman ini.', 'info')
+        return redirect(url_for('user_list', job=job['job_id']))
 
 
 
@@ -1132,6 +1204,7 @@ def register_routes(app):
             sumber='QR' if card_id == a.qr_data else 'NFC',
             scanned_by_user_id=session.get('user_id'),
         ))
+        publish_lokasi(a, sumber='QR' if card_id == a.qr_data else 'NFC')
         db.session.commit()
 
         role = session.get('role')
@@ -1381,6 +1454,13 @@ def register_routes(app):
             anggota=anggota_to_dict(a),
             history=[h.to_dict() for h in history])
 
+    @app.route('/riwayat-lokasi/export')
+    @pam_or_admin_required
+    def riwayat_lokasi_export():
+        """Export lokasi_history (streaming). Filter: start, end, sumber, anggota (kartu_id/NRP)"""
+        filters = {k: request.args.get(k, '').strip() for k in ('start', 'end', 'sumber', 'anggota')}
+        return _export_response('lokasi', request.args.get('format', 'csv'), filters)
+
     # --- CETAK STIKER KARTU — Admin & Pam ---
 
     @app.route('/cetak-kartu')
@@ -1465,6 +1545,8 @@ def register_routes(app):
         )
         db.session.add(tracker)
         db.session.commit()
+        # Tracker baru biasanya baru didaftarkan di akun Google → device list semua proses basi
+        app.extensions['findmy'].invalidate_device_cache()
 
         flash(f'Tracker berhasil ditambahkan untuk {anggota.nama}!', 'success')
         return redirect(url_for('findmy_tracker_list'))
@@ -1497,6 +1579,7 @@ def register_routes(app):
         tracker.nama_tracker = nama_tracker
         tracker.is_active = is_active
         db.session.commit()
+        app.extensions['findmy'].invalidate_device_cache()
 
         flash('Tracker berhasil diperbarui!', 'success')
         return redirect(url_for('findmy_tracker_list'))
@@ -1565,6 +1648,7 @@ def register_routes(app):
                 sumber='FindMy',
                 scanned_by_user_id=session.get('user_id'),
             ))
+            publish_lokasi(tracker.anggota, sumber='FindMy')
 
         db.session.commit()
 
@@ -1583,14 +1667,12 @@ def register_routes(app):
         jenis_filter = request.args.get('jenis', '').strip()
 
         if role == 'user':
-            user = User.query.get(session['user_id'])
-            if user and user.anggota_id:
-                anggota = Anggota.query.get(user.anggota_id)
-                if anggota:
-                    all_trx = Transaksi.query.filter_by(anggota_id=anggota.id).order_by(Transaksi.created_at.desc()).all()
-                    return render_template('transaksi.html',
-                        transaksi_data=[trx_to_dict(t) for t in all_trx],
-                        page_title='Riwayat Transaksi Saya')
+            identity = current_identity()
+            if identity and identity.anggota:
+                all_trx = Transaksi.query.filter_by(anggota_id=identity.anggota_id).order_by(Transaksi.created_at.desc()).all()
+                return render_template('transaksi.html',
+                    transaksi_data=[trx_to_dict(t) for t in all_trx],
+                    page_title='Riwayat Transaksi Saya')
             return render_template('transaksi.html', transaksi_data=[], page_title='Riwayat Transaksi Saya')
         elif role == 'operator_kantin':
             all_trx = Transaksi.query.filter_by(jenis='Pembelian').order_by(Transaksi.created_at.desc()).all()
@@ -1611,15 +1693,29 @@ def register_routes(app):
                 transaksi_data=[trx_to_dict(t) for t in all_trx],
                 page_title=title)
 
+    @app.route('/transaksi/export')
+    @kantin_or_admin_required
+    def transaksi_export():
+        """
+        Export transaksi (streaming CSV/XLSX). Filter: start, end (YYYY-MM-DD),
+        jenis, status, metode, operator_id, anggota (kartu_id/NRP).
+        Operator kantin hanya bisa export Pembelian (sama seperti halaman /transaksi).
+        """
+        keys = ('start', 'end', 'jenis', 'status', 'metode', 'operator_id', 'anggota')
+        filters = {k: request.args.get(k, '').strip() for k in keys}
+        if session.get('role') == 'operator_kantin':
+            filters['jenis'] = 'Pembelian'
+        return _export_response('transaksi', request.args.get('format', 'csv'), filters)
+
     # --- PROFILE (User) ---
 
     @app.route('/profile')
     @login_required
     def profile():
-        user = User.query.get(session['user_id'])
+        user = current_identity()
         anggota = None
-        if user and user.anggota_id:
-            anggota_obj = Anggota.query.get(user.anggota_id)
+        if user and user.anggota:
+            anggota_obj = db.session.get(Anggota, user.anggota_id)  # data lengkap + saldo terkini
             if anggota_obj:
                 anggota = anggota_to_dict(anggota_obj)
         return render_template('profile.html', user=user, anggota=anggota)
@@ -1631,11 +1727,21 @@ def register_routes(app):
 
 def register_api_routes(app):
 
+    def _throttled_response(retry):
+        """429 untuk percobaan login / 2FA yang melewati batas (throttle.py)."""
+        resp = jsonify({'success': False, 'message': f'Terlalu banyak percobaan. Coba lagi dalam {retry} detik.',
+                        'retry_after': retry})
+        resp.headers['Retry-After'] = str(retry)
+        return resp, 429
+
     @app.route('/api/auth/login', methods=['POST'])
     def api_login():
         data = request.get_json()
         if not data:
             return jsonify({'success': False, 'message': 'Request body required'}), 400
+        retry = throttle_check('login', username=data.get('username', ''), ip=request.remote_addr)
+        if retry:
+            return _throttled_response(retry)
         user = User.query.filter_by(username=data.get('username', '').strip()).first()
         if user and user.check_password(data.get('password', '')):
             if not user.is_active:
@@ -1659,6 +1765,7 @@ def register_api_routes(app):
                 'username': user.username,
                 'nama': user.nama,
             })
+        throttle_fail('login', username=data.get('username', ''), ip=request.remote_addr)
         return jsonify({'success': False, 'message': 'Username atau password salah'}), 401
 
     def _decode_pending_token():
@@ -1736,6 +1843,9 @@ def register_api_routes(app):
             return jsonify({'success': False, 'message': 'Token tidak valid'}), 401
 
         purpose = payload.get('purpose')
+        retry = throttle_check('totp', user_id=payload.get('user_id'), ip=request.remote_addr)
+        if retry:
+            return _throttled_response(retry)
         user = User.query.get(payload.get('user_id'))
         if not user or not user.is_active:
             return jsonify({'success': False, 'message': 'User tidak ditemukan'}), 404
@@ -1746,6 +1856,7 @@ def register_api_routes(app):
         if purpose == 'totp_setup':
             secret = payload.get('secret')
             if not secret or not verify_totp(secret, code):
+                throttle_fail('totp', user_id=user.id, ip=request.remote_addr)
                 return jsonify({'success': False, 'message': 'Kode salah. Pastikan jam HP sinkron.'}), 400
             user.totp_secret = secret
             user.totp_enabled = True
@@ -1757,11 +1868,13 @@ def register_api_routes(app):
                 return jsonify({'success': False, 'message': '2FA belum di-setup. Panggil /api/auth/totp/setup dulu.'}), 400
             if backup_code:
                 if not user.consume_backup_code(backup_code):
+                    throttle_fail('totp', user_id=user.id, ip=request.remote_addr)
                     return jsonify({'success': False, 'message': 'Backup code tidak valid'}), 400
                 via_backup = True
                 db.session.commit()
             else:
                 if not verify_totp(user.totp_secret, code):
+                    throttle_fail('totp', user_id=user.id, ip=request.remote_addr)
                     return jsonify({'success': False, 'message': 'Kode salah'}), 400
         else:
             return jsonify({'success': False, 'message': 'Token tidak valid untuk operasi 2FA'}), 401
@@ -1786,7 +1899,8 @@ def register_api_routes(app):
     @app.route('/api/auth/me', methods=['GET'])
     @jwt_required
     def api_me():
-        user = User.query.get(request.current_user_id)
+        # /me mengembalikan saldo & backup code terkini → tetap dari DB, satu query (JOIN anggota)
+        user = User.query.options(joinedload(User.anggota)).filter(User.id == request.current_user_id).first()
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
         user_data = user.to_dict()
@@ -1811,7 +1925,10 @@ def register_api_routes(app):
             return jsonify({'success': False, 'message': 'Password lama salah'}), 400
         user.set_password(new_password)
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Password berhasil diubah'})
+        # Ganti password menaikkan token_version (jwt_auth.py) → token lama
+        # client ini ikut ditolak; kirim token baru seperti login
+        return jsonify({'success': True, 'message': 'Password berhasil diubah',
+                        'token': generate_jwt_token(user)})
 
     @app.route('/api/anggota', methods=['GET'])
     @jwt_required
@@ -1845,11 +1962,8 @@ def register_api_routes(app):
         a = Anggota.query.filter_by(kartu_id=anggota_id).first()
         if not a:
             return jsonify({'success': False, 'message': 'Tidak ditemukan'}), 404
-        current_user = User.query.get(request.current_user_id)
-        if not current_user:
-            return jsonify({'success': False, 'message': 'Akun tidak valid'}), 401
-        # Otorisasi: admin/pam bebas; lainnya hanya boleh data sendiri
-        if current_user.role not in ('admin', 'pam') and current_user.anggota_id != a.id:
+        # Otorisasi: admin/pam bebas; lainnya hanya boleh data sendiri (claim token)
+        if request.current_role not in ('admin', 'pam') and request.current_anggota_id != a.id:
             return jsonify({'success': False, 'message': 'Tidak diizinkan melihat riwayat anggota lain'}), 403
         data = a.get_riwayat_hidup()
         data['nama'] = a.nama
@@ -1864,11 +1978,10 @@ def register_api_routes(app):
     def api_riwayat_hidup_update(anggota_id):
         """Update data riwayat hidup anggota"""
         # Only admin or the anggota themselves
-        current_user = User.query.get(request.current_user_id)
         a = Anggota.query.filter_by(kartu_id=anggota_id).first()
         if not a:
             return jsonify({'success': False, 'message': 'Tidak ditemukan'}), 404
-        if current_user.role != 'admin' and current_user.anggota_id != a.id:
+        if request.current_role != 'admin' and request.current_anggota_id != a.id:
             return jsonify({'success': False, 'message': 'Tidak diizinkan'}), 403
 
         import json as _json
@@ -1939,6 +2052,7 @@ def register_api_routes(app):
                 lokasi_nama='NFC Scan', sumber='NFC',
                 scanned_by_user_id=request.current_user_id,
             ))
+            publish_lokasi(a, sumber='NFC')
             db.session.commit()
             if getattr(request, 'current_role', None) == 'user':
                 return jsonify({'success': True, 'data': a.to_identitas_dict()})
@@ -1961,6 +2075,7 @@ def register_api_routes(app):
                 lokasi_nama='QR Scan', sumber='QR',
                 scanned_by_user_id=request.current_user_id,
             ))
+            publish_lokasi(a, sumber='QR')
             db.session.commit()
             if getattr(request, 'current_role', None) == 'user':
                 return jsonify({'success': True, 'data': a.to_identitas_dict()})
@@ -1979,6 +2094,7 @@ def register_api_routes(app):
                 lokasi_nama='QR Scan', sumber='QR',
                 scanned_by_user_id=request.current_user_id,
             ))
+            publish_lokasi(a, sumber='QR')
             db.session.commit()
             if getattr(request, 'current_role', None) == 'user':
                 return jsonify({'success': True, 'data': a.to_identitas_dict()})
@@ -2011,6 +2127,7 @@ def register_api_routes(app):
                 sumber=metode,
                 scanned_by_user_id=session.get('user_id'),
             ))
+            publish_lokasi(a, sumber=metode)
             db.session.commit()
             
             # Return appropriate data based on user role
@@ -2102,13 +2219,8 @@ def register_api_routes(app):
         role = getattr(request, 'current_role', None)
         query = Transaksi.query
         if role == 'user':
-            user = User.query.get(request.current_user_id)
-            if user and user.anggota_id:
-                anggota = Anggota.query.get(user.anggota_id)
-                if anggota:
-                    query = query.filter_by(anggota_id=anggota.id)
-                else:
-                    return jsonify({'success': True, 'data': []})
+            if request.current_anggota_id:
+                query = query.filter_by(anggota_id=request.current_anggota_id)
             else:
                 return jsonify({'success': True, 'data': []})
         elif role == 'operator_kantin':
@@ -2149,6 +2261,166 @@ def register_api_routes(app):
             'history': [h.to_dict() for h in history],
         }})
 
+    @app.route('/api/lacak/<anggota_id>/track', methods=['GET'])
+    @jwt_required
+    def api_lacak_track(anggota_id):
+        """
+        Jejak siap peta: segmen encoded polyline (Douglas–Peucker) + stay point
+        dari seluruh titik di rentang ?start=&end= (default 7 hari terakhir).
+        Opsional: ?tolerance= (meter), ?gap_minutes=, ?stay_radius= (meter), ?stay_minutes=
+        """
+        from tracks import get_track  # numpy baru di-import saat dipakai
+        a = Anggota.query.filter_by(kartu_id=anggota_id).first()
+        if not a:
+            return jsonify({'success': False, 'message': 'Tidak ditemukan'}), 404
+        try:
+            start, end = _laporan_range(default_days=app.config.get('TRACK_DEFAULT_DAYS', 7),
+                                        max_days=app.config.get('TRACK_MAX_DAYS', 366))
+            params = {}
+            for name, low, high in (('tolerance', 1, 1000), ('gap_minutes', 1, 1440),
+                                    ('stay_radius', 5, 1000), ('stay_minutes', 1, 1440)):
+                if request.args.get(name):
+                    params[name] = max(low, min(float(request.args[name]), high))
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        track = get_track(a.id, start, end, **params)
+        return jsonify({'success': True, 'data': dict(track, anggota={
+            'kartu_id': a.kartu_id, 'nama': a.nama,
+            'lokasi_terakhir': {'lat': a.lokasi_lat, 'lng': a.lokasi_lng, 'lokasi': a.lokasi_nama},
+        })})
+
+    @app.route('/api/live/stream', methods=['GET'])
+    @pam_or_admin_required
+    def api_live_stream():
+        """
+        Server-Sent Events: push event 'lokasi', 'worker_status', 'findmy_job'
+        ke dashboard. Filter opsional: ?jenis=lokasi,worker_status
+        """
+        from flask import Response, stream_with_context
+        if not app.config.get('LIVE_STREAM_ENABLED', True):
+            # 204 → EventSource berhenti, tidak reconnect (worker sync tidak tertahan)
+            return Response(status=204)
+        last_id, gaps = parse_cursor(request.headers.get('Last-Event-ID') or request.args.get('last_id'))
+        jenis = [j for j in request.args.get('jenis', '').split(',') if j] or None
+        stream = event_stream(
+            last_id=last_id, jenis=jenis, gaps=gaps,
+            max_seconds=app.config.get('LIVE_STREAM_MAX_SECONDS', 25),
+            poll_interval=app.config.get('LIVE_STREAM_POLL_INTERVAL', 1.0),
+            late_seconds=app.config.get('LIVE_EVENT_LATE_SECONDS', 5),
+        )
+        return Response(stream_with_context(stream), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('/api/jobs/<job_id>', methods=['GET'])
+    @admin_required
+    def api_job_status(job_id):
+        """Status & progress background job admin (bulk create user, dll)"""
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'success': False, 'message': 'Job tidak ditemukan'}), 404
+        return jsonify({'success': True, 'data': job})
+
+    @app.route('/api/throttle/stats', methods=['GET'])
+    @admin_required
+    def api_throttle_stats():
+        """Metrik throttling login / 2FA (allowed, rejected per scope) + bucket yang sedang menolak."""
+        return jsonify({'success': True, 'data': throttle_stats()})
+
+    @app.route('/api/profiling/stats', methods=['GET'])
+    @admin_required
+    def api_profiling_stats():
+        """
+        Query & waktu per endpoint (agregat proses worker ini) + ringkasan
+        request lambat semua worker. ?order=total_ms|mean_ms|p95_ms|queries_per_request
+        ?hours=24 ?reset=1 (kosongkan agregat proses ini)
+        """
+        if not app.config.get('PROFILING_ENABLED'):
+            return jsonify({'success': False, 'message': 'Profiling nonaktif (PROFILING_ENABLED=1)'}), 404
+        data = {
+            'process': profiling.process_info(),
+            'slow_ms': app.config.get('PROFILING_SLOW_MS'),
+            'endpoints': profiling.endpoint_stats(request.args.get('order', 'total_ms')),
+            'slow_endpoints': profiling.slow_endpoints(request.args.get('hours', 24, type=int)),
+        }
+        if request.args.get('reset') == '1':
+            profiling.reset_stats()
+        return jsonify({'success': True, 'data': data})
+
+    @app.route('/api/profiling/slow', methods=['GET'])
+    @admin_required
+    def api_profiling_slow():
+        """Request lambat terbaru (semua worker). ?limit=50 ?endpoint=nama_endpoint"""
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        return jsonify({'success': True,
+                        'data': profiling.recent_slow(limit, request.args.get('endpoint'))})
+
+    @app.route('/api/profiling/slow/<int:slow_id>', methods=['GET'])
+    @admin_required
+    def api_profiling_slow_detail(slow_id):
+        """Detail request lambat: daftar query, statement berulang (N+1), trace profiler."""
+        detail = profiling.slow_detail(slow_id)
+        if not detail:
+            return jsonify({'success': False, 'message': 'Data tidak ditemukan'}), 404
+        return jsonify({'success': True, 'data': detail})
+
+    @app.route('/api/db/pool', methods=['GET'])
+    @admin_required
+    def api_db_pool():
+        """
+        Kesehatan pool koneksi DB proses worker ini (checkout wait, overflow,
+        timeout, pre-ping gagal) + budget koneksi semua proses. ?reset=1
+        """
+        data = {'pool': db_pool.pool_status(db.engine), 'role': app.config.get('DB_POOL_ROLE'),
+                'budget': pool_budget()}
+        if request.args.get('reset') == '1':
+            db_pool.reset_stats()
+        return jsonify({'success': True, 'data': data})
+
+    def _laporan_range(default_days=30, max_days=3660):
+        """start/end (YYYY-MM-DD) dari query string; default N hari terakhir."""
+        today = datetime.now().date()
+        try:
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else today
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') \
+                else end - timedelta(days=default_days - 1)
+        except ValueError:
+            raise ValueError('start/end harus format YYYY-MM-DD')
+        if start > end:
+            raise ValueError('start harus <= end')
+        if (end - start).days >= max_days:
+            raise ValueError(f'Rentang maksimal {max_days} hari')
+        return start, end
+
+    @app.route('/api/laporan/harian', methods=['GET'])
+    @kantin_or_admin_required
+    def api_laporan_harian():
+        """Pendapatan kantin, top up & hutang per hari (dari rollup harian)"""
+        try:
+            start, end = _laporan_range()
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({'success': True, 'data': laporan_harian(start, end)})
+
+    @app.route('/api/laporan/operator', methods=['GET'])
+    @kantin_or_admin_required
+    def api_laporan_operator():
+        """Pendapatan kantin per operator & metode (dari rollup harian)"""
+        try:
+            start, end = _laporan_range()
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({'success': True, 'data': laporan_operator(start, end)})
+
+    @app.route('/api/laporan/hutang', methods=['GET'])
+    @admin_required
+    def api_laporan_hutang():
+        """Total hutang beredar per hari (dari rollup harian + SUM anggota.hutang)"""
+        try:
+            start, end = _laporan_range()
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({'success': True, 'data': laporan_hutang(start, end)})
+
     @app.route('/api/menu', methods=['GET'])
     @jwt_required
     def api_menu_list():
@@ -2163,7 +2435,7 @@ def register_api_routes(app):
             'kartu_aktif': Anggota.query.filter_by(status_kartu='Aktif').count(),
             'kartu_hilang': Anggota.query.filter_by(status_kartu='Hilang').count(),
             'total_saldo': db.session.query(db.func.coalesce(db.func.sum(Anggota.saldo), 0)).scalar(),
-            'total_transaksi': Transaksi.query.count(),
+            'total_transaksi': rollup_total_transaksi(),
         }})
 
     # ============================================================
@@ -2233,6 +2505,7 @@ def register_api_routes(app):
                 lokasi_nama=lokasi_nama, sumber=sumber,
                 scanned_by_user_id=request.current_user_id,
             ))
+            publish_lokasi(a, sumber=sumber)
             db.session.commit()
             return jsonify({'success': True, 'message': 'Location updated', 'data': {
                 'kartu_id': a.kartu_id, 'nama': a.nama,
@@ -2519,52 +2792,12 @@ def register_error_handlers(app):
 app = create_app()
 
 
-# ============================================================
-# Google Find Hub Integration — AKTIVASI DI LEVEL MODULE
-# ============================================================
-# ⚠️  PATCH: Sebelumnya blok ini ada di dalam `if __name__ == '__main__':`
-# sehingga TIDAK PERNAH JALAN di Gunicorn (gunicorn import app.py sebagai
-# module WSGI, bukan via `python app.py`). Akibatnya worker background
-# untuk update lokasi tracker tidak pernah start → UI selalu "Belum ada data".
-#
-# Sekarang init-nya di level module supaya:
-#   - `python app.py`           → jalan (dev mode)
-#   - `gunicorn app:app`        → jalan (production)
-#   - `python findmy_worker.py` → jalan (dedicated worker service)
-#
-# Multi-worker safety: `findmy.start_worker()` pakai fcntl.flock leader
-# election di `/tmp/kartu_pintar_findmy_leader.lock`, jadi meskipun
-# gunicorn pakai `--workers 4`, cuma SATU worker yang beneran jalanin loop.
-# ============================================================
-
-_FINDMY_AUTO_START = os.environ.get('FINDMY_AUTO_START', '1').lower() in ('1', 'true', 'yes')
-
-findmy = None  # exported for findmy_worker.py and tests
-
-try:
-    from findmy_service import FindMyLocationService, register_findmy_routes
-
-    findmy = FindMyLocationService()
-    findmy.init_app(app)
-    register_findmy_routes(app, findmy)
-
-    if _FINDMY_AUTO_START:
-        interval = app.config.get('FINDMY_UPDATE_INTERVAL', 60)
-        started = findmy.start_worker(interval=interval, require_leader=True)
-        if started:
-            print(f"[FindMy] ✅ Integration aktif. Worker leader pid={os.getpid()}, interval={interval}s", flush=True)
-        else:
-            # Expected for non-leader gunicorn workers
-            print(f"[FindMy] ℹ️  Integration loaded (non-leader pid={os.getpid()}) — worker tidak jalan di sini", flush=True)
-    else:
-        print("[FindMy] ⏸  FINDMY_AUTO_START=0 → worker tidak di-start otomatis "
-              "(biasanya kalau kamu pakai findmy_worker.py service terpisah).", flush=True)
-
-except Exception as e:
-    import traceback
-    print(f"[FindMy] ❌ Integration gagal: {e}", flush=True)
-    print(traceback.format_exc(), flush=True)
+# FindMy: route didaftarkan di create_app(), service & loop worker lazy
+# (lihat findmy_ext.py). Loop di-start oleh gunicorn.conf.py
+# (post_worker_init) atau `python app.py`, bukan saat import.
+findmy = app.extensions['findmy']  # exported for findmy_worker.py and tests
 
 
 if __name__ == '__main__':
+    findmy.autostart()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
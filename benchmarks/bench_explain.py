@@ -0,0 +1,147 @@
+"""
+Kartu Pintar - Cek Query Plan (EXPLAIN) Riwayat per Anggota
+============================================================
+
+Guard regresi index: query riwayat per anggota yang sama dengan di
+app.py di-EXPLAIN terhadap DB yang dikonfigurasi (MySQL: EXPLAIN,
+SQLite: EXPLAIN QUERY PLAN), lalu dicek:
+
+    lokasi_terbaru     riwayat lokasi detail / /api/lacak — pakai
+                       idx_lokasi_anggota_waktu, TANPA filesort
+    lokasi_jejak       (waktu, lat, lng) satu rentang waktu — pakai
+                       idx_lokasi_anggota_waktu, covering (tanpa baca baris)
+    transaksi_terbaru  detail anggota / riwayat transaksi — pakai
+                       idx_transaksi_anggota_created, TANPA filesort
+
+Tiap query juga dijalankan --repeat kali (median ms) untuk anggota
+dengan riwayat terbanyak di sampel. Keluar dengan kode 1 kalau ada cek
+yang gagal — jalankan setelah migrasi / perubahan model (lihat
+database/migrate_index_anggota_waktu.sql). Optimizer MySQL bisa memilih
+plan lain di tabel hampir kosong: pakai data `manage.py seed-scale`.
+
+PAKAI (dari root project):
+    python benchmarks/bench_explain.py
+    python benchmarks/bench_explain.py --json explain.json --repeat 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from statistics import median
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def queries(anggota_id, since):
+    """(nama, statement, index yang diharapkan, harus covering) — bentuk query sama dengan app.py."""
+    from sqlalchemy import select
+    from models import LokasiHistory, Transaksi
+
+    return [
+        ('lokasi_terbaru',
+         LokasiHistory.query.filter_by(anggota_id=anggota_id)
+         .order_by(LokasiHistory.waktu.desc()).limit(200).statement,
+         'idx_lokasi_anggota_waktu', False),
+        ('lokasi_jejak',
+         select(LokasiHistory.waktu, LokasiHistory.latitude, LokasiHistory.longitude)
+         .where(LokasiHistory.anggota_id == anggota_id, LokasiHistory.waktu >= since)
+         .order_by(LokasiHistory.waktu),
+         'idx_lokasi_anggota_waktu', True),
+        ('transaksi_terbaru',
+         Transaksi.query.filter_by(anggota_id=anggota_id)
+         .order_by(Transaksi.created_at.desc()).limit(20).statement,
+         'idx_transaksi_anggota_created', False),
+    ]
+
+
+def _execute(conn, prefix, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    return conn.exec_driver_sql(prefix + str(compiled), params).all()
+
+
+def explain(conn, stmt):
+    """Return (ringkasan plan, index dipakai, filesort?, covering?)."""
+    if conn.dialect.name == 'mysql':
+        rows = [dict(r._mapping) for r in _execute(conn, 'EXPLAIN ', stmt)]
+        row = rows[0]
+        extra = [e.strip() for e in (row.get('Extra') or '').split(';')]
+        plan = '; '.join(f"{r['table']}: type={r['type']} key={r['key']} rows={r['rows']} extra={r.get('Extra')}"
+                         for r in rows)
+        return plan, row['key'], 'Using filesort' in extra, 'Using index' in extra
+    if conn.dialect.name == 'sqlite':
+        details = [r[3] for r in _execute(conn, 'EXPLAIN QUERY PLAN ', stmt)]
+        plan = ' | '.join(details)
+        used = next((d.split(' INDEX ', 1)[1].split(' ')[0] for d in details if ' INDEX ' in d), None)
+        return plan, used, any('TEMP B-TREE FOR ORDER BY' in d for d in details), \
+            any('COVERING INDEX' in d for d in details)
+    raise SystemExit(f"Dialect {conn.dialect.name} belum didukung")
+
+
+def timed(conn, stmt, repeat):
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(conn.execute(stmt).all())
+        times.append((time.perf_counter() - started) * 1000)
+    return round(median(times), 2), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cek EXPLAIN query riwayat lokasi / transaksi per anggota')
+    parser.add_argument('--days', type=int, default=30, help='Rentang query jejak (hari ke belakang)')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--json', help='Tulis hasil ke file JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('FINDMY_AUTO_START', '0')
+    from sqlalchemy import func
+    from app import create_app
+    from models import db, LokasiHistory
+
+    app = create_app()
+    results, failed = [], False
+    with app.app_context():
+        # Anggota dengan riwayat terbanyak di 10000 titik terakhir — kasus terberat
+        recent = db.session.query(LokasiHistory.anggota_id).order_by(LokasiHistory.id.desc()).limit(10000).subquery()
+        anggota_id = db.session.query(recent.c.anggota_id).group_by(recent.c.anggota_id)\
+            .order_by(func.count().desc()).limit(1).scalar() or 1
+        since = datetime.now() - timedelta(days=args.days)
+        print(f"DB {db.engine.dialect.name} | anggota_id {anggota_id} | jejak {args.days} hari\n")
+
+        with db.engine.connect() as conn:
+            for name, stmt, expected, covering in queries(anggota_id, since):
+                plan, used, filesort, is_covering = explain(conn, stmt)
+                ms, rows = timed(conn, stmt, args.repeat)
+                problems = []
+                if used != expected:
+                    problems.append(f"index {used or '-'} (harusnya {expected})")
+                if filesort:
+                    problems.append('filesort')
+                if covering and not is_covering:
+                    problems.append('tidak covering')
+                failed |= bool(problems)
+                results.append({'query': name, 'index': used, 'expected_index': expected, 'filesort': filesort,
+                                'covering': is_covering, 'median_ms': ms, 'rows': rows, 'plan': plan,
+                                'problems': problems})
+                print(f"{'❌' if problems else '✅'} {name:<18} {ms:>8.2f} ms  {rows:>6} baris  "
+                      f"{'; '.join(problems) or 'ok'}")
+                print(f"     {plan}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'explain', 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                       'anggota_id': anggota_id, 'results': results}, f, indent=2, default=str)
+        print(f"\nHasil ditulis ke {args.json}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,384 @@
+"""
+Kartu Pintar - Benchmark HTTP (kasir, top up, scan, dashboard)
+===============================================================
+
+Replay campuran alur nyata dengan concurrency yang bisa diatur, lalu
+laporkan latency p50/p95/p99, RPS, error, dan query DB per request.
+
+ALUR (bobot default, ubah dengan --mix):
+    kasir      50  POST /api/pembayaran/tap → POST /api/pembayaran/cart
+    scan       25  GET  /api/scan/qr/<qr_data>
+    topup      10  POST /api/topup/tap
+    dashboard  10  GET  /dashboard              (session admin)
+    transaksi   5  GET  /transaksi              (session admin)
+
+MODE:
+  - In-process (default): app Flask dipanggil lewat test client per
+    thread — tanpa server, query DB per request dihitung persis (event
+    before_cursor_execute engine).
+  - --url http://127.0.0.1:5000: server sungguhan (gunicorn / flask run).
+    Token JWT & cookie session dibuat lokal dengan SECRET_KEY yang sama,
+    jadi jalankan dengan .env / DATABASE_URL yang sama dengan server.
+    Query per request tidak tersedia di mode ini.
+
+PAKAI (dari root project; data SUNGGUHAN ikut berubah — pakai DB uji,
+mis. hasil `python manage.py seed-scale`):
+    python benchmarks/bench_http.py --concurrency 8 --duration 30
+    python benchmarks/bench_http.py --mix kasir=1 --requests 2000 --json hasil.json
+    python benchmarks/bench_http.py --url http://127.0.0.1:5000 --json hasil.json --compare sebelum.json
+
+--compare membandingkan p95 & RPS per endpoint dengan file JSON lama
+(mis. dari commit sebelumnya) dan keluar dengan kode 1 kalau ada regresi
+melewati --tolerance persen.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_MIX = {'kasir': 50, 'scan': 25, 'topup': 10, 'dashboard': 10, 'transaksi': 5}
+CART_ITEMS = [('Nasi Goreng', 15000), ('Es Teh Manis', 5000), ('Gorengan', 5000),
+              ('Ayam Geprek', 18000), ('Kopi', 8000), ('Air Mineral', 3000)]
+
+
+# ============================================================
+# FLOWS — tiap flow = daftar (nama, method, path, json body, auth)
+# ============================================================
+
+def flow_kasir(rng, member):
+    items = [{'nama': n, 'harga': h, 'jumlah': rng.randint(1, 2)} for n, h in rng.sample(CART_ITEMS, rng.randint(1, 3))]
+    return [
+        ('pembayaran_tap', 'POST', '/api/pembayaran/tap', {'scan_data': member['qr'], 'metode': 'QR'}, 'jwt'),
+        ('pembayaran_cart', 'POST', '/api/pembayaran/cart',
+         {'kartu_id': member['kartu_id'], 'metode': 'QR', 'items': items, 'allow_hutang': True}, 'jwt'),
+    ]
+
+
+def flow_scan(rng, member):
+    return [('scan_qr', 'GET', f"/api/scan/qr/{member['qr']}", None, 'jwt')]
+
+
+def flow_topup(rng, member):
+    return [('topup_tap', 'POST', '/api/topup/tap',
+             {'scan_data': member['qr'], 'nominal': rng.choice([50000, 100000]), 'metode': 'QR'}, 'jwt')]
+
+
+def flow_dashboard(rng, member):
+    return [('dashboard', 'GET', '/dashboard', None, 'session')]
+
+
+def flow_transaksi(rng, member):
+    return [('transaksi', 'GET', '/transaksi', None, 'session')]
+
+
+FLOWS = {
+    'kasir': flow_kasir,
+    'scan': flow_scan,
+    'topup': flow_topup,
+    'dashboard': flow_dashboard,
+    'transaksi': flow_transaksi,
+}
+
+
+# ============================================================
+# CLIENTS
+# ============================================================
+
+class InProcessClient:
+    """Flask test client per thread + hitung query DB per request."""
+
+    _local = threading.local()
+
+    def __init__(self, app, token, session_data):
+        self.app = app
+        self.token = token
+        self.session_data = session_data
+        from models import db
+        from sqlalchemy import event
+        with app.app_context():
+            engine = db.engine
+        local = self._local
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _count(*args):
+            local.queries = getattr(local, 'queries', 0) + 1
+
+    def _client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self.app.test_client()
+            with client.session_transaction() as sess:
+                sess.update(self.session_data)
+            self._local.client = client
+        return client
+
+    def request(self, method, path, body, auth):
+        client = self._client()
+        headers = {'Authorization': f'Bearer {self.token}'} if auth == 'jwt' else {}
+        before = getattr(self._local, 'queries', 0)
+        started = time.perf_counter()
+        resp = client.open(path, method=method, json=body, headers=headers)
+        resp.get_data()
+        elapsed = time.perf_counter() - started
+        return resp.status_code, elapsed, getattr(self._local, 'queries', 0) - before
+
+
+class HttpClient:
+    """Server sungguhan via urllib (tanpa dependency tambahan)."""
+
+    def __init__(self, base_url, token, cookie):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.cookie = cookie
+
+    def request(self, method, path, body, auth):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        if auth == 'jwt':
+            req.add_header('Authorization', f'Bearer {self.token}')
+        else:
+            req.add_header('Cookie', self.cookie)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except (urllib.error.URLError, OSError):
+            status = 0
+        return status, time.perf_counter() - started, None
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+def parse_mix(value):
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in FLOWS:
+            raise SystemExit(f"Flow tidak dikenal: {name} (pilihan: {', '.join(FLOWS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def run(client, members, mix, concurrency, duration=None, total_requests=None, seed=42):
+    """Jalankan flow campuran. Return (samples {nama: [(status, detik, queries)]}, wall detik)."""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    counter = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local = defaultdict(list)
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                break
+            flow = FLOWS[rng.choices(names, weights)[0]](rng, rng.choice(members))
+            if total_requests:
+                with lock:
+                    if counter[0] >= total_requests:
+                        break
+                    counter[0] += len(flow)
+            for name, method, path, body, auth in flow:
+                local[name].append(client.request(method, path, body, auth))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, wall):
+    endpoints = {}
+    all_latencies = []
+    total = errors = 0
+    for name, values in sorted(samples.items()):
+        latencies = sorted(v[1] * 1000 for v in values)
+        queries = [v[2] for v in values if v[2] is not None]
+        errs = sum(1 for v in values if not (200 <= v[0] < 400))
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': errs,
+            'status': dict(sorted(_count_status(values).items())),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'rps': round(len(values) / wall, 1) if wall else None,
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+        all_latencies.extend(latencies)
+        total += len(values)
+        errors += errs
+    all_latencies.sort()
+    overall = {
+        'requests': total,
+        'errors': errors,
+        'wall_seconds': round(wall, 3),
+        'rps': round(total / wall, 1) if wall else None,
+        'p50_ms': round(percentile(all_latencies, 50), 2) if all_latencies else None,
+        'p95_ms': round(percentile(all_latencies, 95), 2) if all_latencies else None,
+        'p99_ms': round(percentile(all_latencies, 99), 2) if all_latencies else None,
+    }
+    return overall, endpoints
+
+
+def _count_status(values):
+    counts = defaultdict(int)
+    for status, _, _ in values:
+        counts[str(status)] += 1
+    return counts
+
+
+def compare(current, previous, tolerance):
+    """Cetak selisih p95 & RPS per endpoint. Return True kalau ada regresi > tolerance%."""
+    regressed = False
+    print(f"\nPerbandingan dengan {previous.get('commit') or '?'} (toleransi {tolerance}%):")
+    for name, cur in current['endpoints'].items():
+        old = previous.get('endpoints', {}).get(name)
+        if not old:
+            continue
+        d_p95 = (cur['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0
+        d_rps = (cur['rps'] - old['rps']) / old['rps'] * 100 if old.get('rps') else 0
+        bad = d_p95 > tolerance or d_rps < -tolerance
+        regressed |= bad
+        print(f"  {'❌' if bad else '  '} {name:<16} p95 {old['p95_ms']:>8.1f} → {cur['p95_ms']:>8.1f} ms ({d_p95:+.0f}%)  "
+              f"rps {old['rps']:>7.1f} → {cur['rps']:>7.1f} ({d_rps:+.0f}%)")
+    return regressed
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def prepare(app, sample_size):
+    """Token JWT admin, data session admin, dan sampel anggota aktif."""
+    from app import generate_jwt_token
+    from models import db, User, Anggota
+
+    with app.app_context():
+        admin = User.query.filter_by(role='admin', is_active=True).order_by(User.id).first()
+        if not admin:
+            raise SystemExit("Butuh minimal satu user admin aktif (python manage.py seed / create-user).")
+        token = generate_jwt_token(admin)
+        session_data = {'user_id': admin.id, 'user': admin.username, 'role': 'admin', 'nama': admin.nama,
+                        'anggota_id': admin.anggota_id}
+        rows = db.session.query(Anggota.kartu_id, Anggota.qr_data).filter(Anggota.status_kartu == 'Aktif')\
+            .order_by(db.func.random() if db.engine.dialect.name == 'sqlite' else db.func.rand())\
+            .limit(sample_size).all()
+    members = [{'kartu_id': k, 'qr': q or k} for k, q in rows]
+    if not members:
+        raise SystemExit("Tidak ada anggota aktif — jalankan `python manage.py seed-scale` dulu.")
+    return token, session_data, members
+
+
+def session_cookie(app, session_data):
+    serializer = app.session_interface.get_signing_serializer(app)
+    return f"{app.config.get('SESSION_COOKIE_NAME', 'session')}={serializer.dumps(dict(session_data))}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTTP alur kasir / scan / dashboard')
+    parser.add_argument('--url', help='Base URL server (default: in-process test client)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=None, help='Detik (default 10 kalau --requests kosong)')
+    parser.add_argument('--requests', type=int, default=None, help='Total request (ganti --duration)')
+    parser.add_argument('--mix', help='Bobot flow, mis. kasir=50,scan=25,topup=10,dashboard=10,transaksi=5')
+    parser.add_argument('--sample', type=int, default=500, help='Jumlah anggota aktif yang dipakai')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Tulis hasil ke file JSON')
+    parser.add_argument('--compare', help='File JSON hasil sebelumnya untuk dibandingkan')
+    parser.add_argument('--tolerance', type=float, default=10.0, help='Persen regresi yang ditoleransi')
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        args.duration = 10
+
+    os.environ.setdefault('FINDMY_AUTO_START', '0')
+    from app import create_app
+    app = create_app()
+    app.config['THROTTLE_ENABLED'] = False
+
+    mix = parse_mix(args.mix)
+    token, session_data, members = prepare(app, args.sample)
+    if args.url:
+        client = HttpClient(args.url, token, session_cookie(app, session_data))
+    else:
+        client = InProcessClient(app, token, session_data)
+
+    target = f"{args.requests} request" if args.requests else f"{args.duration:g}s"
+    print(f"Benchmark {args.url or 'in-process'} | concurrency {args.concurrency} | {target} | "
+          f"mix {', '.join(f'{k}={v:g}' for k, v in mix.items())}")
+    samples, wall = run(client, members, mix, args.concurrency, args.duration, args.requests, args.seed)
+    overall, endpoints = summarize(samples, wall)
+
+    print(f"\n{'endpoint':<18}{'req':>7}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'rps':>8}{'q/req':>7}")
+    for name, e in endpoints.items():
+        q = f"{e['queries_per_request']:.1f}" if e['queries_per_request'] is not None else '-'
+        print(f"{name:<18}{e['requests']:>7}{e['errors']:>6}{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}"
+              f"{e['p99_ms']:>9.1f}{e['rps']:>8.1f}{q:>7}")
+    print(f"{'TOTAL':<18}{overall['requests']:>7}{overall['errors']:>6}{overall['p50_ms']:>9.1f}"
+          f"{overall['p95_ms']:>9.1f}{overall['p99_ms']:>9.1f}{overall['rps']:>8.1f}")
+
+    result = {
+        'benchmark': 'http',
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'target': args.url or 'in-process',
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'concurrency': args.concurrency,
+        'mix': mix,
+        'overall': overall,
+        'endpoints': endpoints,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Hasil ditulis ke {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(result, previous, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Kartu Pintar - Benchmark ID Allocator
+======================================
+
+Ukur throughput alokasi ID (id_allocator.py) di bawah beban paralel:
+N proses × M thread masing-masing mengambil ID dari sequence yang sama,
+lalu semua nilai dicek unik (tidak boleh ada duplikat / nilai hilang
+di dalam lease yang sudah dipakai).
+
+PAKAI (dari root project, DB sesuai DATABASE_URL / .env):
+    python benchmarks/bench_id_allocator.py
+    python benchmarks/bench_id_allocator.py --processes 4 --threads 4 --count 2000 --lease 1 100
+    python benchmarks/bench_id_allocator.py --json hasil.json
+
+Sequence benchmark memakai nama 'bench:<acak>' dan dihapus setelah selesai.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _worker(args):
+    """Satu proses: `threads` thread × `count` alokasi. Return (values, detik)."""
+    name, lease, threads, count = args
+    os.environ.setdefault('FINDMY_AUTO_START', '0')
+    from app import create_app
+    from id_allocator import next_value
+
+    app = create_app()
+
+    def run(_):
+        with app.app_context():
+            return [next_value(name, lease) for _ in range(count)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        values = [v for chunk in pool.map(run, range(threads)) for v in chunk]
+    return values, time.perf_counter() - started
+
+
+def bench(name, lease, processes, threads, count):
+    ctx = get_context('spawn')  # proses bersih, tiap proses punya engine & lease sendiri
+    started = time.perf_counter()
+    with ctx.Pool(processes) as pool:
+        results = pool.map(_worker, [(name, lease, threads, count)] * processes)
+    elapsed = time.perf_counter() - started
+
+    values = [v for vals, _ in results for v in vals]
+    total = len(values)
+    duplicates = total - len(set(values))
+    busy = max(seconds for _, seconds in results)
+    return {
+        'lease_size': lease,
+        'processes': processes,
+        'threads': threads,
+        'allocations': total,
+        'duplicates': duplicates,
+        'wall_seconds': round(elapsed, 3),
+        'alloc_seconds': round(busy, 3),  # tanpa waktu start proses
+        'allocations_per_second': round(total / busy, 1) if busy else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark id_allocator di bawah beban paralel')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--count', type=int, default=500, help='Alokasi per thread')
+    parser.add_argument('--lease', type=int, nargs='+', default=[1, 100], help='Ukuran lease yang dibandingkan')
+    parser.add_argument('--json', help='Tulis hasil ke file JSON')
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db, IdSequence
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    results = []
+    for lease in args.lease:
+        name = f'bench:{uuid.uuid4().hex[:12]}'
+        try:
+            r = bench(name, lease, args.processes, args.threads, args.count)
+        finally:
+            with app.app_context():
+                IdSequence.query.filter(IdSequence.name == name).delete()
+                db.session.commit()
+        results.append(r)
+        status = '✅' if r['duplicates'] == 0 else f"❌ {r['duplicates']} duplikat"
+        print(f"lease={lease:<5} {r['processes']}p×{r['threads']}t  "
+              f"{r['allocations']} ID dalam {r['alloc_seconds']}s → "
+              f"{r['allocations_per_second']} ID/s  {status}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'id_allocator', 'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+                       'results': results}, f, indent=2)
+        print(f"Hasil ditulis ke {args.json}")
+
+    if any(r['duplicates'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
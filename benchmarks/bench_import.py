@@ -0,0 +1,128 @@
+"""
+Kartu Pintar - Benchmark Waktu Import / Boot Proses
+====================================================
+
+Ukur berapa lama proses baru siap (gunicorn worker, `manage.py`, test)
+dengan `python -X importtime` di subprocess bersih, per target:
+
+    app              import app (create_app + extension FindMy, tanpa worker)
+    manage           import manage (semua command CLI)
+    findmy_worker    import findmy_worker lalu service FindMy (tanpa loop)
+
+Dilaporkan: wall time, total import time, import langsung target yang
+kumulatif-nya paling lama, dan
+apakah stack berat Google / browser (selenium, undetected_chromedriver,
+gpsoauth, protobuf, findmy_tools) ikut ter-import — seharusnya TIDAK
+untuk ketiganya (lihat findmy_ext.py).
+
+PAKAI (dari root project):
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --target app --repeat 5 --top 15
+    python benchmarks/bench_import.py --json hasil.json --max-ms 1500
+
+--max-ms: keluar dengan kode 1 kalau median wall time target mana pun
+melewati batas, atau kalau stack berat ikut ter-import.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'app': 'import app',
+    'manage': 'import manage',
+    'findmy_worker': "import findmy_worker; from app import app; app.extensions['findmy'].service",
+}
+HEAVY_PREFIXES = ('selenium', 'undetected_chromedriver', 'gpsoauth', 'google.protobuf',
+                  'NovaApi', 'Auth', 'ProtoDecoders', 'SpotApi', 'KeyBackup', 'FMDNCrypto')
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def run_target(code, env):
+    """Satu subprocess `python -X importtime -c <code>`. Return (wall ms, [(self_us, cum_us, depth, modul)])."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise SystemExit(f"Target gagal: {code}\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return wall, rows
+
+
+def summarize(name, runs, top):
+    walls = [w for w, _ in runs]
+    rows = runs[-1][1]
+    modules = {mod for _, _, _, mod in rows}
+    heavy = sorted(m for m in modules if any(m == p or m.startswith(p + '.') for p in HEAVY_PREFIXES))
+    direct = sorted((r for r in rows if r[2] == 1), key=lambda r: r[1], reverse=True)
+    return {
+        'target': name,
+        'wall_ms_median': round(median(walls), 1),
+        'wall_ms_min': round(min(walls), 1),
+        'import_ms': round(sum(r[1] for r in rows if r[2] == 0) / 1000, 1),
+        'modules': len(modules),
+        'heavy_modules': heavy,
+        'top_cumulative': [{'module': m, 'cumulative_ms': round(cum / 1000, 1), 'self_ms': round(own / 1000, 1)}
+                           for own, cum, _, m in direct[:top]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark waktu import app / manage / findmy_worker')
+    parser.add_argument('--target', action='append', choices=sorted(TARGETS),
+                        help='Target (boleh berulang, default semua)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', help='Tulis hasil ke file JSON')
+    parser.add_argument('--max-ms', type=float, help='Batas median wall time per target (ms)')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('FINDMY_AUTO_START', '1')  # default produksi: import tetap tidak boleh start loop
+
+    results = []
+    for name in args.target or list(TARGETS):
+        run_target(TARGETS[name], env)  # warm-up: .pyc & page cache
+        runs = [run_target(TARGETS[name], env) for _ in range(max(1, args.repeat))]
+        result = summarize(name, runs, args.top)
+        results.append(result)
+
+        print(f"\n== {name}: wall {result['wall_ms_median']:.0f} ms (min {result['wall_ms_min']:.0f}), "
+              f"import {result['import_ms']:.0f} ms, {result['modules']} modul")
+        for row in result['top_cumulative']:
+            print(f"   {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+        if result['heavy_modules']:
+            print(f"   ❌ stack berat ikut ter-import: {', '.join(result['heavy_modules'][:10])}"
+                  f"{' ...' if len(result['heavy_modules']) > 10 else ''}")
+
+    if args.json:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'import', 'commit': commit,
+                       'timestamp': datetime.now().isoformat(timespec='seconds'),
+                       'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"\nHasil ditulis ke {args.json}")
+
+    failed = any(r['heavy_modules'] for r in results)
+    if args.max_ms:
+        failed |= any(r['wall_ms_median'] > args.max_ms for r in results)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Kartu Pintar - Stress Test Pool Koneksi DB (alur kasir)
+========================================================
+
+Jalankan alur kasir (POST /api/pembayaran/tap → /api/pembayaran/cart,
+lihat bench_http.py) in-process dengan concurrency naik bertahap terhadap
+SATU pool berukuran tetap, lalu laporkan per tingkat: RPS, p50/p95
+latency, checkout wait pool (p50/p95/max), puncak koneksi dipinjam,
+checkout saat overflow, dan timeout pool (db_pool.py).
+
+Titik jenuh = tingkat pertama di mana pool yang membatasi: ada timeout,
+atau semua koneksi (pool_size + max_overflow) terpakai DAN checkout wait
+p95 > --wait-ratio × p50 latency request atau RPS naik kurang dari
+--min-gain persen dibanding tingkat sebelumnya.
+
+Concurrency di atas kapasitas pool bisa berakhir timeout, bukan sekadar
+antri: request yang memegang koneksi session lalu butuh koneksi kedua
+(lease trx_id di id_allocator.py, engine.begin() terpisah) menunggu
+koneksi yang dipegang thread lain — makanya pool_profile menyisakan
+POOL_BACKGROUND_CONNECTIONS di atas jumlah thread.
+
+Thread benchmark = thread request gthread, jadi hasilnya mewakili SATU
+worker gunicorn. Default pool sengaja kecil supaya titik jenuh terlihat;
+pakai --pool-size / --max-overflow dari pool_profile (config.py) untuk
+mengecek profil produksi. Angka yang dipakai capacity planning: ukur
+dengan MySQL (docker-compose `db`), bukan SQLite lokal.
+
+PAKAI (dari root project; data SUNGGUHAN ikut berubah — pakai DB uji):
+    python benchmarks/bench_pool.py
+    python benchmarks/bench_pool.py --pool-size 10 --max-overflow 2 --levels 4,8,12,16,24,32
+    python benchmarks/bench_pool.py --duration 10 --json pool.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_http import InProcessClient, prepare, run, summarize  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stress test pool koneksi DB dengan alur kasir')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--max-overflow', type=int, default=2)
+    parser.add_argument('--pool-timeout', type=int, default=5)
+    parser.add_argument('--levels', default='1,2,4,6,8,12,16,24')
+    parser.add_argument('--duration', type=float, default=5, help='Detik per tingkat concurrency')
+    parser.add_argument('--sample', type=int, default=500)
+    parser.add_argument('--wait-ratio', type=float, default=0.25)
+    parser.add_argument('--min-gain', type=float, default=10.0)
+    parser.add_argument('--json', help='Tulis hasil ke file JSON')
+    args = parser.parse_args()
+
+    # Ukuran pool dibaca config.py saat import → set env sebelum import app
+    os.environ.update({'DB_POOL_SIZE': str(args.pool_size), 'DB_MAX_OVERFLOW': str(args.max_overflow),
+                       'DB_POOL_TIMEOUT': str(args.pool_timeout)})
+    os.environ.setdefault('FINDMY_AUTO_START', '0')
+    import db_pool
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    app.config['THROTTLE_ENABLED'] = False
+    app.config['PROPAGATE_EXCEPTIONS'] = False  # pool timeout → 500 seperti di gunicorn, bukan crash
+    token, session_data, members = prepare(app, args.sample)
+    client = InProcessClient(app, token, session_data)
+    capacity = args.pool_size + args.max_overflow
+    print(f"Pool {args.pool_size} + overflow {args.max_overflow} (timeout {args.pool_timeout}s) | "
+          f"alur kasir | {args.duration:g}s per tingkat")
+
+    print(f"\n{'conc':>5}{'rps':>8}{'p50':>9}{'p95':>9}{'err':>6}   {'wait p50':>9}{'p95':>9}{'max':>9}"
+          f"{'pinjam':>8}{'ovf':>6}{'timeout':>8}")
+    levels, saturated_at, prev_rps = [], None, None
+    for concurrency in [int(c) for c in args.levels.split(',') if c.strip()]:
+        with app.app_context():
+            db.session.remove()
+        db_pool.reset_stats()
+        samples, wall = run(client, members, {'kasir': 1}, concurrency, args.duration)
+        overall, _ = summarize(samples, wall)
+        with app.app_context():
+            pool = db_pool.pool_status(db.engine)
+        level = {'concurrency': concurrency, 'overall': overall, 'pool': pool}
+        levels.append(level)
+
+        reasons = []
+        if pool['timeouts']:
+            reasons.append('timeout')
+        # Wait kecil tetap muncul tanpa antrian (connect, pre-ping, giliran GIL) →
+        # hanya dihitung jenuh kalau semua koneksi memang sedang terpakai
+        if pool['checked_out_peak'] >= capacity:
+            if pool['wait_p95_ms'] and overall['p50_ms'] and \
+                    pool['wait_p95_ms'] > args.wait_ratio * overall['p50_ms']:
+                reasons.append('wait')
+            if prev_rps and (overall['rps'] / prev_rps - 1) * 100 < args.min_gain:
+                reasons.append('rps datar')
+        level['saturated'] = reasons
+        if reasons and saturated_at is None:
+            saturated_at = concurrency
+        prev_rps = overall['rps']
+
+        print(f"{concurrency:>5}{overall['rps']:>8.1f}{overall['p50_ms']:>9.1f}{overall['p95_ms']:>9.1f}"
+              f"{overall['errors']:>6}   {pool['wait_p50_ms'] or 0:>9.2f}{pool['wait_p95_ms'] or 0:>9.2f}"
+              f"{pool['wait_max_ms']:>9.1f}{pool['checked_out_peak']:>8}{pool['overflow_checkouts']:>6}"
+              f"{pool['timeouts']:>8}   {', '.join(reasons)}", flush=True)
+
+    if saturated_at is None:
+        print(f"\nPool belum jenuh sampai concurrency {levels[-1]['concurrency'] if levels else 0}.")
+    else:
+        print(f"\nPool jenuh mulai concurrency {saturated_at} (kapasitas {capacity} koneksi per proses).")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'pool', 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                       'pool_size': args.pool_size, 'max_overflow': args.max_overflow,
+                       'pool_timeout': args.pool_timeout, 'saturated_at': saturated_at,
+                       'levels': levels}, f, indent=2)
+        print(f"Hasil ditulis ke {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Kartu Pintar - Benchmark Mode Serving (sync vs gthread vs gevent)
+==================================================================
+
+Jalankan gunicorn sungguhan untuk tiap SERVING_MODE (profil di config.py,
+dibaca gunicorn.conf.py), lalu replay campuran yang sama dengan
+bench_http.py --url terhadap masing-masing. Hasil: RPS, p50/p95/p99,
+error per mode + selisih terhadap mode pertama.
+
+--sse N menahan N koneksi SSE (/api/live/stream, dashboard live) selama
+run — di mode sync tiap koneksi memakan satu worker penuh selama
+LIVE_STREAM_MAX_SECONDS, jadi 4 tab dashboard = web berhenti melayani.
+Karena itu mode sync menjawab stream dengan 204 (LIVE_STREAM_ENABLED=0);
+set LIVE_STREAM_ENABLED=1 untuk mengukur efeknya.
+Tabel kedua: p50 per endpoint per mode — request cepat (tap/scan) yang
+tertahan di belakang render /transaksi besar terlihat di sini.
+
+Keuntungan gthread/gevent sebanding dengan porsi waktu request yang
+MENUNGGU I/O (round trip MySQL, render besar sambil query, SSE, FindMy) —
+ukur dengan MySQL (docker-compose `db`), bukan SQLite lokal, untuk angka
+yang bisa dipakai capacity planning. Butuh `gunicorn` (+ `gevent` untuk
+mode gevent).
+
+PAKAI (dari root project; data SUNGGUHAN ikut berubah — pakai DB uji):
+    python benchmarks/bench_serving.py
+    python benchmarks/bench_serving.py --modes sync,gthread --concurrency 32 --duration 30
+    python benchmarks/bench_serving.py --mix kasir=40,dashboard=30,transaksi=30 --json serving.json
+    python benchmarks/bench_serving.py --sse 0
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DEFAULT_MIX = 'kasir=40,scan=20,topup=5,dashboard=20,transaksi=15'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            urllib.request.urlopen(url + '/login', timeout=2).read()
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.3)
+    return False
+
+
+def _session_cookie():
+    """Cookie session admin (SECRET_KEY & DB sama dengan server)."""
+    os.environ.setdefault('FINDMY_AUTO_START', '0')
+    from app import create_app
+    from bench_http import prepare, session_cookie
+    app = create_app()
+    _, session_data, _ = prepare(app, 1)
+    return session_cookie(app, session_data)
+
+
+def _hold_sse(url, cookie, stop):
+    """Satu klien dashboard live: baca stream SSE, reconnect sampai `stop`."""
+    while not stop.is_set():
+        req = urllib.request.Request(url + '/api/live/stream', headers={'Cookie': cookie})
+        try:
+            with urllib.request.urlopen(req, timeout=5) as resp:
+                if resp.status == 204:
+                    return  # stream dimatikan → seperti EventSource, berhenti
+                while not stop.is_set() and resp.readline():
+                    pass
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+
+
+def run_mode(mode, args, cookie):
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, SERVING_MODE=mode, FINDMY_AUTO_START='0', THROTTLE_ENABLED='0')
+    env['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix=f'kp-metrics-{mode}-')
+    log = open(os.path.join(tempfile.gettempdir(), f'bench_serving_{mode}.log'), 'w')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', 'app:app'],
+                              cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        if not _wait_ready(url, server):
+            raise SystemExit(f"gunicorn mode {mode} gagal start — lihat {log.name}")
+        out = os.path.join(tempfile.gettempdir(), f'bench_serving_{mode}.json')
+        cmd = [sys.executable, os.path.join(ROOT, 'benchmarks', 'bench_http.py'), '--url', url,
+               '--concurrency', str(args.concurrency), '--mix', args.mix, '--json', out]
+        cmd += ['--requests', str(args.requests)] if args.requests else ['--duration', str(args.duration)]
+        stop = threading.Event()
+        holders = [threading.Thread(target=_hold_sse, args=(url, cookie, stop), daemon=True)
+                   for _ in range(args.sse)]
+        for t in holders:
+            t.start()
+        try:
+            subprocess.run(cmd, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        finally:
+            stop.set()
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bandingkan throughput gunicorn sync / gthread / gevent')
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--requests', type=int, default=None)
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--sse', type=int, default=2, help='Koneksi SSE yang ditahan selama run')
+    parser.add_argument('--json', help='Tulis hasil semua mode ke file JSON')
+    args = parser.parse_args()
+
+    cookie = _session_cookie() if args.sse else None
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        print(f"▶ {mode} ...", flush=True)
+        results[mode] = run_mode(mode, args, cookie)
+
+    base_mode = next(iter(results))
+    base = results[base_mode]['overall']
+    print(f"\n{'mode':<10}{'req':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}   vs {base_mode}")
+    for mode, result in results.items():
+        o = result['overall']
+        gain = (o['rps'] / base['rps'] - 1) * 100 if base['rps'] else 0
+        print(f"{mode:<10}{o['requests']:>8}{o['errors']:>6}{o['rps']:>9.1f}{o['p50_ms']:>9.1f}"
+              f"{o['p95_ms']:>9.1f}{o['p99_ms']:>9.1f}   {gain:+.0f}% rps")
+
+    endpoints = sorted({e for r in results.values() for e in r['endpoints']})
+    print(f"\n{'p50 ms':<18}" + ''.join(f"{m:>10}" for m in results))
+    for name in endpoints:
+        cells = [r['endpoints'].get(name, {}).get('p50_ms') for r in results.values()]
+        print(f"{name:<18}" + ''.join(f"{c:>10.1f}" if c is not None else f"{'-':>10}" for c in cells))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'benchmark': 'serving', 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                       'concurrency': args.concurrency, 'mix': args.mix, 'sse': args.sse,
+                       'results': results}, f, indent=2)
+        print(f"Hasil ditulis ke {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,116 @@ from dotenv import load_dotenv
 # Load .env file
 load_dotenv()
 
+# ============================================================
+# Mode serving gunicorn — SERVING_MODE = sync | gthread | gevent
+# ============================================================
+# Dipakai gunicorn.conf.py (worker_class, workers, threads) dan Config di
+# bawah (pool DB per proses, durasi stream SSE). Audit kompatibilitas
+# blocking call: lihat serving.py.
+#   sync     4 proses × 1 request. Request lambat = 25% kapasitas hilang.
+#            SSE live dimatikan (tiap tab dashboard menahan satu worker).
+#   gthread  4 proses × N thread. Tanpa monkey patch — semua library aman.
+#            Pool DB per proses ≈ jumlah thread.
+#   gevent   4 proses × ratusan greenlet (monkey patch socket/time/thread,
+#            PyMySQL pure-Python jadi kooperatif). Pool DB dibatasi,
+#            greenlet antri koneksi (pool_timeout). Butuh paket `gevent`.
+SERVING_PROFILES = {
+    'sync': {
+        'worker_class': 'sync', 'workers': 4, 'threads': 1, 'worker_connections': 1,
+        'pool_timeout': 30, 'live_stream': False, 'live_stream_max_seconds': 25,
+    },
+    'gthread': {
+        'worker_class': 'gthread', 'workers': 4, 'threads': 8, 'worker_connections': 8,
+        'pool_timeout': 30, 'live_stream': True, 'live_stream_max_seconds': 120,
+    },
+    'gevent': {
+        'worker_class': 'gevent', 'workers': 4, 'threads': 1, 'worker_connections': 200,
+        'pool_timeout': 10, 'live_stream': True, 'live_stream_max_seconds': 300,
+    },
+}
+
+
+def serving_profile(mode=None):
+    """Profil SERVING_MODE + override env WEB_WORKERS / WEB_THREADS / WEB_WORKER_CONNECTIONS."""
+    mode = (mode or os.environ.get('SERVING_MODE', 'sync')).lower()
+    profile = dict(SERVING_PROFILES.get(mode, SERVING_PROFILES['sync']), mode=mode)
+    for key, env in (('workers', 'WEB_WORKERS'), ('threads', 'WEB_THREADS'),
+                     ('worker_connections', 'WEB_WORKER_CONNECTIONS')):
+        if os.environ.get(env):
+            profile[key] = int(os.environ[env])
+    return profile
+
+
+# ============================================================
+# Pool koneksi DB per proses — diturunkan dari model worker
+# ============================================================
+# Semua proses berbagi max_connections MySQL (default MySQL 8: 151):
+#   web     = workers × (pool_size + max_overflow)
+#   worker  = findmy_worker.py (DB_POOL_ROLE=worker): loop + job locate
+# Dulu tiap proses 10 + 20 → 4 web + findmy-worker = 150 koneksi, pas di
+# batas tanpa sisa untuk mysqldump / migrasi / manage.py.
+# Sekarang pool_size = request bersamaan per proses (threads / greenlet)
+# + koneksi background (job jobs.py, locate FindMy), dibatasi
+# DB_CONNECTION_BUDGET dibagi rata ke worker web. Override langsung:
+# DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT.
+# Kejenuhan pool (checkout wait, overflow, timeout, pre-ping gagal):
+# GET /api/db/pool, /metrics, benchmarks/bench_pool.py.
+DB_CONNECTION_BUDGET = int(os.environ.get('DB_CONNECTION_BUDGET', 120))
+POOL_BACKGROUND_CONNECTIONS = 2
+WORKER_POOL = {'pool_size': 2, 'max_overflow': 2}
+
+
+def pool_profile(profile=None, role=None):
+    """pool_size / max_overflow / pool_timeout untuk proses ini (role web | worker)."""
+    profile = profile or serving_profile()
+    role = (role or os.environ.get('DB_POOL_ROLE', 'web')).lower()
+    if role == 'worker':
+        pool = dict(WORKER_POOL)
+    else:
+        if profile['worker_class'] == 'gthread':
+            concurrency = profile['threads']
+        elif profile['worker_class'] == 'gevent':
+            concurrency = profile['worker_connections']
+        else:
+            concurrency = 1
+        wanted = concurrency + POOL_BACKGROUND_CONNECTIONS
+        web_budget = DB_CONNECTION_BUDGET - sum(WORKER_POOL.values())
+        per_process = max(2, web_budget // max(1, profile['workers']))
+        size = min(wanted, per_process)
+        pool = {'pool_size': size,
+                'max_overflow': max(0, min(per_process - size, max(2, wanted // 4)))}
+    pool['pool_timeout'] = profile['pool_timeout']
+    pool['role'] = role
+    for key, env in (('pool_size', 'DB_POOL_SIZE'), ('max_overflow', 'DB_MAX_OVERFLOW'),
+                     ('pool_timeout', 'DB_POOL_TIMEOUT')):
+        if os.environ.get(env):
+            pool[key] = int(os.environ[env])
+    return pool
+
+
+def pool_budget(profile=None):
+    """Total koneksi maksimum semua proses (web + findmy-worker) vs DB_CONNECTION_BUDGET."""
+    profile = profile or serving_profile()
+    web = pool_profile(profile, 'web')
+    worker = pool_profile(profile, 'worker')
+    per_web = web['pool_size'] + web['max_overflow']
+    per_worker = worker['pool_size'] + worker['max_overflow']
+    total = per_web * profile['workers'] + per_worker
+    return {
+        'mode': profile['mode'],
+        'web_workers': profile['workers'],
+        'per_web_process': per_web,
+        'findmy_worker': per_worker,
+        'total': total,
+        'budget': DB_CONNECTION_BUDGET,
+        'over_budget': total > DB_CONNECTION_BUDGET,
+    }
+
+
+_SERVING = serving_profile()
+_POOL = pool_profile(_SERVING)
+
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY', 'kartu-pintar-secret-key-poltekkad-2025-change-in-production')
@@ -24,11 +134,14 @@ class Config:
         f'mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SERVING_MODE = _SERVING['mode']
+    DB_POOL_ROLE = _POOL['role']
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_recycle': 3600,
         'pool_pre_ping': True,
-        'pool_size': 10,
-        'max_overflow': 20,
+        'pool_size': _POOL['pool_size'],
+        'max_overflow': _POOL['max_overflow'],
+        'pool_timeout': _POOL['pool_timeout'],
     }
 
     # Session
@@ -55,6 +168,129 @@ class Config:
 
     # Interval update lokasi otomatis (dalam detik, default 1 menit)
     FINDMY_UPDATE_INTERVAL = int(os.environ.get('FINDMY_UPDATE_INTERVAL', 60))
+    # Start loop update lokasi di proses web (leader gunicorn / python app.py).
+    # 0 kalau pakai service findmy_worker.py terpisah.
+    FINDMY_AUTO_START = os.environ.get('FINDMY_AUTO_START', '1').lower() in ('1', 'true', 'yes')
+
+    # Cache device list Google Find Hub (dalam detik, default 1 jam).
+    # Device list jarang berubah — tanpa cache tiap cycle worker melakukan
+    # round trip Nova + re-upload EID. Refresh manual: tombol di admin page.
+    FINDMY_DEVICE_LIST_TTL = int(os.environ.get('FINDMY_DEVICE_LIST_TTL', 3600))
+
+    # Status worker dibaca web dari tabel findmy_worker_status (ditulis
+    # findmy_worker.py / gunicorn leader). Di-cache per proses N detik.
+    FINDMY_STATUS_CACHE_SECONDS = int(os.environ.get('FINDMY_STATUS_CACHE_SECONDS', 5))
+
+    # ============================================================
+    # Live updates (Server-Sent Events) — /api/live/stream
+    # ============================================================
+    # Satu koneksi SSE ditutup server setelah N detik lalu browser reconnect
+    # otomatis (Last-Event-ID). Dengan sync gunicorn worker jaga < timeout (30s).
+    # Default mati di SERVING_MODE=sync: stream dijawab 204 dan halaman
+    # kembali ke polling / data saat load.
+    LIVE_STREAM_ENABLED = os.environ.get('LIVE_STREAM_ENABLED', '1' if _SERVING['live_stream'] else '0') == '1'
+    LIVE_STREAM_MAX_SECONDS = int(os.environ.get('LIVE_STREAM_MAX_SECONDS', _SERVING['live_stream_max_seconds']))
+    LIVE_STREAM_POLL_INTERVAL = float(os.environ.get('LIVE_STREAM_POLL_INTERVAL', 1.0))
+    # Event lebih tua dari ini dihapus (client yang reconnect cukup butuh beberapa detik terakhir)
+    LIVE_EVENT_RETENTION_SECONDS = int(os.environ.get('LIVE_EVENT_RETENTION_SECONDS', 600))
+    # Id event yang terlewati (commit lebih lambat dari id sesudahnya) dibaca ulang selama N detik
+    LIVE_EVENT_LATE_SECONDS = int(os.environ.get('LIVE_EVENT_LATE_SECONDS', 5))
+
+    # ============================================================
+    # Bulk provisioning user (provisioning.py)
+    # ============================================================
+    # Jumlah proses untuk hash password pbkdf2 (0 = otomatis, min(4, CPU))
+    PROVISION_PROCESSES = int(os.environ.get('PROVISION_PROCESSES', 0))
+    # Jumlah user per INSERT + commit
+    PROVISION_BATCH_SIZE = int(os.environ.get('PROVISION_BATCH_SIZE', 200))
+
+    # ============================================================
+    # Alokasi ID dari tabel id_sequence (id_allocator.py)
+    # ============================================================
+    # Jumlah nomor yang di-lease per proses sekaligus. trx_id besar supaya
+    # jarang ke DB; kartu_id 1 supaya nomor kartu tetap berurutan tanpa lubang.
+    TRX_ID_LEASE_SIZE = int(os.environ.get('TRX_ID_LEASE_SIZE', 100))
+    KARTU_ID_LEASE_SIZE = int(os.environ.get('KARTU_ID_LEASE_SIZE', 1))
+
+    # ============================================================
+    # Bulk import anggota CSV/XLSX (anggota_import.py)
+    # ============================================================
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+    # Batas ukuran upload khusus halaman import (MAX_CONTENT_LENGTH global tetap 5MB untuk foto)
+    IMPORT_MAX_CONTENT_LENGTH = int(os.environ.get('IMPORT_MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+
+    # ============================================================
+    # Hapus anggota per chunk (anggota_deletion.py)
+    # ============================================================
+    DELETE_CHUNK_SIZE = int(os.environ.get('DELETE_CHUNK_SIZE', 1000))
+    # Jeda antar chunk (detik) — beri giliran lock ke transaksi pembayaran
+    DELETE_CHUNK_PAUSE = float(os.environ.get('DELETE_CHUNK_PAUSE', 0.05))
+
+    # ============================================================
+    # Cache identitas user login per proses (identity.py), detik; 0 = nonaktif
+    # ============================================================
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+
+    # ============================================================
+    # Cache JWT terverifikasi per proses (jwt_auth.py), jumlah token; 0 = nonaktif
+    # ============================================================
+    JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', 2048))
+
+    # ============================================================
+    # Throttling login / 2FA (throttle.py) — "burst:per_menit" per IP / per user
+    # ============================================================
+    THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', '1') == '1'
+    THROTTLE_LOGIN_IP = os.environ.get('THROTTLE_LOGIN_IP', '60:30')
+    # Bucket user hanya dipakai oleh percobaan GAGAL (login: per username + IP)
+    THROTTLE_LOGIN_USER = os.environ.get('THROTTLE_LOGIN_USER', '10:5')
+    THROTTLE_TOTP_IP = os.environ.get('THROTTLE_TOTP_IP', '60:30')
+    THROTTLE_TOTP_USER = os.environ.get('THROTTLE_TOTP_USER', '10:5')
+    THROTTLE_PRUNE_AFTER = int(os.environ.get('THROTTLE_PRUNE_AFTER', 86400))  # detik idle
+    # request.remote_addr = IP client hanya tanpa reverse proxy. Di belakang
+    # nginx / load balancer: jumlah proxy tepercaya → ProxyFix (X-Forwarded-For)
+    TRUST_PROXY_HOPS = int(os.environ.get('TRUST_PROXY_HOPS', 0))
+
+    # ============================================================
+    # Retensi lokasi_history (lokasi_retention.py, manage.py lokasi-maintenance)
+    # ============================================================
+    # Titik raw lebih tua dari N hari di-downsample ke lokasi_track_harian lalu
+    # dibuang (partisi bulanan di-DROP utuh → raw efektif N hari s.d. N + 1 bulan)
+    LOKASI_RAW_RETENTION_DAYS = int(os.environ.get('LOKASI_RAW_RETENTION_DAYS', 180))
+    # Jejak harian (±1 baris per anggota per hari) disimpan N hari; 0 = selamanya
+    LOKASI_TRACK_RETENTION_DAYS = int(os.environ.get('LOKASI_TRACK_RETENTION_DAYS', 0))
+    LOKASI_TRACK_INTERVAL_MINUTES = int(os.environ.get('LOKASI_TRACK_INTERVAL_MINUTES', 15))
+    LOKASI_PARTITIONS_AHEAD = int(os.environ.get('LOKASI_PARTITIONS_AHEAD', 3))  # bulan
+    # Detik maksimum ALTER partisi menunggu metadata lock sebelum mundur & coba lagi
+    LOKASI_LOCK_WAIT_TIMEOUT = int(os.environ.get('LOKASI_LOCK_WAIT_TIMEOUT', 5))
+
+    # ============================================================
+    # Jejak peta (tracks.py, GET /api/lacak/<kartu_id>/track)
+    # ============================================================
+    TRACK_TOLERANCE_METERS = float(os.environ.get('TRACK_TOLERANCE_METERS', 15))  # Douglas–Peucker
+    TRACK_GAP_MINUTES = float(os.environ.get('TRACK_GAP_MINUTES', 30))  # jeda > N menit = segmen baru
+    TRACK_STAY_RADIUS_METERS = float(os.environ.get('TRACK_STAY_RADIUS_METERS', 50))
+    TRACK_STAY_MINUTES = float(os.environ.get('TRACK_STAY_MINUTES', 10))
+    TRACK_DEFAULT_DAYS = int(os.environ.get('TRACK_DEFAULT_DAYS', 7))
+    TRACK_MAX_DAYS = int(os.environ.get('TRACK_MAX_DAYS', 366))
+    TRACK_CACHE_SIZE = int(os.environ.get('TRACK_CACHE_SIZE', 256))  # entri per proses; 0 = mati
+
+    # ============================================================
+    # Instrumentasi query & profil request lambat (profiling.py) — opt-in
+    # ============================================================
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+    PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS', 500))
+    # Fraksi request (0..1) yang dijalankan di bawah profiler; trace disimpan kalau lambat
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+    PROFILING_PROFILER = os.environ.get('PROFILING_PROFILER', 'cprofile')  # cprofile | pyinstrument
+    PROFILING_EXCLUDE = os.environ.get('PROFILING_EXCLUDE', 'static,api_live_stream')
+    PROFILING_SLOW_KEEP_DAYS = int(os.environ.get('PROFILING_SLOW_KEEP_DAYS', 7))
+
+    # ============================================================
+    # Metrics Prometheus GET /metrics (metrics.py)
+    # Tanpa METRICS_TOKEN → /metrics hanya bisa diakses dari localhost
+    # ============================================================
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
     # ============================================================
     # Info kontak untuk halaman "Kartu Ditemukan" (publik, tanpa login)
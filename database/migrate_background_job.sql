@@ -0,0 +1,29 @@
+-- ============================================================
+-- MIGRASI: Tabel background_job — job admin di background + progress
+-- (bulk create user, import anggota, hapus anggota massal)
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS background_job (
+    id VARCHAR(32) PRIMARY KEY,
+    jenis VARCHAR(50) NOT NULL,
+    status ENUM('pending', 'running', 'done', 'error') NOT NULL DEFAULT 'pending',
+    progress_done INT NOT NULL DEFAULT 0,
+    progress_total INT NOT NULL DEFAULT 0,
+    message VARCHAR(255) NULL,
+    result TEXT NULL,
+    error VARCHAR(255) NULL,
+    created_by_user_id INT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+
+    INDEX idx_jenis (jenis),
+    INDEX idx_status (status),
+
+    CONSTRAINT fk_background_job_user FOREIGN KEY (created_by_user_id)
+        REFERENCES users(id) ON DELETE SET NULL
+) ENGINE=InnoDB;
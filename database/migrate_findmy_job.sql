@@ -0,0 +1,30 @@
+-- ============================================================
+-- MIGRASI: Tabel findmy_job untuk locate / update-all asynchronous
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS findmy_job (
+    id VARCHAR(32) PRIMARY KEY,
+    jenis ENUM('locate', 'update_all') NOT NULL,
+    target VARCHAR(100) NULL,
+    kartu_id VARCHAR(20) NULL,
+    status ENUM('pending', 'running', 'done', 'error') NOT NULL DEFAULT 'pending',
+    result TEXT NULL,
+    error VARCHAR(255) NULL,
+    requested_by_user_id INT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+
+    INDEX idx_target (target),
+    INDEX idx_status (status),
+
+    CONSTRAINT fk_findmy_job_user FOREIGN KEY (requested_by_user_id)
+        REFERENCES users(id) ON DELETE SET NULL
+) ENGINE=InnoDB;
+
+-- Job lama boleh dibersihkan berkala:
+-- DELETE FROM findmy_job WHERE created_at < NOW() - INTERVAL 7 DAY;
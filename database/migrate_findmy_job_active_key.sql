@@ -0,0 +1,18 @@
+-- ============================================================
+-- MIGRASI: findmy_job.active_key — satu job locate / update-all aktif
+-- per target, dijamin UNIQUE di DB (bukan lock per proses), lihat
+-- FindMyLocationService.submit_job (findmy_service.py).
+-- heartbeat_at diperbarui job yang berjalan (start + tiap tracker); job
+-- dianggap basi dari heartbeat, bukan dari umur created_at.
+-- Jalankan SQL ini di MySQL setelah update kode
+-- ============================================================
+
+USE kartu_pintar;
+
+ALTER TABLE findmy_job
+    ADD COLUMN active_key VARCHAR(120) NULL AFTER status,
+    ADD COLUMN heartbeat_at DATETIME NULL AFTER finished_at,
+    ADD UNIQUE INDEX uq_findmy_job_active_key (active_key);
+
+-- Job lama yang masih tercatat pending/running tidak memegang key (NULL),
+-- jadi submit berikutnya langsung membuat job baru.
@@ -0,0 +1,13 @@
+-- ============================================================
+-- MIGRASI: Tabel findmy_worker_status — status worker lintas proses
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS findmy_worker_status (
+    id VARCHAR(30) PRIMARY KEY,
+    status TEXT NULL,
+    heartbeat_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
@@ -0,0 +1,17 @@
+-- ============================================================
+-- MIGRASI: Tabel id_sequence — alokasi kartu_id & trx_id berurutan
+-- (UPDATE atomik + lease range per proses, lihat id_allocator.py)
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+--
+-- Baris per sequence dibuat otomatis saat pertama dipakai, dengan nilai awal
+-- diambil dari data yang sudah ada (nomor KP-YYYY-NNN tertinggi, dst).
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS id_sequence (
+    name VARCHAR(50) PRIMARY KEY,
+    next_value BIGINT NOT NULL DEFAULT 1,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
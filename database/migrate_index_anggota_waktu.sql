@@ -0,0 +1,32 @@
+-- ============================================================
+-- MIGRASI: Index komposit riwayat per anggota
+--   lokasi_history (anggota_id, waktu, latitude, longitude)
+--   transaksi      (anggota_id, created_at)
+-- Query `WHERE anggota_id = ? ORDER BY waktu/created_at DESC LIMIT n`
+-- (riwayat lokasi, /api/lacak, riwayat transaksi anggota) sebelumnya
+-- memakai idx_anggota_id lalu filesort SEMUA baris anggota. Dengan index
+-- komposit MySQL membaca n entri index terakhir saja; query jejak yang
+-- hanya butuh (waktu, lat, lng) cukup membaca index (covering).
+--
+-- Online DDL (ALGORITHM=INPLACE, LOCK=NONE): tabel tetap bisa dibaca &
+-- ditulis selama index dibangun.
+-- Cek plan setelah migrasi: python benchmarks/bench_explain.py
+-- ============================================================
+
+USE kartu_pintar;
+
+ALTER TABLE lokasi_history
+    ADD INDEX idx_lokasi_anggota_waktu (anggota_id, waktu, latitude, longitude),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE transaksi
+    ADD INDEX idx_transaksi_anggota_created (anggota_id, created_at),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Index anggota_id tunggal sekarang redundant (prefix index komposit, juga
+-- cukup untuk foreign key) — buang untuk menghemat biaya INSERT.
+-- Namanya tergantung cara tabel dibuat: schema.sql → idx_anggota_id,
+-- `manage.py init-db` (create_all) → ix_<tabel>_anggota_id. Cek dulu:
+--     SHOW INDEX FROM lokasi_history;  SHOW INDEX FROM transaksi;
+-- ALTER TABLE lokasi_history DROP INDEX idx_anggota_id, ALGORITHM=INPLACE, LOCK=NONE;
+-- ALTER TABLE transaksi DROP INDEX idx_anggota_id, ALGORITHM=INPLACE, LOCK=NONE;
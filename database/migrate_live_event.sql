@@ -0,0 +1,18 @@
+-- ============================================================
+-- MIGRASI: Tabel live_event untuk Server-Sent Events (/api/live/stream)
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS live_event (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    jenis VARCHAR(30) NOT NULL,
+    payload TEXT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB;
+
+-- Event lama dihapus otomatis oleh aplikasi (LIVE_EVENT_RETENTION_SECONDS).
@@ -0,0 +1,36 @@
+-- ============================================================
+-- MIGRASI: Retensi lokasi_history — tabel jejak harian hasil downsample
+-- (lokasi_track_harian), lihat lokasi_retention.py
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py lokasi-maintenance --status` — create_all hanya bikin tabel baru)
+--
+-- Konversi lokasi_history ke partisi bulanan (sekali, copy tabel penuh —
+-- jalankan saat maintenance window, lihat dulu SQL-nya dengan --dry-run):
+--     python manage.py lokasi-maintenance --init-partitions [--dry-run]
+-- Ini MEMBUANG foreign key fk_lokasi_anggota & fk_lokasi_scanned_by
+-- (InnoDB tidak mendukung FK di tabel berpartisi) dan mengganti PK jadi
+-- (id, waktu). Hapus anggota tetap menghapus riwayat lokasinya
+-- (anggota_deletion.py).
+--
+-- Setelah itu jadwalkan rotasi harian (cron):
+--     python manage.py lokasi-maintenance
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS lokasi_track_harian (
+    anggota_id INT NOT NULL,
+    tanggal DATE NOT NULL,
+    jumlah_titik INT NOT NULL DEFAULT 0,
+    waktu_awal DATETIME NOT NULL,
+    waktu_akhir DATETIME NOT NULL,
+    lat_min FLOAT NOT NULL,
+    lat_max FLOAT NOT NULL,
+    lng_min FLOAT NOT NULL,
+    lng_max FLOAT NOT NULL,
+    track TEXT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (anggota_id, tanggal),
+    INDEX idx_tanggal (tanggal)
+) ENGINE=InnoDB;
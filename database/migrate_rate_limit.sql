@@ -0,0 +1,20 @@
+-- ============================================================
+-- MIGRASI: Tabel rate_limit_bucket — throttling login & 2FA
+-- (token bucket per IP / username, dipakai bersama semua worker,
+-- lihat throttle.py)
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS rate_limit_bucket (
+    `key` VARCHAR(191) PRIMARY KEY,
+    scope VARCHAR(20) NOT NULL,
+    tokens DOUBLE NOT NULL,
+    updated_at DOUBLE NOT NULL,
+    allowed BIGINT NOT NULL DEFAULT 0,
+    rejected BIGINT NOT NULL DEFAULT 0,
+    INDEX ix_rate_limit_bucket_scope (scope),
+    INDEX ix_rate_limit_bucket_updated_at (updated_at)
+) ENGINE=InnoDB;
@@ -0,0 +1,37 @@
+-- ============================================================
+-- MIGRASI: Tabel rollup_transaksi_harian — agregat harian transaksi
+-- per (tanggal, jenis, metode, operator, status), lihat rollups.py
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru,
+--  TANPA backfill → lanjutkan dengan `python manage.py rebuild-rollups`)
+--
+-- Backfill di bawah mengisi tanggal yang belum punya baris rollup dari
+-- data lama — aman dijalankan ulang. Kalau aplikasi baru sudah sempat
+-- mencatat transaksi hari ini sebelum migrasi, hitung ulang hari ini:
+--     python manage.py rebuild-rollups --start YYYY-MM-DD
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS rollup_transaksi_harian (
+    tanggal DATE NOT NULL,
+    jenis VARCHAR(20) NOT NULL,
+    metode VARCHAR(20) NOT NULL DEFAULT '',
+    operator_id INT NOT NULL DEFAULT 0,
+    status VARCHAR(20) NOT NULL,
+    jumlah INT NOT NULL DEFAULT 0,
+    total_nominal BIGINT NOT NULL DEFAULT 0,
+    total_hutang_ditambah BIGINT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (tanggal, jenis, metode, operator_id, status)
+) ENGINE=InnoDB;
+
+-- Backfill dari tabel transaksi (tanggal yang sudah ada di rollup dilewati)
+INSERT INTO rollup_transaksi_harian
+    (tanggal, jenis, metode, operator_id, status, jumlah, total_nominal, total_hutang_ditambah, updated_at)
+SELECT DATE(t.created_at), t.jenis, COALESCE(t.metode, ''), COALESCE(t.operator_id, 0), t.status,
+       COUNT(*), COALESCE(SUM(t.nominal), 0), COALESCE(SUM(t.hutang_ditambah), 0), NOW()
+FROM transaksi t
+WHERE DATE(t.created_at) NOT IN (SELECT DISTINCT r.tanggal FROM rollup_transaksi_harian r)
+GROUP BY DATE(t.created_at), t.jenis, COALESCE(t.metode, ''), COALESCE(t.operator_id, 0), t.status;
@@ -0,0 +1,25 @@
+-- ============================================================
+-- MIGRASI: Tabel slow_request_log — request lambat + daftar query
+-- & trace profiler (opt-in PROFILING_ENABLED, lihat profiling.py)
+-- Jalankan SQL ini di MySQL setelah update kode
+-- (atau cukup `python manage.py init-db` — create_all hanya bikin tabel baru)
+-- ============================================================
+
+USE kartu_pintar;
+
+CREATE TABLE IF NOT EXISTS slow_request_log (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    created_at DATETIME NOT NULL,
+    method VARCHAR(10) NOT NULL,
+    path VARCHAR(255) NOT NULL,
+    endpoint VARCHAR(100) NOT NULL,
+    status INT NOT NULL,
+    total_ms DOUBLE NOT NULL,
+    db_ms DOUBLE NOT NULL,
+    query_count INT NOT NULL,
+    user_id INT NULL,
+    queries TEXT NULL,
+    profile TEXT NULL,
+    INDEX ix_slow_request_log_created_at (created_at),
+    INDEX ix_slow_request_log_endpoint (endpoint)
+) ENGINE=InnoDB;
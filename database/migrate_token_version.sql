@@ -0,0 +1,21 @@
+-- ============================================================
+-- MIGRASI: Kolom users.token_version — revocation JWT mobile
+-- (lihat jwt_auth.py)
+-- Jalankan SQL ini di MySQL setelah update kode.
+--
+-- Token JWT membawa claim `tv` = token_version saat login. Versi naik
+-- otomatis saat password, role, status aktif, atau link anggota user
+-- berubah → token lama ditolak ("Token dicabut, silakan login ulang").
+-- Token yang dibuat sebelum migrasi (tanpa claim tv) dianggap versi 0,
+-- jadi tetap berlaku sampai user itu berubah / token expired.
+-- ============================================================
+
+USE kartu_pintar;
+
+ALTER TABLE users
+  ADD COLUMN token_version INT NOT NULL DEFAULT 0 AFTER totp_backup_codes;
+
+-- ============================================================
+-- VERIFIKASI
+-- ============================================================
+--   SHOW COLUMNS FROM users LIKE 'token_version';
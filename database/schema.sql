@@ -98,7 +98,7 @@ CREATE TABLE IF NOT EXISTS transaksi (
     created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
     INDEX idx_trx_id (trx_id),
-    INDEX idx_anggota_id (anggota_id),
+    INDEX idx_transaksi_anggota_created (anggota_id, created_at),
     INDEX idx_created_at (created_at),
     INDEX idx_jenis (jenis),
 
@@ -121,7 +121,7 @@ CREATE TABLE IF NOT EXISTS lokasi_history (
     scanned_by_user_id INT NULL,
     waktu DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
 
-    INDEX idx_anggota_id (anggota_id),
+    INDEX idx_lokasi_anggota_waktu (anggota_id, waktu, latitude, longitude),
     INDEX idx_waktu (waktu),
     INDEX idx_scanned_by (scanned_by_user_id),
 
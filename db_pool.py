@@ -0,0 +1,167 @@
+"""
+Kartu Pintar - Pool Koneksi DB: Ukuran & Kesehatan
+===================================================
+
+Ukuran pool per proses diturunkan dari model worker (pool_profile di
+config.py). Modul ini membuat kejenuhan pool kelihatan — per proses,
+lewat GET /api/db/pool (admin), dan di /metrics kalau Prometheus aktif:
+
+  checkout wait      waktu pool.connect() s.d. koneksi didapat (antri
+                     koneksi bebas + buka koneksi baru + pre-ping).
+                     Pool penuh → request menunggu sampai pool_timeout
+                     lalu TimeoutError ("QueuePool limit ... reached").
+  overflow           koneksi di atas pool_size yang sedang terbuka, dan
+                     berapa checkout yang butuh koneksi di atas pool_size.
+                     Sering overflow = pool_size terlalu kecil.
+  pre-ping gagal     koneksi idle yang ternyata putus (MySQL wait_timeout,
+                     restart DB) — pool membuang semua koneksi lama.
+  invalidasi lain    koneksi putus di tengah query (disconnect).
+
+Checkout wait tidak punya event pool sendiri, jadi engine memakai
+InstrumentedQueuePool (QueuePool yang membungkus connect()); overflow,
+pre-ping dan invalidasi dari event pool checkout / checkin / invalidate.
+
+Stress test saturasi alur kasir: python benchmarks/bench_pool.py
+"""
+
+import os
+import time
+from collections import deque
+from threading import Lock
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+import metrics
+
+WAIT_SAMPLES = 4096  # checkout wait terakhir untuk p50 / p95
+
+_lock = Lock()
+_stats = {}
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+        _stats.update({
+            'checkouts': 0,
+            'wait_total': 0.0,
+            'wait_max': 0.0,
+            'waits': deque(maxlen=WAIT_SAMPLES),
+            'timeouts': 0,
+            'overflow_checkouts': 0,
+            'overflow_peak': 0,
+            'checked_out_peak': 0,
+            'preping_failures': 0,
+            'invalidations': 0,
+            'started_at': time.time(),
+        })
+
+
+reset_stats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mencatat lama menunggu koneksi dan timeout pool."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            _record_timeout(time.perf_counter() - started)
+            raise
+        _record_checkout(self, time.perf_counter() - started)
+        return conn
+
+
+def _record_checkout(pool, wait):
+    overflow = max(0, pool.overflow())
+    checked_out = pool.checkedout()
+    beyond_size = checked_out > pool.size()
+    with _lock:
+        _stats['checkouts'] += 1
+        _stats['wait_total'] += wait
+        _stats['wait_max'] = max(_stats['wait_max'], wait)
+        _stats['waits'].append(wait)
+        _stats['overflow_peak'] = max(_stats['overflow_peak'], overflow)
+        _stats['checked_out_peak'] = max(_stats['checked_out_peak'], checked_out)
+        if beyond_size:
+            _stats['overflow_checkouts'] += 1
+    metrics.observe_pool_checkout(wait, overflow, beyond_size)
+
+
+def _record_timeout(wait):
+    with _lock:
+        _stats['timeouts'] += 1
+        _stats['wait_max'] = max(_stats['wait_max'], wait)
+    metrics.observe_pool_timeout()
+    print(f"[DB Pool] ⚠️  pid={os.getpid()} pool habis, timeout setelah {wait:.1f}s", flush=True)
+
+
+def configure_pool(app):
+    """Pakai InstrumentedQueuePool untuk engine app (panggil SEBELUM db.init_app)."""
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    # SQLite in-memory memakai StaticPool / SingletonThreadPool — biarkan
+    if 'poolclass' not in options and 'pool_size' in options and ':memory:' not in uri and uri != 'sqlite://':
+        options['poolclass'] = InstrumentedQueuePool
+
+
+def init_pool_monitoring(app):
+    """Event pool: overflow saat checkin, pre-ping gagal, invalidasi koneksi."""
+    from models import db
+
+    with app.app_context():
+        engine = db.engine
+    if not isinstance(engine.pool, QueuePool):
+        return
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_conn, record):
+        metrics.set_pool_overflow(max(0, engine.pool.overflow()))
+
+    @event.listens_for(engine, 'invalidate')
+    def _on_invalidate(dbapi_conn, record, exception):
+        # Pre-ping gagal di checkout → InvalidatePoolError; selain itu putus di tengah query
+        reason = 'pre_ping' if isinstance(exception, exc.InvalidatePoolError) else 'disconnect'
+        with _lock:
+            _stats['preping_failures' if reason == 'pre_ping' else 'invalidations'] += 1
+        metrics.observe_pool_invalidate(reason)
+        print(f"[DB Pool] ⚠️  pid={os.getpid()} koneksi di-invalidate ({reason}): {exception}", flush=True)
+
+
+def pool_status(engine):
+    """Status pool proses ini + statistik checkout sejak start / reset."""
+    pool = engine.pool
+    with _lock:
+        waits = sorted(_stats['waits'])
+        data = {k: v for k, v in _stats.items() if k != 'waits'}
+    checkouts = data.pop('checkouts')
+    wait_total = data.pop('wait_total')
+    status = {
+        'pid': os.getpid(),
+        'pool_class': type(pool).__name__,
+        'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data.pop('started_at'))),
+        'checkouts': checkouts,
+        'wait_mean_ms': round(wait_total / checkouts * 1000, 2) if checkouts else None,
+        'wait_p50_ms': round(_percentile(waits, 50) * 1000, 2) if waits else None,
+        'wait_p95_ms': round(_percentile(waits, 95) * 1000, 2) if waits else None,
+        'wait_max_ms': round(data.pop('wait_max') * 1000, 2),
+        **data,
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'pool_size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+        })
+    return status
+
+
+def _percentile(sorted_values, pct):
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
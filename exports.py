@@ -0,0 +1,220 @@
+"""
+Kartu Pintar - Export Transaksi & Riwayat Lokasi (CSV / XLSX)
+==============================================================
+
+Untuk rekonsiliasi pendapatan kantin & arsip lokasi — tanpa memuat semua
+baris ke memory seperti halaman /transaksi.
+
+  - Query Core (kolom saja, join anggota/operator di SQL) → tidak ada
+    objek ORM & tidak ada lazy-load relasi per baris.
+  - `yield_per` + `stream_results` → server-side cursor (PyMySQL SSCursor):
+    baris diambil per blok dari MySQL, memory konstan berapa pun datanya.
+  - CSV dikirim lewat generator (Response streaming) per blok baris.
+  - XLSX ditulis dengan openpyxl write_only (memory konstan, file temp)
+    lalu di-stream per chunk. XLSX baru terkirim setelah file selesai
+    ditulis — untuk data bertahun-tahun pakai CSV atau `manage.py export`.
+
+DIPAKAI OLEH:
+  - GET /transaksi/export?format=csv&start=2026-01-01&end=2026-01-31&jenis=Pembelian
+  - GET /riwayat-lokasi/export?format=xlsx&anggota=KP-2026-001
+  - python manage.py export transaksi|lokasi --out file.csv [filter...]
+"""
+
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from models import db, Anggota, Transaksi, LokasiHistory, User
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+YIELD_PER = 1000
+CSV_FLUSH_ROWS = 500
+_FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+class ExportFilterError(ValueError):
+    """Parameter filter export tidak valid."""
+
+
+# ============================================================
+# FILTER & QUERY
+# ============================================================
+
+def _parse_day(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ExportFilterError(f"{name} harus format YYYY-MM-DD: {value}")
+
+
+def _date_range(column, filters):
+    conditions = []
+    start = _parse_day(filters.get('start'), 'start')
+    end = _parse_day(filters.get('end'), 'end')
+    if start:
+        conditions.append(column >= start)
+    if end:
+        conditions.append(column < end + timedelta(days=1))  # end inklusif
+    return conditions
+
+
+def _anggota_condition(value):
+    """Filter anggota: kartu_id atau NRP."""
+    return db.or_(Anggota.kartu_id == value, Anggota.nrp == value)
+
+
+TRANSAKSI_HEADER = [
+    'trx_id', 'waktu', 'jenis', 'status', 'metode', 'kartu_id', 'nrp', 'nama',
+    'nominal', 'saldo_sebelum', 'saldo_sesudah', 'hutang_ditambah',
+    'keterangan', 'operator',
+]
+
+
+def transaksi_query(filters):
+    """SELECT transaksi (urut waktu) sesuai filter: start, end, jenis, status, metode, operator_id, anggota."""
+    operator = aliased(User)
+    stmt = select(
+        Transaksi.trx_id, Transaksi.created_at, Transaksi.jenis, Transaksi.status, Transaksi.metode,
+        Anggota.kartu_id, Anggota.nrp, Anggota.nama,
+        Transaksi.nominal, Transaksi.saldo_sebelum, Transaksi.saldo_sesudah, Transaksi.hutang_ditambah,
+        Transaksi.keterangan, operator.username,
+    ).join(Anggota, Transaksi.anggota_id == Anggota.id)\
+     .outerjoin(operator, Transaksi.operator_id == operator.id)
+
+    conditions = _date_range(Transaksi.created_at, filters)
+    for key, column in (('jenis', Transaksi.jenis), ('status', Transaksi.status), ('metode', Transaksi.metode)):
+        if filters.get(key):
+            conditions.append(column == filters[key])
+    if filters.get('operator_id'):
+        try:
+            conditions.append(Transaksi.operator_id == int(filters['operator_id']))
+        except (TypeError, ValueError):
+            raise ExportFilterError(f"operator_id harus angka: {filters['operator_id']}")
+    if filters.get('anggota'):
+        conditions.append(_anggota_condition(filters['anggota']))
+    return stmt.where(*conditions).order_by(Transaksi.created_at, Transaksi.id)
+
+
+LOKASI_HEADER = [
+    'waktu', 'kartu_id', 'nrp', 'nama', 'latitude', 'longitude',
+    'lokasi_nama', 'sumber', 'discan_oleh',
+]
+
+
+def lokasi_query(filters):
+    """SELECT lokasi_history (urut waktu) sesuai filter: start, end, sumber, anggota."""
+    scanner = aliased(User)
+    stmt = select(
+        LokasiHistory.waktu, Anggota.kartu_id, Anggota.nrp, Anggota.nama,
+        LokasiHistory.latitude, LokasiHistory.longitude, LokasiHistory.lokasi_nama,
+        LokasiHistory.sumber, scanner.username,
+    ).join(Anggota, LokasiHistory.anggota_id == Anggota.id)\
+     .outerjoin(scanner, LokasiHistory.scanned_by_user_id == scanner.id)
+
+    conditions = _date_range(LokasiHistory.waktu, filters)
+    if filters.get('sumber'):
+        conditions.append(LokasiHistory.sumber == filters['sumber'])
+    if filters.get('anggota'):
+        conditions.append(_anggota_condition(filters['anggota']))
+    return stmt.where(*conditions).order_by(LokasiHistory.waktu, LokasiHistory.id)
+
+
+EXPORTS = {
+    'transaksi': (TRANSAKSI_HEADER, transaksi_query),
+    'lokasi': (LOKASI_HEADER, lokasi_query),
+}
+
+
+def iter_rows(stmt, yield_per=YIELD_PER):
+    """Baris hasil query lewat server-side cursor, diambil per `yield_per`."""
+    result = db.session.execute(stmt.execution_options(yield_per=yield_per))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+# ============================================================
+# WRITER
+# ============================================================
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value  # cegah formula injection saat dibuka di Excel
+    return value
+
+
+def csv_chunks(header, rows, flush_rows=CSV_FLUSH_ROWS):
+    """Generator teks CSV, satu chunk per `flush_rows` baris."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow([_cell(v) for v in row])
+        if i % flush_rows == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def write_xlsx(header, rows, fp, sheet_title='Data'):
+    """Tulis XLSX (openpyxl write_only, memory konstan) ke file object biner."""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportFilterError("Export XLSX butuh paket 'openpyxl' (pip install openpyxl) — pakai format=csv.")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    ws.append(header)
+    for row in rows:
+        ws.append([_cell(v) for v in row])
+    wb.save(fp)
+
+
+def xlsx_chunks(header, rows, sheet_title='Data', chunk_size=64 * 1024):
+    """XLSX ke file temp, lalu di-stream per chunk (file temp dihapus setelahnya)."""
+    fd, path = tempfile.mkstemp(prefix='export_', suffix='.xlsx')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            write_xlsx(header, rows, fp, sheet_title)
+        with open(path, 'rb') as fp:
+            while True:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def export_chunks(kind, fmt, filters):
+    """
+    (generator chunk, mimetype, nama file). Query dibangun & divalidasi di
+    sini (ExportFilterError keluar sebelum response mulai streaming).
+    """
+    if kind not in EXPORTS:
+        raise ExportFilterError(f"Jenis export tidak dikenal: {kind}")
+    if fmt not in EXPORT_FORMATS:
+        raise ExportFilterError(f"Format harus salah satu dari: {', '.join(EXPORT_FORMATS)}")
+    header, build_query = EXPORTS[kind]
+    stmt = build_query(filters)
+    filename = f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    if fmt == 'csv':
+        return csv_chunks(header, iter_rows(stmt)), 'text/csv; charset=utf-8', filename
+    return (xlsx_chunks(header, iter_rows(stmt), sheet_title=kind),
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', filename)
@@ -0,0 +1,104 @@
+"""
+Kartu Pintar - Extension FindMy (lazy)
+=======================================
+
+Sebelumnya `import app` langsung membuat FindMyLocationService,
+mendaftarkan route, rebutan leader lock, dan menyalakan loop worker di
+level module — jadi SETIAP proses yang meng-import app (gunicorn worker,
+`manage.py`, seed-scale worker, benchmark, test) ikut menjalankan
+election dan loop pertama yang menyeret stack Google / browser
+(`nova_request → aas_token_retrieval → auth_flow → chrome_driver`:
+selenium, undetected_chromedriver, gpsoauth, protobuf).
+
+Sekarang:
+  - create_app() hanya memanggil `FindMy(app)`: daftarkan route
+    /api/findmy/* (murah), service belum dibuat.
+  - `findmy.service` — FindMyLocationService dibuat saat pertama dipakai
+    (request API FindMy, findmy_worker.py). GoogleFindMyTools tetap
+    di-import hanya saat locate / list device pertama (_load_tools).
+  - `findmy.autostart()` — leader election + loop worker kalau
+    FINDMY_AUTO_START=1. Dipanggil eksplisit oleh proses yang memang
+    melayani web: hook `post_worker_init` di gunicorn.conf.py dan
+    `python app.py`. Import biasa tidak pernah menyalakan worker.
+
+Ukur waktu import: python benchmarks/bench_import.py
+"""
+
+import os
+from threading import Lock
+
+from flask import current_app
+
+from serving import gevent_active
+
+
+class FindMy:
+    """Integrasi Google Find Hub per app, service dibuat saat pertama dipakai."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._service = None
+        self._lock = Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from findmy_service import register_findmy_routes
+
+        self.app = app
+        app.extensions['findmy'] = self
+        # Route memanggil findmy.<method> → diteruskan ke service (lazy)
+        register_findmy_routes(app, self)
+
+    @property
+    def service(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    from findmy_service import FindMyLocationService
+                    service = FindMyLocationService()
+                    service.init_app(self.app)
+                    self._service = service
+        return self._service
+
+    @property
+    def loaded(self):
+        return self._service is not None
+
+    def __getattr__(self, name):
+        # list_trackers, submit_job, get_job, get_status, start_worker, ...
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.service, name)
+
+    def autostart(self):
+        """Start loop worker (leader election antar worker gunicorn) kalau FINDMY_AUTO_START aktif."""
+        if not self.app.config.get('FINDMY_AUTO_START', True):
+            print("[FindMy] ⏸  FINDMY_AUTO_START=0 → worker tidak di-start otomatis "
+                  "(biasanya kalau kamu pakai findmy_worker.py service terpisah).", flush=True)
+            return False
+        if gevent_active():
+            # FcmReceiver (asyncio di thread sendiri) tidak didukung di proses
+            # yang di-monkey-patch — lihat audit di serving.py
+            print("[FindMy] ⏸  SERVING_MODE=gevent → loop FindMy tidak di-start di web, "
+                  "jalankan findmy_worker.py.", flush=True)
+            return False
+        try:
+            interval = self.app.config.get('FINDMY_UPDATE_INTERVAL', 60)
+            started = self.service.start_worker(interval=interval, require_leader=True)
+        except Exception as e:
+            import traceback
+            print(f"[FindMy] ❌ Integration gagal: {e}", flush=True)
+            print(traceback.format_exc(), flush=True)
+            return False
+        if started:
+            print(f"[FindMy] ✅ Integration aktif. Worker leader pid={os.getpid()}, interval={interval}s", flush=True)
+        else:
+            # Expected for non-leader gunicorn workers
+            print(f"[FindMy] ℹ️  Integration loaded (non-leader pid={os.getpid()}) — worker tidak jalan di sini", flush=True)
+        return started
+
+
+def get_findmy(app=None):
+    """Extension FindMy milik app (default current_app)."""
+    return (app or current_app).extensions['findmy']
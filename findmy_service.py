@@ -18,7 +18,7 @@ SETUP:
 3. pip install -r findmy_tools/requirements.txt
 4. python findmy_tools/main.py   (login Google pertama kali, butuh Chrome)
 5. Tambah tracker di Admin Panel → Monitoring → FindMy Trackers
-6. Aktifkan di app.py (lihat bawah file ini)
+6. Aktivasi: lihat findmy_ext.py (dan bagian bawah file ini)
 
 CATATAN:
 - Hanya bisa jalan di server/komputer (butuh Chrome untuk auth pertama kali)
@@ -29,12 +29,18 @@ CATATAN:
 import sys
 import os
 import time
+import json
+import uuid
 import hashlib
 import logging
 import traceback
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 from threading import Thread, Lock
 
+from metrics import observe_findmy_cycle, observe_findmy_locate, set_findmy_queue_depth
+from serving import start_background
+
 FINDMY_TOOLS_PATH = os.path.join(os.path.dirname(__file__), 'findmy_tools')
 if FINDMY_TOOLS_PATH not in sys.path:
     sys.path.insert(0, FINDMY_TOOLS_PATH)
@@ -112,6 +118,18 @@ def acquire_leader_lock():
 # SERVICE
 # ============================================================
 
+# Key baris status di tabel findmy_worker_status (cuma ada 1 loop aktif)
+_SHARED_STATUS_KEY = 'leader'
+# Baris yang heartbeat_at-nya = waktu terakhir refresh device list diminta
+# (admin ?refresh=1, tracker ditambah/diubah). Cache device list di proses
+# mana pun (web, findmy_worker.py) yang lebih tua dari ini dianggap basi.
+_DEVICE_REFRESH_KEY = 'device_refresh'
+
+# Job pending/running yang heartbeat_at-nya (start + tiap tracker) lebih
+# lama dari ini dianggap mati (proses yang menjalankannya restart) → tidak
+# di-coalesce lagi. Update-all yang panjang tetap hidup selama ada progress.
+_JOB_STALE_SECONDS = 300
+
 class FindMyLocationService:
 
     def __init__(self, app=None):
@@ -120,6 +138,15 @@ class FindMyLocationService:
         self._thread = None
         self._tools = None
         self._status_lock = Lock()
+        # Cache device list Google: [(device_name, canonic_id), ...]
+        self._device_cache = None
+        self._device_cache_at = None
+        self._device_cache_lock = Lock()
+        # Metrics (hanya terisi di proses yang menjalankan loop)
+        self._cycle_durations = deque(maxlen=20)
+        self._tracker_metrics = {}
+        # Cache baca shared status (proses web): (fetched_at, status)
+        self._shared_cache = None
         self._status = {
             'started_at': None,
             'is_leader': False,
@@ -131,6 +158,8 @@ class FindMyLocationService:
             'error_count': 0,
             'trackers_updated_last_run': 0,
             'interval_seconds': 60,
+            'device_list_cached_at': None,
+            'device_list_size': 0,
         }
 
     def init_app(self, app):
@@ -140,21 +169,140 @@ class FindMyLocationService:
     # --- Status API ---
 
     def get_status(self):
+        """
+        Status + metrics worker.
+
+        Proses yang menjalankan loop → dari memory sendiri. Proses lain
+        (container web, gunicorn worker non-leader) → dari tabel
+        findmy_worker_status yang ditulis loop tiap tracker/cycle.
+        """
+        if not self._running and self.app:
+            shared = self._read_shared_status()
+            if shared:
+                return shared
+        s = self._local_status()
+        s['queue_depth'] = self._queue_depth()
+        set_findmy_queue_depth(s['queue_depth'])
+        return s
+
+    def _local_status(self):
         with self._status_lock:
             s = dict(self._status)
+            durations = list(self._cycle_durations)
+            trackers = {cid: dict(m) for cid, m in self._tracker_metrics.items()}
         s['is_running'] = self._running
         s['tools_loaded'] = self._tools is not None
         s['pid'] = os.getpid()
+        s['source'] = 'local'
+        s['cycle_last_seconds'] = round(durations[-1], 2) if durations else None
+        s['cycle_avg_seconds'] = round(sum(durations) / len(durations), 2) if durations else None
+        s['cycle_max_seconds'] = round(max(durations), 2) if durations else None
+        s['trackers'] = trackers
         # Serialize datetime
-        for k in ('started_at', 'last_run_at'):
+        for k in ('started_at', 'last_run_at', 'device_list_cached_at'):
             if s.get(k):
                 s[k] = s[k].strftime('%Y-%m-%d %H:%M:%S')
         return s
 
+    def _queue_depth(self):
+        """Jumlah job locate/update-all yang masih antri/jalan."""
+        try:
+            from models import db, FindMyJob
+            stale_before = datetime.now() - timedelta(seconds=_JOB_STALE_SECONDS)
+            return FindMyJob.query.filter(
+                FindMyJob.status.in_(('pending', 'running')),
+                db.func.coalesce(FindMyJob.heartbeat_at, FindMyJob.created_at) >= stale_before,
+            ).count()
+        except Exception:
+            return None
+
+    def _save_shared_status(self):
+        """Tulis status loop ke database supaya bisa dibaca proses lain."""
+        if not self.app:
+            return
+        try:
+            with self.app.app_context():
+                from models import db, FindMyWorkerStatus
+                row = FindMyWorkerStatus.query.get(_SHARED_STATUS_KEY)
+                if not row:
+                    row = FindMyWorkerStatus(id=_SHARED_STATUS_KEY)
+                    db.session.add(row)
+                row.status = json.dumps(self._local_status(), default=str)
+                row.heartbeat_at = datetime.now()
+                db.session.commit()
+        except Exception as e:
+            _log(f"Save shared worker status failed: {e}", 'warning')
+
+    def _read_shared_status(self):
+        """Baca status loop dari database, di-cache FINDMY_STATUS_CACHE_SECONDS."""
+        ttl = self.app.config.get('FINDMY_STATUS_CACHE_SECONDS', 5)
+        cached = self._shared_cache
+        if cached and (time.time() - cached[0]) < ttl:
+            return cached[1]
+
+        try:
+            from models import FindMyWorkerStatus
+            row = FindMyWorkerStatus.query.get(_SHARED_STATUS_KEY)
+            if not row or not row.status:
+                status = None
+            else:
+                status = json.loads(row.status)
+                age = (datetime.now() - row.heartbeat_at).total_seconds()
+                # Loop menulis heartbeat tiap tracker & tiap cycle; lewat dari
+                # ini berarti prosesnya mati tanpa sempat menandai berhenti.
+                stale_after = max(2 * (status.get('interval_seconds') or 60), 120)
+                status['is_running'] = bool(status.get('is_running')) and age < stale_after
+                status['heartbeat_at'] = row.heartbeat_at.strftime('%Y-%m-%d %H:%M:%S')
+                status['heartbeat_age_seconds'] = int(age)
+                status['source'] = 'shared'
+                status['queue_depth'] = self._queue_depth()
+        except Exception as e:
+            _log(f"Read shared worker status failed: {e}", 'warning')
+            status = None
+
+        self._shared_cache = (time.time(), status)
+        return status
+
+    def _record_tracker(self, tracker, latency, ok, error=None):
+        """Catat latency locate per tracker (rata-rata bergerak)."""
+        with self._status_lock:
+            m = self._tracker_metrics.setdefault(tracker['canonic_id'], {
+                'device_name': tracker['device_name'],
+                'kartu_id': tracker['kartu_id'],
+                'samples': 0, 'success_count': 0, 'error_count': 0,
+                'avg_latency_ms': None,
+            })
+            latency_ms = int(latency * 1000)
+            m['samples'] += 1
+            m['last_latency_ms'] = latency_ms
+            m['avg_latency_ms'] = latency_ms if m['avg_latency_ms'] is None \
+                else int(m['avg_latency_ms'] * 0.8 + latency_ms * 0.2)
+            m['last_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if ok:
+                m['success_count'] += 1
+                m['last_error'] = None
+            else:
+                m['error_count'] += 1
+                m['last_error'] = error
+
     def _update_status(self, **kwargs):
         with self._status_lock:
             self._status.update(kwargs)
 
+    def _publish_status(self):
+        """Simpan status ke shared store + push ke dashboard via SSE (event 'worker_status')."""
+        if not self.app:
+            return
+        self._save_shared_status()
+        try:
+            with self.app.app_context():
+                from models import db
+                from live_events import publish_event
+                publish_event('worker_status', self.get_status())
+                db.session.commit()
+        except Exception as e:
+            _log(f"Publish worker status failed: {e}", 'warning')
+
     # --- Tracker map ---
 
     def _get_tracker_map(self):
@@ -218,19 +366,98 @@ class FindMyLocationService:
             self._update_status(last_error=f"ImportError: {e}")
             return None
 
-    def list_trackers(self):
-        """List semua tracker dari akun Google."""
+    def _device_list_ttl(self):
+        """TTL cache device list (detik). 0 = selalu refresh."""
+        if not self.app:
+            return 0
+        return int(self.app.config.get('FINDMY_DEVICE_LIST_TTL', 3600))
+
+    def _fetch_device_list(self, tools):
+        """
+        Round trip ke Google: request_device_list + parse protobuf +
+        refresh_custom_trackers. Mahal, jadi hasilnya di-cache oleh
+        _get_canonic_ids(). Returns [(device_name, canonic_id), ...].
+        """
+        result_hex = tools['request_device_list']()
+        device_list = tools['parse_device_list_protobuf'](result_hex)
+        tools['refresh_custom_trackers'](device_list)
+        return list(tools['get_canonic_ids'](device_list))
+
+    def _device_refresh_requested_at(self):
+        """Epoch detik refresh device list terakhir diminta (shared), None kalau belum pernah."""
+        try:
+            from models import FindMyWorkerStatus
+            row = FindMyWorkerStatus.query.get(_DEVICE_REFRESH_KEY)
+            return row.heartbeat_at.timestamp() if row else None
+        except Exception as e:
+            _log(f"Read device refresh request failed: {e}", 'warning')
+            return None
+
+    def _get_canonic_ids(self, tools):
+        """Device list dari cache, fetch ulang kalau expired / diminta refresh (invalidate_device_cache)."""
+        with self._device_cache_lock:
+            ttl = self._device_list_ttl()
+            requested_at = self._device_refresh_requested_at()
+            fresh = (
+                self._device_cache is not None
+                and self._device_cache_at is not None
+                and (time.time() - self._device_cache_at) < ttl
+                and (requested_at is None or self._device_cache_at >= requested_at)
+            )
+            if fresh:
+                return self._device_cache
+
+            canonic_ids = self._fetch_device_list(tools)
+            self._device_cache = canonic_ids
+            self._device_cache_at = time.time()
+            self._update_status(
+                device_list_cached_at=datetime.now(),
+                device_list_size=len(canonic_ids),
+            )
+            _log(f"Device list refreshed from Google ({len(canonic_ids)} device, ttl={ttl}s)")
+            return canonic_ids
+
+    def invalidate_device_cache(self):
+        """
+        Buang cache device list di SEMUA proses: waktu permintaan ditulis ke
+        findmy_worker_status, _get_canonic_ids() di proses lain (termasuk
+        findmy_worker.py) fetch ulang ke Google saat dipanggil berikutnya.
+        """
+        with self._device_cache_lock:
+            self._device_cache = None
+            self._device_cache_at = None
+        if not self.app:
+            return
+        try:
+            with self.app.app_context():
+                from models import db, FindMyWorkerStatus
+                row = FindMyWorkerStatus.query.get(_DEVICE_REFRESH_KEY)
+                if not row:
+                    row = FindMyWorkerStatus(id=_DEVICE_REFRESH_KEY)
+                    db.session.add(row)
+                row.heartbeat_at = datetime.now()
+                db.session.commit()
+        except Exception as e:
+            _log(f"Save device refresh request failed: {e}", 'warning')
+
+    def list_trackers(self, force_refresh=False):
+        """
+        List semua tracker dari akun Google.
+
+        Device list di-cache selama FINDMY_DEVICE_LIST_TTL detik supaya tiap
+        cycle worker tidak perlu round trip Nova + re-upload EID. Mapping ke
+        kartu_id tetap dibaca fresh dari database.
+        """
         tools = self._load_tools()
         if not tools:
             return []
 
+        if force_refresh:
+            self.invalidate_device_cache()
         tracker_map = self._get_tracker_map()
 
         try:
-            result_hex = tools['request_device_list']()
-            device_list = tools['parse_device_list_protobuf'](result_hex)
-            tools['refresh_custom_trackers'](device_list)
-            canonic_ids = tools['get_canonic_ids'](device_list)
+            canonic_ids = self._get_canonic_ids(tools)
 
             return [{
                 'device_name': name,
@@ -329,8 +556,11 @@ class FindMyLocationService:
             _log(traceback.format_exc(), 'error')
         return locations
 
-    def update_all_locations(self):
-        """Fetch lokasi semua tracker, update database. Returns jumlah tracker ter-update."""
+    def update_all_locations(self, on_tracker=None):
+        """
+        Fetch lokasi semua tracker, update database. Returns jumlah tracker
+        ter-update. on_tracker() dipanggil setelah tiap tracker (heartbeat job).
+        """
         if not self.app:
             return 0
 
@@ -342,6 +572,7 @@ class FindMyLocationService:
         updated_count = 0
         with self.app.app_context():
             from models import db, Anggota, LokasiHistory, FindMyTracker
+            from live_events import publish_lokasi
 
             for tracker in self.list_trackers():
                 if tracker['kartu_id'] == 'UNMAPPED':
@@ -351,8 +582,17 @@ class FindMyLocationService:
                 if not anggota:
                     continue
 
+                t0 = time.time()
                 locs = self.get_location(tracker['canonic_id'], tracker['device_name'])
                 geo_locs = [l for l in locs if l.get('latitude')]
+                latency = time.time() - t0
+                self._record_tracker(tracker, latency, bool(geo_locs),
+                                     None if geo_locs else 'No geo locations returned')
+                observe_findmy_locate(tracker['kartu_id'], latency, bool(geo_locs))
+                if self._running:
+                    self._save_shared_status()  # heartbeat per tracker
+                if on_tracker:
+                    on_tracker()
                 if not geo_locs:
                     _log(f"No geo locations returned for {tracker['device_name']}", 'warning')
                     continue
@@ -381,6 +621,7 @@ class FindMyLocationService:
                         lokasi_nama='GPS via Find Hub',
                         sumber='GoogleFindHub',
                     ))
+                publish_lokasi(anggota, sumber='GoogleFindHub')
 
                 db.session.commit()
                 updated_count += 1
@@ -388,6 +629,113 @@ class FindMyLocationService:
 
         return updated_count
 
+    # --- On-demand jobs (locate / update-all) ---
+    # Dijalankan di thread background supaya request gunicorn langsung
+    # balik (202 + job_id). State job disimpan di tabel findmy_job, jadi
+    # polling bisa dilayani gunicorn worker mana pun.
+
+    def submit_job(self, jenis, target=None, kartu_id=None, user_id=None):
+        """
+        Buat job baru, atau kembalikan job aktif untuk target yang sama
+        (coalescing). Returns (job_dict, coalesced).
+
+        Dijamin DB, bukan lock proses: kolom UNIQUE findmy_job.active_key
+        ("jenis:target", diisi selama pending/running). Worker gunicorn lain
+        yang kalah INSERT dapat IntegrityError → kembalikan job pemenangnya.
+        Job aktif yang heartbeat-nya basi (_JOB_STALE_SECONDS, prosesnya mati)
+        dilepas key-nya lalu dicoba lagi.
+        """
+        from sqlalchemy.exc import IntegrityError
+        from models import db, FindMyJob
+
+        active_key = f"{jenis}:{target or ''}"
+        for _ in range(3):
+            job = FindMyJob(
+                id=uuid.uuid4().hex, jenis=jenis, target=target,
+                kartu_id=kartu_id, status='pending', active_key=active_key,
+                requested_by_user_id=user_id,
+            )
+            db.session.add(job)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+            else:
+                job_data = job.to_dict()
+                start_background(self._run_job, job_data['job_id'], name=f"findmy-job-{job_data['job_id'][:8]}")
+                return job_data, False
+
+            active = FindMyJob.query.filter_by(active_key=active_key).first()
+            if active is None:
+                continue  # baru selesai di antara INSERT dan SELECT
+            if (active.heartbeat_at or active.created_at) >= datetime.now() - timedelta(seconds=_JOB_STALE_SECONDS):
+                return active.to_dict(), True
+            # Basi: lepas key (hanya kalau masih dipegang job yang sama)
+            FindMyJob.query.filter_by(id=active.id, active_key=active_key).update(
+                {'active_key': None, 'status': 'error', 'error': 'stale', 'finished_at': datetime.now()},
+                synchronize_session=False)
+            db.session.commit()
+        raise RuntimeError(f"Gagal membuat job {active_key}")
+
+    def get_job(self, job_id):
+        from models import FindMyJob
+        job = FindMyJob.query.get(job_id)
+        return job.to_dict() if job else None
+
+    def _job_heartbeat(self, job_id):
+        """Tandai job masih hidup (koneksi sendiri, tidak menyentuh session pemanggil)."""
+        from models import db, FindMyJob
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(db.update(FindMyJob).where(FindMyJob.id == job_id, FindMyJob.active_key.isnot(None))
+                             .values(heartbeat_at=datetime.now()))
+        except Exception as e:
+            _log(f"Job {job_id} heartbeat failed: {e}", 'warning')
+
+    def _run_job(self, job_id):
+        with self.app.app_context():
+            from models import db, FindMyJob
+            from live_events import publish_event
+
+            job = FindMyJob.query.get(job_id)
+            if not job or not job.active_key:
+                return
+            job.status = 'running'
+            job.started_at = job.heartbeat_at = datetime.now()
+            db.session.commit()
+            jenis, target, label = job.jenis, job.target, job.kartu_id or job.target
+            active_key = job.active_key
+
+            try:
+                if jenis == 'locate':
+                    locs = self.get_location(target, label)
+                    result = [{
+                        'latitude': l['latitude'], 'longitude': l['longitude'],
+                        'timestamp': l['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
+                        'accuracy': l.get('accuracy'),
+                    } for l in locs if l.get('latitude')]
+                else:
+                    result = {'updated': self.update_all_locations(on_tracker=lambda: self._job_heartbeat(job_id))}
+                status, error = 'done', None
+            except Exception as e:
+                _log(f"Job {job_id} ({jenis}) error: {e}", 'error')
+                _log(traceback.format_exc(), 'error')
+                result, status, error = None, 'error', f"{type(e).__name__}: {e}"[:255]
+
+            # Hanya selama masih memegang active_key: kalau sudah dinyatakan
+            # basi (dan mungkin diganti job baru), hasil ini tidak menimpa apa pun.
+            finished = FindMyJob.query.filter_by(id=job_id, active_key=active_key).update({
+                'status': status, 'active_key': None,
+                'result': json.dumps(result) if result is not None else None,
+                'error': error, 'finished_at': datetime.now(),
+            })
+            if not finished:
+                db.session.rollback()
+                _log(f"Job {job_id} ({jenis}) finished after being marked stale, result dropped", 'warning')
+                return
+            publish_event('findmy_job', job.to_dict())
+            db.session.commit()
+
     # --- Worker lifecycle ---
 
     def start_worker(self, interval=60, require_leader=True):
@@ -421,11 +769,14 @@ class FindMyLocationService:
             _log(f"⚡ Background worker started (interval={interval}s, pid={os.getpid()})")
             # Warm-up: load tools once so first failure shows up immediately
             self._load_tools()
+            self._save_shared_status()
 
             while self._running:
                 cycle_start = time.time()
+                cycle_ok = False
                 try:
                     count = self.update_all_locations()
+                    cycle_ok = True
                     self._update_status(
                         last_run_at=datetime.now(),
                         last_run_success=True,
@@ -446,8 +797,13 @@ class FindMyLocationService:
                         error_count=self._status['error_count'] + 1,
                     )
 
-                # Sleep respecting interval minus time already spent, min 5s
                 elapsed = time.time() - cycle_start
+                with self._status_lock:
+                    self._cycle_durations.append(elapsed)
+                observe_findmy_cycle(elapsed, cycle_ok)
+                self._publish_status()
+
+                # Sleep respecting interval minus time already spent, min 5s
                 sleep_for = max(5, interval - elapsed)
                 # Break sleep into 1s chunks so stop_worker() responds quickly
                 for _ in range(int(sleep_for)):
@@ -455,6 +811,7 @@ class FindMyLocationService:
                         break
                     time.sleep(1)
 
+            self._save_shared_status()  # tandai berhenti (is_running=False)
             _log("Worker loop exited")
 
         self._thread = Thread(target=worker, daemon=True, name='findmy-worker')
@@ -503,15 +860,25 @@ def register_findmy_routes(app, findmy_service):
 
     @admin_required
     def api_findmy_google_trackers():
-        """List all trackers from Google account (independent of DB mapping)."""
+        """
+        List all trackers from Google account (independent of DB mapping).
+        `?refresh=1` → paksa fetch ulang device list (bypass cache).
+        """
+        force = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
         try:
-            return jsonify({'success': True, 'data': findmy_service.list_trackers()})
+            return jsonify({'success': True, 'data': findmy_service.list_trackers(force_refresh=force)})
         except Exception as e:
             return jsonify({'success': False, 'message': str(e)}), 500
 
     @admin_required
     def api_findmy_locate(kartu_id):
-        """Request fresh location for specific card (on-demand, bypass worker)."""
+        """
+        Request fresh location for specific card (on-demand, bypass worker).
+        Asynchronous: langsung balik 202 + job_id, hasil di-poll lewat
+        /api/findmy/jobs/<job_id>. Request paralel untuk tracker yang sama
+        digabung ke satu job.
+        """
+        from flask import session
         from models import FindMyTracker, Anggota
 
         anggota = Anggota.query.filter_by(kartu_id=kartu_id).first()
@@ -522,23 +889,37 @@ def register_findmy_routes(app, findmy_service):
         if not tracker:
             return jsonify({'success': False, 'message': f'No tracker mapped to {kartu_id}'}), 404
 
-        locs = findmy_service.get_location(tracker.canonical_id, kartu_id)
-        return jsonify({'success': True, 'data': [{
-            'latitude': l['latitude'], 'longitude': l['longitude'],
-            'timestamp': l['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
-            'accuracy': l.get('accuracy'),
-        } for l in locs if l.get('latitude')]})
+        try:
+            job, coalesced = findmy_service.submit_job(
+                'locate', target=tracker.canonical_id, kartu_id=kartu_id,
+                user_id=session.get('user_id'),
+            )
+            return jsonify({'success': True, 'job_id': job['job_id'],
+                            'status': job['status'], 'coalesced': coalesced}), 202
+        except Exception as e:
+            _log(f"locate API error: {e}", 'error')
+            return jsonify({'success': False, 'message': str(e)}), 500
 
     @admin_required
     def api_findmy_update_all():
-        """Force worker run NOW (button di UI)."""
+        """Force worker run NOW (button di UI) — asynchronous, lihat api_findmy_locate."""
+        from flask import session
         try:
-            count = findmy_service.update_all_locations()
-            return jsonify({'success': True, 'message': f'Updated {count} tracker(s)', 'updated': count})
+            job, coalesced = findmy_service.submit_job('update_all', user_id=session.get('user_id'))
+            return jsonify({'success': True, 'job_id': job['job_id'],
+                            'status': job['status'], 'coalesced': coalesced}), 202
         except Exception as e:
             _log(f"update-all API error: {e}", 'error')
             return jsonify({'success': False, 'message': str(e)}), 500
 
+    @admin_required
+    def api_findmy_job_status(job_id):
+        """Poll status + hasil job locate / update-all."""
+        job = findmy_service.get_job(job_id)
+        if not job:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': job})
+
     @admin_required
     def api_findmy_worker_status():
         """Status worker — supaya UI bisa tampilkan indikator hidup/mati."""
@@ -552,16 +933,19 @@ def register_findmy_routes(app, findmy_service):
                api_findmy_update_all, methods=['POST'])
     safe_route('/api/findmy/worker-status', 'api_findmy_worker_status',
                api_findmy_worker_status, methods=['GET'])
+    safe_route('/api/findmy/jobs/<job_id>', 'api_findmy_job_status',
+               api_findmy_job_status, methods=['GET'])
 
-    _log("FindMy API routes registered (google-trackers, locate, update-all, worker-status)")
+    _log("FindMy API routes registered (google-trackers, locate, update-all, worker-status, jobs)")
 
 
 # ============================================================
-# CARA AKTIVASI DI app.py (SUDAH DIPATCH — lihat bagian bawah app.py):
+# CARA AKTIVASI (lihat findmy_ext.py):
 # ============================================================
 #
-# Tidak perlu lagi ditaruh di dalam `if __name__ == '__main__':`
-# karena itu bug utamanya — gunicorn gak pernah masuk blok itu.
-# Sekarang inisialisasi dilakukan di level module supaya gunicorn juga ikut.
+# create_app() memasang extension FindMy (route saja, service lazy).
+# Loop worker di-start oleh hook post_worker_init di gunicorn.conf.py
+# (leader election antar worker), `python app.py`, atau service
+# findmy_worker.py terpisah — tidak lagi saat `import app`.
 #
 # Kelola tracker via Admin Panel → Monitoring → FindMy Trackers
@@ -6,4 +6,7 @@
 from SpotApi.CreateBleDevice.util import hours_to_seconds
 
 mcu_fast_pair_model_id = "003200"
-max_truncated_eid_seconds_server = hours_to_seconds(4*24)
\ No newline at end of file
+max_truncated_eid_seconds_server = hours_to_seconds(4*24)
+
+# Re-upload precomputed EIDs once less than this much of the uploaded horizon remains
+eid_upload_refresh_threshold_seconds = hours_to_seconds(24)
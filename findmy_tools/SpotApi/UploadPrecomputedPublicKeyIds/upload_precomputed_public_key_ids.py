@@ -2,47 +2,130 @@
 #  GoogleFindMyTools - A set of tools to interact with the Google Find My API
 #  Copyright © 2024 Leon Böttger. All rights reserved.
 #
+import json
+import os
+import tempfile
 import time
 
 from FMDNCrypto.eid_generator import ROTATION_PERIOD, generate_eid
 from NovaApi.ExecuteAction.LocateTracker.decrypt_locations import retrieve_identity_key, is_mcu_tracker
 from ProtoDecoders.DeviceUpdate_pb2 import DevicesList, UploadPrecomputedPublicKeyIdsRequest, PublicKeyIdList
-from SpotApi.CreateBleDevice.config import max_truncated_eid_seconds_server
+from SpotApi.CreateBleDevice.config import max_truncated_eid_seconds_server, eid_upload_refresh_threshold_seconds
 from SpotApi.CreateBleDevice.util import hours_to_seconds
 from SpotApi.spot_request import spot_request
 
+# Persisted per tracker: { canonic_id: {"pairDate": int, "coveredUntil": int} }
+# Kept out of Auth/secrets.json: that file holds the Google tokens, is shared by
+# web and findmy-worker, and token_cache rewrites it in place (truncate + write).
+# A concurrent reader could then see half a file and drop the auth tokens.
+UPLOAD_HORIZON_FILE = 'upload_horizons.json'
 
-def refresh_custom_trackers(device_list: DevicesList):
+# generate_eid(eik, 0) is constant per key, but costs an AES + EC point multiplication
+_static_eid_cache: dict[bytes, bytes] = {}
+
+
+def refresh_custom_trackers(device_list: DevicesList, force: bool = False):
 
     request = UploadPrecomputedPublicKeyIdsRequest()
-    needs_upload = False
+    now = int(time.time())
+
+    horizons = _load_horizons()
+    uploaded = {}
 
     for device in device_list.deviceMetadata:
 
         # This is a microcontroller
         if is_mcu_tracker(device.information.deviceRegistration):
 
-            needs_upload = True
+            canonic_id = device.identifierInformation.canonicIds.canonicId[0].id
+            pair_date = device.information.deviceRegistration.pairDate
+
+            # Skip trackers whose uploaded EIDs still cover enough of the future
+            if not force and not _needs_upload(horizons.get(canonic_id), pair_date, now):
+                continue
 
             new_truncated_ids = UploadPrecomputedPublicKeyIdsRequest.DevicePublicKeyIds()
-            new_truncated_ids.pairDate = device.information.deviceRegistration.pairDate
-            new_truncated_ids.canonicId.id = device.identifierInformation.canonicIds.canonicId[0].id
+            new_truncated_ids.pairDate = pair_date
+            new_truncated_ids.canonicId.id = canonic_id
 
             identity_key = retrieve_identity_key(device.information.deviceRegistration)
-            next_eids = get_next_eids(identity_key, new_truncated_ids.pairDate, int(time.time() - hours_to_seconds(3)), duration_seconds=max_truncated_eid_seconds_server)
+            start_date = int(now - hours_to_seconds(3))
+            next_eids = get_next_eids(identity_key, pair_date, start_date, duration_seconds=max_truncated_eid_seconds_server)
 
             for next_eid in next_eids:
                 new_truncated_ids.clientList.publicKeyIdInfo.append(next_eid)
 
             request.deviceEids.append(new_truncated_ids)
-
-    if needs_upload:
-        print("[UploadPrecomputedPublicKeyIds] Updating your registered µC devices...")
+            uploaded[canonic_id] = {
+                'pairDate': pair_date,
+                'coveredUntil': next_eids[-1].timestamp.seconds if next_eids else now,
+            }
+
+    # All trackers that need new EIDs go out in a single request
+    if uploaded:
+        print(f"[UploadPrecomputedPublicKeyIds] Updating {len(uploaded)} registered µC device(s)...")
         try:
             bytes_data = request.SerializeToString()
             spot_request("UploadPrecomputedPublicKeyIds", bytes_data)
         except Exception as e:
             print(f"[UploadPrecomputedPublicKeyIds] Failed to refresh custom trackers. Please file a bug report. Continuing... {str(e)}")
+            return
+
+        horizons = _load_horizons()  # re-read: the other process may have uploaded meanwhile
+        horizons.update(uploaded)
+        _save_horizons(horizons)
+
+
+def _horizon_file() -> str:
+    auth_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Auth')
+    return os.path.normpath(os.path.join(auth_dir, UPLOAD_HORIZON_FILE))
+
+
+def _load_horizons() -> dict:
+    try:
+        with open(_horizon_file(), 'r') as file:
+            data = json.load(file)
+        return data if isinstance(data, dict) else {}
+    except (OSError, json.JSONDecodeError):
+        # Missing / unreadable horizons only cost a full re-upload
+        return {}
+
+
+def _save_horizons(horizons: dict):
+    # Temp file in the same directory + os.replace: readers see the old or the new file, never a partial one
+    path = _horizon_file()
+    fd, tmp_path = tempfile.mkstemp(prefix='.upload_horizons.', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(horizons, file)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[UploadPrecomputedPublicKeyIds] Could not store upload horizons: {e}")
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def _needs_upload(horizon: dict | None, pair_date: int, now: int) -> bool:
+    if not horizon:
+        return True
+
+    # Re-paired tracker: previously uploaded EIDs belong to the old pairing
+    if horizon.get('pairDate') != pair_date:
+        return True
+
+    return horizon.get('coveredUntil', 0) - now < eid_upload_refresh_threshold_seconds
+
+
+def _get_static_eid(eik: bytes) -> bytes:
+    static_eid = _static_eid_cache.get(eik)
+
+    if static_eid is None:
+        static_eid = generate_eid(eik, 0)
+        _static_eid_cache[eik] = static_eid
+
+    return static_eid
 
 
 def get_next_eids(eik: bytes, pair_date: int, start_date: int, duration_seconds: int) -> list[PublicKeyIdList.PublicKeyIdInfo]:
@@ -52,17 +135,17 @@ def get_next_eids(eik: bytes, pair_date: int, start_date: int, duration_seconds:
     start_offset = start_date - pair_date
     current_time_offset = start_offset - (start_offset % ROTATION_PERIOD)
 
-    static_eid = generate_eid(eik, 0)
+    truncated_eid = _get_static_eid(eik)[:10]
 
     while current_time_offset <= start_offset + duration_seconds:
         time = pair_date + current_time_offset
 
         info = PublicKeyIdList.PublicKeyIdInfo()
         info.timestamp.seconds = time
-        info.publicKeyId.truncatedEid = static_eid[:10]
+        info.publicKeyId.truncatedEid = truncated_eid
 
         public_key_id_list.append(info)
 
         current_time_offset += 1024
 
-    return public_key_id_list
\ No newline at end of file
+    return public_key_id_list
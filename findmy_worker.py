@@ -17,7 +17,10 @@ CARA PAKAI:
 
 ENV VARS:
   FINDMY_UPDATE_INTERVAL  Interval loop dalam detik (default: 60)
+  FINDMY_DEVICE_LIST_TTL  Cache device list Google dalam detik (default: 3600)
   FINDMY_LOG_LEVEL        DEBUG|INFO|WARNING|ERROR (default: INFO)
+  FINDMY_METRICS_PORT     Port exporter Prometheus (default: 9101, 0 = nonaktif)
+  DB_POOL_ROLE            Profil pool DB (default: worker → 2 + 2 koneksi)
 
 EXIT:
   Ctrl+C atau SIGTERM → worker berhenti graceful.
@@ -30,16 +33,21 @@ import time
 import logging
 
 # ============================================================
-# ⚠️ PENTING: Harus SEBELUM `from app import app`
+# FINDMY_AUTO_START=0 untuk proses ini
 # ============================================================
-# `app.py` jalanin FindMy init + start_worker di level module saat di-import.
-# Kalau kita tidak override env var di sini, worker akan jalan DUA KALI:
-#   1. Dari app.py saat `from app import app` (module-level init)
-#   2. Dari main() script ini
-# Dua-duanya di proses yang sama = 2x spam Google API.
-# Set env var SEKARANG, sebelum app.py kepikiran buat auto-start.
+# `import app` tidak lagi menyalakan loop (lihat findmy_ext.py), tapi
+# tetap dipaksa 0 di sini supaya tidak ada jalur lain (autostart()) yang
+# menjalankan loop kedua di proses yang sama = 2x spam Google API.
 os.environ['FINDMY_AUTO_START'] = '0'
 
+# Pool DB kecil (loop + job locate), dihitung terpisah dari worker web di
+# budget koneksi MySQL — lihat pool_profile di config.py.
+os.environ.setdefault('DB_POOL_ROLE', 'worker')
+
+# Metrics worker ini diekspor lewat HTTP server sendiri (FINDMY_METRICS_PORT),
+# bukan lewat file multiprocess gunicorn → registry biasa di memory.
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
 # Ensure the project root is on sys.path (so `from models import ...` works
 # when this script is invoked from any working directory).
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -57,13 +65,18 @@ log = logging.getLogger('findmy_worker_main')
 def main():
     # Import AFTER setting FINDMY_AUTO_START=0 above
     from app import app
-    from findmy_service import FindMyLocationService
+    from metrics import start_exporter
 
     interval = int(os.environ.get('FINDMY_UPDATE_INTERVAL', 60))
     log.info(f"Starting dedicated FindMy worker (interval={interval}s, pid={os.getpid()})")
 
-    service = FindMyLocationService()
-    service.init_app(app)
+    metrics_port = int(os.environ.get('FINDMY_METRICS_PORT', 9101))
+    if start_exporter(metrics_port):
+        log.info(f"Prometheus metrics exporter listening on :{metrics_port}/metrics")
+    else:
+        log.info("Prometheus metrics exporter disabled (prometheus-client missing or FINDMY_METRICS_PORT=0)")
+
+    service = app.extensions['findmy'].service
 
     # In dedicated-worker mode we already know we're the only instance,
     # so no need for file-lock election.
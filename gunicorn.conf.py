@@ -0,0 +1,70 @@
+"""
+Kartu Pintar - Konfigurasi Gunicorn
+====================================
+
+Dibaca otomatis oleh gunicorn (./gunicorn.conf.py di working directory).
+Bind & log dari command line (lihat Dockerfile). Worker class, jumlah
+worker, thread / koneksi per worker dari profil SERVING_MODE di config.py
+(sync | gthread | gevent, override WEB_WORKERS / WEB_THREADS /
+WEB_WORKER_CONNECTIONS). Flag command line tetap menang.
+
+Metrics Prometheus multiprocess (metrics.py): tiap worker menulis nilai
+metrics ke file di PROMETHEUS_MULTIPROC_DIR, GET /metrics di worker mana
+pun menjumlahkan semua file. Env harus diset di master SEBELUM worker
+di-fork (dan sebelum prometheus_client di-import), makanya di sini.
+
+Pool DB per worker diturunkan dari profil yang sama (pool_profile);
+on_starting mencetak total koneksi maksimum vs DB_CONNECTION_BUDGET.
+
+FindMy: `import app` tidak menyalakan loop update lokasi (findmy_ext.py);
+post_worker_init yang memanggil autostart() di tiap worker — leader
+election memastikan cuma satu yang benar-benar jalan.
+"""
+
+import os
+import shutil
+
+from config import pool_budget, pool_profile, serving_profile
+
+_profile = serving_profile()
+worker_class = _profile['worker_class']
+workers = _profile['workers']
+if worker_class == 'gthread':
+    threads = _profile['threads']
+if worker_class == 'gevent':
+    worker_connections = _profile['worker_connections']
+# sync: request > timeout → worker di-kill. gthread/gevent: hanya heartbeat
+# proses, stream SSE panjang aman.
+timeout = int(os.environ.get('WEB_TIMEOUT', 30 if worker_class == 'sync' else 60))
+
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/kartu-pintar-metrics')
+
+
+def on_starting(server):
+    # File dari run sebelumnya (pid lama) → counter dobel, bersihkan dulu
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+    pool = pool_profile(_profile)
+    budget = pool_budget(_profile)
+    print(f"[DB Pool] {budget['mode']}: {workers} worker × (pool {pool['pool_size']} + overflow "
+          f"{pool['max_overflow']}) + findmy-worker {budget['findmy_worker']} = {budget['total']} koneksi "
+          f"maks (budget {budget['budget']})", flush=True)
+    if budget['over_budget']:
+        print("[DB Pool] ⚠️  melewati DB_CONNECTION_BUDGET — turunkan DB_POOL_SIZE / DB_MAX_OVERFLOW "
+              "atau naikkan max_connections MySQL", flush=True)
+
+
+def child_exit(server, worker):
+    # Gauge "live*" worker yang sudah mati tidak dihitung lagi
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    findmy = getattr(worker.wsgi, 'extensions', {}).get('findmy')
+    if findmy is not None:
+        findmy.autostart()
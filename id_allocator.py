@@ -0,0 +1,188 @@
+"""
+Kartu Pintar - ID Allocator (kartu_id & trx_id)
+================================================
+
+Sebelumnya:
+  - kartu_id = `Anggota.query.count() + 1` lalu probe `filter_by(kartu_id=...)`
+    sampai kosong → O(bentrok) query, dan dua worker gunicorn bisa dapat
+    nomor yang sama (yang kalah kena unique constraint).
+  - trx_id = 6 hex acak per hari → peluang bentrok naik seiring volume
+    harian, dan bentrok = pembayaran gagal.
+
+Sekarang kedua ID diambil dari counter di tabel `id_sequence`:
+  - reserve(name, n): `UPDATE ... SET next_value = next_value + n` lalu
+    SELECT di transaksi yang sama (row lock InnoDB / write lock SQLite)
+    → range [start, start+n) eksklusif milik pemanggil. Atomik lintas
+    proses & container, O(1) — satu round-trip.
+  - Lease per proses: tiap proses mengambil blok `lease_size` nilai
+    sekaligus dan membagikannya dari memory (tanpa DB) sampai habis.
+    trx_id pakai lease besar (volume tinggi; urutan antar worker tidak
+    harus monoton), kartu_id pakai lease 1 (nomor kartu tetap rapat).
+  - Reserve jalan di koneksi sendiri & langsung commit, seperti SEQUENCE:
+    kalau transaksi pemanggil di-rollback, nomornya dilewati (gap), tidak
+    pernah dibagikan dua kali.
+
+Baris sequence dibuat otomatis saat pertama dipakai, dengan nilai awal
+dari data yang sudah ada (nomor tertinggi + 1).
+
+FORMAT:
+    kartu_id  KP-2026-001        (sequence 'kartu:2026', per tahun)
+    trx_id    TRX-20261019-000001 (sequence 'trx:20261019', per hari)
+"""
+
+import os
+import re
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdSequence, Anggota, Transaksi
+
+_seq = IdSequence.__table__
+
+_leases = {}  # name → [next, end)
+_lease_lock = Lock()
+_lease_pid = os.getpid()
+
+_KARTU_RE = re.compile(r'^KP-(\d{4})-(\d+)$', re.IGNORECASE)
+
+
+# ============================================================
+# SEQUENCE
+# ============================================================
+
+def reserve(name, count=1, initial=None):
+    """
+    Reserve `count` nilai berturut-turut dari sequence `name`, return nilai
+    pertama. `initial(conn)` → nilai awal kalau sequence belum ada.
+    """
+    for _ in range(3):
+        with db.engine.begin() as conn:
+            updated = conn.execute(
+                _seq.update().where(_seq.c.name == name)
+                .values(next_value=_seq.c.next_value + count, updated_at=datetime.now())
+            ).rowcount
+            if updated:
+                end = conn.execute(select(_seq.c.next_value).where(_seq.c.name == name)).scalar_one()
+                return end - count
+
+        # Sequence belum ada → buat, mulai dari data yang sudah ada
+        with db.engine.connect() as conn:
+            start = max(1, initial(conn)) if initial else 1
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(_seq.insert().values(name=name, next_value=start + count, updated_at=datetime.now()))
+            return start
+        except IntegrityError:
+            continue  # proses lain baru saja membuatnya → ulangi lewat UPDATE
+    raise RuntimeError(f"Gagal reserve sequence '{name}'")
+
+
+def advance(name, min_next):
+    """Pastikan sequence tidak akan membagikan nilai < min_next (ID diisi manual / import)."""
+    with db.engine.begin() as conn:
+        conn.execute(
+            _seq.update().where(_seq.c.name == name, _seq.c.next_value < min_next)
+            .values(next_value=min_next, updated_at=datetime.now())
+        )
+
+
+def next_value(name, lease_size=1, initial=None):
+    """Satu nilai dari sequence, lewat lease per proses (DB hanya disentuh saat lease habis)."""
+    global _lease_pid
+    with _lease_lock:
+        if _lease_pid != os.getpid():
+            # Proses hasil fork (gunicorn --preload) tidak boleh memakai lease induknya
+            _leases.clear()
+            _lease_pid = os.getpid()
+        lease = _leases.get(name)
+        if not lease or lease[0] >= lease[1]:
+            prefix = name.split(':', 1)[0] + ':'
+            for old in [k for k in _leases if k.startswith(prefix) and k != name]:
+                del _leases[old]  # lease hari/tahun sebelumnya
+            start = reserve(name, max(1, lease_size), initial)
+            lease = _leases[name] = [start, start + max(1, lease_size)]
+        value = lease[0]
+        lease[0] += 1
+        return value
+
+
+# ============================================================
+# KARTU ID  (KP-YYYY-NNN)
+# ============================================================
+
+def kartu_sequence_name(year):
+    return f'kartu:{year}'
+
+
+def _initial_kartu(year):
+    def initial(conn):
+        highest = 0
+        rows = conn.execute(select(Anggota.kartu_id).where(Anggota.kartu_id.like(f'KP-{year}-%')))
+        for (kartu_id,) in rows:
+            m = _KARTU_RE.match(kartu_id)
+            if m:
+                highest = max(highest, int(m.group(2)))
+        return highest + 1
+    return initial
+
+
+def format_kartu_id(year, number):
+    return f"KP-{year}-{number:03d}"
+
+
+def next_kartu_id():
+    year = datetime.now().strftime('%Y')
+    number = next_value(kartu_sequence_name(year),
+                        current_app.config.get('KARTU_ID_LEASE_SIZE', 1),
+                        _initial_kartu(year))
+    return format_kartu_id(year, number)
+
+
+def reserve_kartu_ids(count):
+    """`count` kartu_id berurutan dalam satu reserve (bulk import)."""
+    if count <= 0:
+        return []
+    year = datetime.now().strftime('%Y')
+    start = reserve(kartu_sequence_name(year), count, _initial_kartu(year))
+    return [format_kartu_id(year, n) for n in range(start, start + count)]
+
+
+def bump_kartu_sequence(*kartu_ids):
+    """kartu_id diisi manual (edit / import) → geser sequence supaya tidak dibagikan lagi."""
+    highest = {}
+    for kartu_id in kartu_ids:
+        m = _KARTU_RE.match(kartu_id or '')
+        if m:
+            highest[m.group(1)] = max(highest.get(m.group(1), 0), int(m.group(2)))
+    for year, number in highest.items():
+        advance(kartu_sequence_name(year), number + 1)
+
+
+# ============================================================
+# TRX ID  (TRX-YYYYMMDD-NNNNNN)
+# ============================================================
+
+def _initial_trx(day):
+    def initial(conn):
+        # trx_id lama berakhiran 6 hex acak — ambil yang kebetulan angka semua saja
+        highest = 0
+        prefix = f'TRX-{day}-'
+        rows = conn.execute(select(Transaksi.trx_id).where(Transaksi.trx_id.like(prefix + '%')))
+        for (trx_id,) in rows:
+            suffix = trx_id[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+        return highest + 1
+    return initial
+
+
+def next_trx_id():
+    day = datetime.now().strftime('%Y%m%d')
+    number = next_value(f'trx:{day}',
+                        current_app.config.get('TRX_ID_LEASE_SIZE', 100),
+                        _initial_trx(day))
+    return f"TRX-{day}-{number:06d}"
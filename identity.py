@@ -0,0 +1,132 @@
+"""
+Kartu Pintar - Identitas User per Request
+==========================================
+
+Sebelumnya setiap halaman menjalankan `User.query.get(uid)` + lazy load
+`u.anggota` di context processor (foto sidebar), lalu route seperti
+/transaksi, /profile, dan API JWT memuat user yang sama LAGI → 2-4 query
+identitas per request.
+
+Sekarang:
+  - current_identity(): snapshot identitas user login (kolom User + ringkasan
+    anggota), dimuat SEKALI per request (disimpan di `g`) dengan satu query
+    User JOIN anggota. Dipakai context processor (`current_user` di semua
+    template), route web, dan handler API (uid dari session atau JWT).
+  - Cache lintas request per proses, key user id, TTL pendek
+    (IDENTITY_CACHE_TTL detik, 0 = nonaktif) → page view berikutnya tanpa
+    query identitas sama sekali.
+  - Invalidasi otomatis: listener `after_flush` Session — User / Anggota yang
+    kolom identitasnya berubah atau dihapus lewat ORM langsung dibuang dari
+    cache proses ini. Worker gunicorn lain melihat perubahan paling lambat
+    setelah TTL. Saldo/hutang TIDAK ikut di-snapshot (selalu baca dari DB).
+"""
+
+import time
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload
+
+from models import User, Anggota
+
+USER_FIELDS = ('id', 'username', 'nama', 'role', 'email', 'is_active', 'anggota_id',
+               'totp_enabled', 'token_version', 'created_at')
+ANGGOTA_FIELDS = ('id', 'kartu_id', 'nrp', 'nama', 'pangkat', 'satuan', 'foto', 'status_kartu')
+
+_cache = {}  # user_id → (expires_at, Identity)
+_cache_lock = Lock()
+_MISSING = object()
+
+
+class Identity:
+    """Snapshot read-only user login. `anggota` = dict ANGGOTA_FIELDS atau None."""
+
+    __slots__ = USER_FIELDS + ('anggota',)
+
+    def __init__(self, user):
+        for f in USER_FIELDS:
+            setattr(self, f, getattr(user, f))
+        a = user.anggota
+        self.anggota = {f: getattr(a, f) for f in ANGGOTA_FIELDS} if a else None
+
+    @property
+    def foto(self):
+        return self.anggota['foto'] if self.anggota else None
+
+    def to_dict(self):
+        data = {f: getattr(self, f) for f in USER_FIELDS if f not in ('created_at', 'token_version')}
+        data['anggota'] = dict(self.anggota) if self.anggota else None
+        return data
+
+
+def _ttl():
+    return current_app.config.get('IDENTITY_CACHE_TTL', 30)
+
+
+def load_identity(user_id):
+    """Identity dari cache proses (kalau masih segar) atau satu query User JOIN anggota."""
+    ttl = _ttl()
+    now = time.monotonic()
+    if ttl > 0:
+        with _cache_lock:
+            cached = _cache.get(user_id)
+        if cached and cached[0] > now:
+            return cached[1]
+    user = User.query.options(joinedload(User.anggota)).filter(User.id == user_id).first()
+    identity = Identity(user) if user else None
+    if ttl > 0 and identity:
+        with _cache_lock:
+            _cache[user_id] = (now + ttl, identity)
+    return identity
+
+
+def current_user_id():
+    """uid request ini: dari JWT (diset jwt_required) atau session web."""
+    uid = getattr(request, 'current_user_id', None)
+    return uid if uid is not None else session.get('user_id')
+
+
+def current_identity():
+    """Identity user login untuk request ini (None kalau belum login), dimuat sekali per request."""
+    if not has_request_context():
+        return None
+    identity = g.get('_identity', _MISSING)
+    if identity is _MISSING:
+        uid = current_user_id()
+        identity = load_identity(uid) if uid else None
+        g._identity = identity
+    return identity
+
+
+def invalidate_identity(user_ids=(), anggota_ids=()):
+    """Buang entri cache untuk user_ids dan user yang terhubung ke anggota_ids."""
+    user_ids, anggota_ids = set(user_ids), set(anggota_ids)
+    with _cache_lock:
+        for uid, (_, identity) in list(_cache.items()):
+            if uid in user_ids or (identity.anggota_id and identity.anggota_id in anggota_ids):
+                del _cache[uid]
+    if has_request_context():
+        g.pop('_identity', None)
+
+
+def _identity_changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in fields if f in state.attrs)
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_after_flush(session, flush_context):
+    user_ids, anggota_ids = set(), set()
+    for obj in session.dirty:
+        if isinstance(obj, User) and _identity_changed(obj, USER_FIELDS):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Anggota) and _identity_changed(obj, ANGGOTA_FIELDS):
+            anggota_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Anggota):
+            anggota_ids.add(obj.id)
+    if user_ids or anggota_ids:
+        invalidate_identity(user_ids, anggota_ids)
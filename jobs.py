@@ -0,0 +1,94 @@
+"""
+Kartu Pintar - Background Jobs (admin)
+=======================================
+
+Pekerjaan admin yang terlalu lama untuk satu request (bulk create user,
+import anggota, hapus massal) dijalankan di thread daemon (thread native di
+mode gevent, lihat serving.py), dengan status &
+progress disimpan di tabel `background_job` — supaya worker gunicorn mana
+pun bisa menjawab polling `GET /api/jobs/<job_id>`.
+
+PAKAI:
+    job = start_job(app, 'bulk_create_user', fungsi, user_id=session['user_id'])
+    # fungsi(progress, *args, **kwargs) dipanggil di dalam app context;
+    # progress(done, total, message=None) update baris job;
+    # nilai return (dict) disimpan sebagai `result`.
+"""
+
+import json
+import time
+import uuid
+from datetime import datetime
+
+from models import db, BackgroundJob
+from serving import start_background
+
+
+class JobProgress:
+    """
+    Callable progress untuk satu job. Ditulis lewat koneksi terpisah
+    (bukan db.session) supaya tidak ikut commit/rollback pekerjaan utama,
+    dan dibatasi max sekali per `min_interval` detik kecuali saat selesai.
+    """
+
+    def __init__(self, job_id, min_interval=0.5):
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last = 0.0
+
+    def __call__(self, done, total=None, message=None):
+        now = time.time()
+        finished = total is not None and done >= total
+        if not finished and now - self._last < self.min_interval:
+            return
+        self._last = now
+        values = {'progress_done': done}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['message'] = message[:255]
+        _update_job(self.job_id, **values)
+
+
+def _update_job(job_id, **values):
+    table = BackgroundJob.__table__
+    with db.engine.begin() as conn:
+        conn.execute(table.update().where(table.c.id == job_id).values(**values))
+
+
+def start_job(app, jenis, func, *args, user_id=None, **kwargs):
+    """Buat baris job lalu jalankan `func` di thread daemon. Return dict job."""
+    job = BackgroundJob(
+        id=uuid.uuid4().hex,
+        jenis=jenis,
+        status='pending',
+        created_by_user_id=user_id,
+    )
+    db.session.add(job)
+    db.session.commit()
+    job_dict = job.to_dict()
+
+    start_background(_run_job, app, job.id, func, args, kwargs, name=f'job-{jenis}-{job.id[:8]}')
+    return job_dict
+
+
+def _run_job(app, job_id, func, args, kwargs):
+    with app.app_context():
+        _update_job(job_id, status='running', started_at=datetime.now())
+        try:
+            result = func(JobProgress(job_id), *args, **kwargs)
+            _update_job(
+                job_id, status='done', finished_at=datetime.now(),
+                result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+            )
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Jobs] ❌ Job {job_id} ({func.__name__}) gagal: {e}")
+            _update_job(job_id, status='error', finished_at=datetime.now(), error=str(e)[:255])
+        finally:
+            db.session.remove()
+
+
+def get_job(job_id):
+    job = db.session.get(BackgroundJob, job_id)
+    return job.to_dict() if job else None
@@ -0,0 +1,85 @@
+"""
+Kartu Pintar - Verifikasi JWT (cache) & Revocation
+===================================================
+
+Terminal kasir memanggil /api/pembayaran/tap terus-menerus dengan token
+yang sama. Sebelumnya setiap request: decode + verifikasi HMAC token,
+lalu handler query User lagi untuk role / anggota_id.
+
+  - decode_token(): LRU token yang SUDAH terverifikasi, key SHA-256 token,
+    maksimal JWT_CACHE_SIZE entri per proses. Entri berlaku sampai `exp`
+    token itu sendiri (dicek setiap hit). Token invalid tidak di-cache.
+  - Claim `role` & `anggota_id` di token dipakai langsung oleh handler
+    (request.current_role / request.current_anggota_id).
+  - Claim `tv` (token version) = User.token_version saat token dibuat.
+    Versi dinaikkan otomatis (listener before_flush) saat password, role,
+    status aktif, atau link anggota berubah → semua token lama user itu
+    ditolak. Pengecekan lewat identity cache (identity.py): tanpa query
+    kalau cache masih segar, perubahan terlihat di worker lain paling
+    lambat setelah IDENTITY_CACHE_TTL.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import jwt as pyjwt
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import User
+from identity import load_identity
+
+# Perubahan kolom ini mencabut semua token user
+REVOKE_FIELDS = ('password_hash', 'role', 'is_active', 'anggota_id')
+
+_verified = OrderedDict()  # sha256(token) → payload
+_verified_lock = Lock()
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+def decode_token(token):
+    """Payload token yang valid; raise pyjwt.ExpiredSignatureError / InvalidTokenError."""
+    key = _digest(token)
+    with _verified_lock:
+        payload = _verified.get(key)
+        if payload is not None:
+            if payload.get('exp', 0) > time.time():
+                _verified.move_to_end(key)
+                return payload
+            del _verified[key]
+    payload = pyjwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+    size = current_app.config.get('JWT_CACHE_SIZE', 2048)
+    if size > 0 and 'exp' in payload:
+        with _verified_lock:
+            _verified[key] = payload
+            while len(_verified) > size:
+                _verified.popitem(last=False)
+    return payload
+
+
+def check_revocation(payload):
+    """
+    Identity user pemilik token kalau token masih berlaku (user aktif &
+    versi token sama), else None.
+    """
+    identity = load_identity(payload.get('user_id'))
+    if not identity or not identity.is_active:
+        return None
+    if (identity.token_version or 0) != payload.get('tv', 0):
+        return None
+    return identity
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_token_version(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[f].history.has_changes() for f in REVOKE_FIELDS):
+                obj.token_version = (obj.token_version or 0) + 1
@@ -0,0 +1,196 @@
+"""
+Kartu Pintar - Live Event Stream (Server-Sent Events)
+======================================================
+
+Fan-out event lokasi & status worker ke dashboard yang sedang terbuka
+(lacak_kartu.html, admin/findmy_trackers.html) tanpa polling/reload.
+
+Kenapa lewat tabel `live_event` (bukan memory / queue in-process):
+  - FindMy worker jalan di proses/container terpisah (`findmy_worker.py`)
+  - Gunicorn `--workers 4` → client SSE bisa nyangkut di worker mana saja
+  Satu-satunya yang dipakai bersama semua proses adalah database, jadi
+  publisher cukup INSERT satu baris, dan tiap stream SSE membaca baris
+  dengan id > Last-Event-ID.
+
+PUBLISH (dicatat di session caller, di-INSERT SETELAH commit bisnis):
+    publish_lokasi(anggota, sumber='NFC')
+    db.session.commit()   # → event ditulis di transaksi pendek sendiri
+
+  Rollback / session ditutup tanpa commit → event dibuang. Prune event
+  lama juga jalan di transaksi pendek itu, bukan di transaksi scan/bayar.
+
+CURSOR:
+  id auto-increment dibagikan saat INSERT, bukan saat commit — transaksi
+  id 10 bisa commit SETELAH id 11 sudah terkirim. Karena itu stream
+  mengingat id yang terlewati ("gap") dan membaca ulang id tersebut selama
+  LIVE_EVENT_LATE_SECONDS. Gap ikut di Last-Event-ID ("11~10"), jadi
+  reconnect juga tidak kehilangan event yang commit terlambat.
+
+STREAM:
+    GET /api/live/stream   (text/event-stream, lihat app.py)
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, LiveEvent
+
+_prune_lock = Lock()
+_publish_count = 0
+_PRUNE_EVERY = 100  # prune event lama tiap N publish per proses
+_MAX_GAPS = 200     # gap yang diingat per stream (id terbaru)
+
+_PENDING = 'live_events_pending'
+_COMMITTED = 'live_events_committed'
+
+
+def publish_event(jenis, data):
+    """
+    Catat event di session aktif. Event baru di-INSERT setelah caller
+    commit (transaksi terpisah), jadi tidak pernah terkirim untuk
+    perubahan yang di-rollback dan tidak menahan lock transaksi bisnis.
+    """
+    db.session.info.setdefault(_PENDING, []).append(
+        (jenis, json.dumps(data, ensure_ascii=False, default=str)))
+
+
+@event.listens_for(Session, 'after_commit')
+def _mark_committed(session):
+    if session.info.get(_PENDING):
+        session.info[_COMMITTED] = True
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _flush_pending(session, transaction):
+    # Dipanggil setelah koneksi session dikembalikan ke pool → tulis event
+    # dengan koneksi sendiri tanpa memegang dua koneksi sekaligus
+    if transaction.parent is not None:
+        return
+    pending = session.info.pop(_PENDING, None)
+    committed = session.info.pop(_COMMITTED, False)
+    if not pending or not committed:
+        return
+    global _publish_count
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(LiveEvent.__table__.insert(), [
+                {'jenis': jenis, 'payload': payload, 'created_at': datetime.now()} for jenis, payload in pending])
+        with _prune_lock:
+            before = _publish_count
+            _publish_count += len(pending)
+            should_prune = before // _PRUNE_EVERY != _publish_count // _PRUNE_EVERY
+        if should_prune:
+            prune_events()
+    except Exception as e:
+        print(f"⚠️ Live event gagal ditulis: {e}", flush=True)
+
+
+def publish_lokasi(anggota, sumber=None):
+    """Event 'lokasi' — lokasi terakhir anggota berubah (scan / GPS / Find Hub)."""
+    publish_event('lokasi', {
+        'kartu_id': anggota.kartu_id,
+        'nama': anggota.nama,
+        'status_kartu': anggota.status_kartu,
+        'lat': anggota.lokasi_lat,
+        'lng': anggota.lokasi_lng,
+        'lokasi': anggota.lokasi_nama,
+        'waktu': anggota.lokasi_waktu.strftime('%Y-%m-%d %H:%M:%S') if anggota.lokasi_waktu else None,
+        'sumber': sumber,
+    })
+
+
+def prune_events(max_age_seconds=None):
+    """Hapus event yang lebih tua dari LIVE_EVENT_RETENTION_SECONDS (transaksi sendiri)."""
+    from flask import current_app
+    if max_age_seconds is None:
+        max_age_seconds = current_app.config.get('LIVE_EVENT_RETENTION_SECONDS', 600)
+    cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+    with db.engine.begin() as conn:
+        conn.execute(LiveEvent.__table__.delete().where(LiveEvent.created_at < cutoff))
+
+
+def latest_event_id():
+    return db.session.query(db.func.max(LiveEvent.id)).scalar() or 0
+
+
+def parse_cursor(value):
+    """Last-Event-ID "11" / "11~8,10" → (11, [8, 10]); tidak valid → (None, [])."""
+    if not value:
+        return None, []
+    head, _, gaps = str(value).partition('~')
+    try:
+        return int(head), [int(g) for g in gaps.split(',') if g]
+    except ValueError:
+        return None, []
+
+
+def format_cursor(last_id, gaps):
+    return f"{last_id}~{','.join(str(g) for g in sorted(gaps))}" if gaps else str(last_id)
+
+
+def event_stream(last_id=None, jenis=None, max_seconds=25, poll_interval=1.0, heartbeat=15,
+                 gaps=None, late_seconds=5):
+    """
+    Generator SSE. Berhenti sendiri setelah `max_seconds` — EventSource di
+    browser otomatis reconnect dengan header Last-Event-ID, jadi tidak ada
+    event yang hilang, dan sync gunicorn worker tidak tertahan selamanya.
+
+    Id yang terlewati (transaksi publish yang belum commit saat id di
+    atasnya sudah terbaca) dibaca ulang selama `late_seconds`.
+    """
+    if last_id is None:
+        last_id = latest_event_id()
+        gaps = None
+    db.session.rollback()
+    now = time.time()
+    pending = {g: now for g in (gaps or []) if g < last_id}  # gap id → pertama terlihat
+
+    yield f"retry: 2000\nid: {format_cursor(last_id, pending)}\n\n"
+
+    started = last_beat = time.time()
+    while time.time() - started < max_seconds:
+        # Tanpa filter jenis di SQL: event jenis lain tetap memajukan cursor
+        # (kalau tidak, id-nya terlihat seperti gap)
+        cond = LiveEvent.id > last_id
+        if pending:
+            cond = db.or_(cond, LiveEvent.id.in_(list(pending)))
+        rows = db.session.query(LiveEvent.id, LiveEvent.jenis, LiveEvent.payload)\
+            .filter(cond).order_by(LiveEvent.id).limit(200).all()
+        # Akhiri transaksi supaya poll berikutnya lihat commit baru
+        # (MySQL REPEATABLE READ pakai snapshot per transaksi)
+        db.session.rollback()
+
+        now = time.time()
+        sent = False
+        for ev_id, ev_jenis, payload in rows:
+            if ev_id in pending:
+                del pending[ev_id]
+            elif ev_id > last_id:
+                for missing in range(max(last_id + 1, ev_id - _MAX_GAPS), ev_id):
+                    pending[missing] = now
+                last_id = ev_id
+            else:
+                continue
+            if jenis and ev_jenis not in jenis:
+                continue
+            sent = True
+            yield f"id: {format_cursor(last_id, pending)}\nevent: {ev_jenis}\ndata: {payload}\n\n"
+
+        # Gap yang tidak muncul dalam late_seconds = id rollback / terhapus
+        for g in [g for g, seen in pending.items() if now - seen > late_seconds]:
+            del pending[g]
+        while len(pending) > _MAX_GAPS:
+            del pending[min(pending)]
+
+        if sent:
+            last_beat = time.time()
+        elif time.time() - last_beat >= heartbeat:
+            last_beat = time.time()
+            yield f"id: {format_cursor(last_id, pending)}\n: ping\n\n"
+
+        time.sleep(poll_interval)
@@ -0,0 +1,355 @@
+"""
+Kartu Pintar - Retensi, Partisi & Downsample lokasi_history
+============================================================
+
+lokasi_history dapat satu baris tiap scan, pembayaran, dan tiap cycle
+FindMy, dan tidak pernah dibersihkan — tabel terbesar, padahal yang
+dibaca hanya 50-200 titik terbaru per anggota.
+
+PARTISI (MySQL)
+  lokasi_history dipartisi RANGE COLUMNS(waktu) per bulan (p202601,
+  p202602, ..., pmax). Syarat partisi InnoDB: semua unique key memuat
+  kolom partisi → PK jadi (id, waktu), dan TIDAK boleh ada foreign key →
+  fk_lokasi_anggota / fk_lokasi_scanned_by dibuang (hapus anggota sudah
+  menghapus riwayat lokasinya per chunk, anggota_deletion.py).
+  Konversi sekali (copy tabel penuh, jalankan saat maintenance):
+      python manage.py lokasi-maintenance --init-partitions
+
+ROTASI (cron harian)
+      python manage.py lokasi-maintenance [--dry-run]
+  1. Partisi bulan depan disiapkan (LOKASI_PARTITIONS_AHEAD) dengan
+     REORGANIZE pmax yang kosong — tidak ada data yang disalin.
+  2. Titik raw lebih tua dari LOKASI_RAW_RETENTION_DAYS di-downsample ke
+     lokasi_track_harian: satu baris per (anggota, tanggal) berisi
+     jumlah titik, rentang waktu, bounding box, dan satu titik per
+     LOKASI_TRACK_INTERVAL_MINUTES (titik terakhir tiap interval).
+  3. Partisi yang seluruh bulannya sudah lewat retensi di-DROP — hapus
+     file tablespace, bukan DELETE baris per baris. Raw efektif disimpan
+     N hari s.d. N hari + 1 bulan.
+  4. Jejak harian lebih tua dari LOKASI_TRACK_RETENTION_DAYS (0 = simpan
+     selamanya) dihapus per hari.
+
+  ALTER dijalankan dengan lock_wait_timeout pendek
+  (LOKASI_LOCK_WAIT_TIMEOUT): kalau ada transaksi panjang yang memegang
+  metadata lock, ALTER mundur dan dicoba lagi, bukan antri sambil
+  menahan semua INSERT lokasi di belakangnya.
+
+  Tanpa partisi (tabel belum dikonversi, SQLite dev) langkah 2-3 jalan
+  per HARI, dari yang tertua: downsample hari itu, lalu DELETE raw hari
+  itu per chunk (DELETE_CHUNK_SIZE, jeda DELETE_CHUNK_PAUSE) sampai habis,
+  baru hari berikutnya. Kalau rotasi berhenti di tengah, hanya satu hari
+  yang raw-nya tersisa sebagian — dan jejaknya sudah lengkap.
+
+  Downsample tidak pernah menimpa: anggota yang sudah punya jejak untuk
+  tanggal itu dilewati. Jejak yang dibangun dari raw lengkap tidak bisa
+  tertimpa jejak dari sisa raw yang terhapus sebagian.
+"""
+
+import json
+import time
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from flask import current_app
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, LokasiHistory, LokasiTrackHarian
+
+TABLE = 'lokasi_history'
+_raw = LokasiHistory.__table__
+_track = LokasiTrackHarian.__table__
+_ALTER_ATTEMPTS = 3
+
+
+def _is_mysql():
+    return db.engine.dialect.name == 'mysql'
+
+
+def _month(d):
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d, n):
+    years, month = divmod(d.month - 1 + n, 12)
+    return date(d.year + years, month + 1, 1)
+
+
+def _day_start(d):
+    return datetime.combine(d, datetime.min.time())
+
+
+# ============================================================
+# PARTISI
+# ============================================================
+
+def partitions():
+    """[(nama, batas_atas date | None untuk MAXVALUE, perkiraan baris)] — [] kalau tidak dipartisi."""
+    if not _is_mysql():
+        return []
+    rows = db.session.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"), {'table': TABLE}).all()
+    result = []
+    for name, description, n in rows:
+        bound = None if description == 'MAXVALUE' else \
+            datetime.strptime(description.strip("'")[:10], '%Y-%m-%d').date()
+        result.append((name, bound, int(n or 0)))
+    return result
+
+
+def _partition_defs(months, maxvalue=True):
+    """Definisi partisi bulanan `months` (awal bulan), + pmax."""
+    defs = [f"PARTITION p{m:%Y%m} VALUES LESS THAN ('{_add_months(m, 1):%Y-%m-%d}')" for m in months]
+    if maxvalue:
+        defs.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    return ',\n    '.join(defs)
+
+
+def _alter(sql, dry_run=False):
+    """ALTER TABLE dengan lock_wait_timeout pendek, dicoba ulang kalau metadata lock sedang dipegang."""
+    print(f"   {sql}" if dry_run else f"   → {sql.splitlines()[0]}", flush=True)
+    if dry_run:
+        return
+    lock_wait = int(current_app.config.get('LOKASI_LOCK_WAIT_TIMEOUT', 5))
+    for attempt in range(1, _ALTER_ATTEMPTS + 1):
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text(f"SET SESSION lock_wait_timeout = {lock_wait}"))
+                try:
+                    conn.execute(text(sql))
+                finally:
+                    conn.execute(text("SET SESSION lock_wait_timeout = DEFAULT"))
+            return
+        except OperationalError as e:
+            # 1205 Lock wait timeout exceeded — ada transaksi panjang di tabel ini
+            if attempt == _ALTER_ATTEMPTS or 'Lock wait timeout' not in str(e):
+                raise
+            print(f"   ⏳ metadata lock sibuk, coba lagi ({attempt}/{_ALTER_ATTEMPTS})", flush=True)
+            time.sleep(attempt * 5)
+
+
+def init_partitions(ahead=None, dry_run=False):
+    """
+    Konversi sekali lokasi_history jadi partisi bulanan: buang foreign key,
+    PK (id, waktu), PARTITION BY RANGE COLUMNS(waktu). Return jumlah partisi
+    bulanan, 0 kalau sudah dipartisi.
+    """
+    if not _is_mysql():
+        raise RuntimeError('Partisi hanya didukung di MySQL')
+    if partitions():
+        return 0
+    ahead = current_app.config.get('LOKASI_PARTITIONS_AHEAD', 3) if ahead is None else ahead
+
+    foreign_keys = [name for (name,) in db.session.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND CONSTRAINT_TYPE = 'FOREIGN KEY'"),
+        {'table': TABLE})]
+    oldest = db.session.query(func.min(LokasiHistory.waktu)).scalar()
+    db.session.rollback()  # jangan pegang metadata lock selama ALTER
+
+    first = _month(oldest or date.today())
+    last = _add_months(_month(date.today()), ahead)
+    months = []
+    while first <= last:
+        months.append(first)
+        first = _add_months(first, 1)
+
+    if foreign_keys:
+        # InnoDB in-place, tanpa copy tabel
+        _alter(f"ALTER TABLE {TABLE} " + ', '.join(f"DROP FOREIGN KEY {fk}" for fk in foreign_keys), dry_run)
+    _alter(f"ALTER TABLE {TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, waktu)\n"
+           f"PARTITION BY RANGE COLUMNS(waktu) (\n    {_partition_defs(months)}\n)", dry_run)
+    return len(months)
+
+
+def ensure_future_partitions(ahead=None, dry_run=False):
+    """Siapkan partisi sampai `ahead` bulan ke depan (REORGANIZE pmax kosong). Return nama partisi baru."""
+    parts = partitions()
+    db.session.rollback()
+    if not parts:
+        return []
+    ahead = current_app.config.get('LOKASI_PARTITIONS_AHEAD', 3) if ahead is None else ahead
+    bounded = [bound for _, bound, _ in parts if bound]
+    month = bounded[-1] if bounded else _month(date.today())  # batas atas terakhir = awal bulan berikutnya
+    target = _add_months(_month(date.today()), ahead)
+    months = []
+    while month <= target:
+        months.append(month)
+        month = _add_months(month, 1)
+    if not months:
+        return []
+    if any(name == 'pmax' for name, _, _ in parts):
+        _alter(f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO (\n    {_partition_defs(months)}\n)", dry_run)
+    else:
+        _alter(f"ALTER TABLE {TABLE} ADD PARTITION (\n    {_partition_defs(months, False)}\n)", dry_run)
+    return [f"p{m:%Y%m}" for m in months]
+
+
+# ============================================================
+# DOWNSAMPLE
+# ============================================================
+
+def _track_points(rows, interval):
+    """Titik terakhir per interval menit: [[menit, lat, lng], ...]."""
+    buckets = {}
+    for _, waktu, lat, lng in rows:
+        minute = waktu.hour * 60 + waktu.minute
+        buckets[minute // interval] = [minute, round(lat, 5), round(lng, 5)]
+    return [buckets[k] for k in sorted(buckets)]
+
+
+def downsample_day(day, interval=None):
+    """
+    Isi lokasi_track_harian untuk satu tanggal dari titik raw, hanya untuk
+    anggota yang belum punya jejak tanggal itu. Return jumlah jejak baru.
+    """
+    interval = max(1, interval or current_app.config.get('LOKASI_TRACK_INTERVAL_MINUTES', 15))
+    start = _day_start(day)
+    existing = {a for (a,) in db.session.execute(select(_track.c.anggota_id).where(_track.c.tanggal == day))}
+    result = db.session.execute(
+        select(_raw.c.anggota_id, _raw.c.waktu, _raw.c.latitude, _raw.c.longitude)
+        .where(_raw.c.waktu >= start, _raw.c.waktu < start + timedelta(days=1))
+        .order_by(_raw.c.anggota_id, _raw.c.waktu)
+        .execution_options(yield_per=5000))
+    now = datetime.now()
+    tracks = []
+    for anggota_id, group in groupby(result, key=lambda r: r[0]):
+        if anggota_id in existing:
+            continue
+        rows = list(group)
+        lats = [r[2] for r in rows]
+        lngs = [r[3] for r in rows]
+        tracks.append({
+            'anggota_id': anggota_id, 'tanggal': day, 'jumlah_titik': len(rows),
+            'waktu_awal': rows[0][1], 'waktu_akhir': rows[-1][1],
+            'lat_min': min(lats), 'lat_max': max(lats), 'lng_min': min(lngs), 'lng_max': max(lngs),
+            'track': json.dumps(_track_points(rows, interval), separators=(',', ':')),
+            'created_at': now,
+        })
+    for i in range(0, len(tracks), 1000):
+        db.session.execute(_track.insert(), tracks[i:i + 1000])
+    db.session.commit()
+    return len(tracks)
+
+
+def downsample_range(start, end, interval=None, dry_run=False):
+    """Downsample tanggal [start, end). Return (hari, jejak anggota)."""
+    days = tracks = 0
+    day = start
+    while day < end:
+        if not dry_run:
+            tracks += downsample_day(day, interval)
+        days += 1
+        day += timedelta(days=1)
+    return days, tracks
+
+
+def daily_track(anggota_id, start, end):
+    """Jejak harian anggota untuk tanggal [start, end] — titik [waktu ISO, lat, lng]."""
+    rows = LokasiTrackHarian.query.filter(
+        LokasiTrackHarian.anggota_id == anggota_id,
+        LokasiTrackHarian.tanggal >= start, LokasiTrackHarian.tanggal <= end,
+    ).order_by(LokasiTrackHarian.tanggal).all()
+    points = []
+    for row in rows:
+        base = _day_start(row.tanggal)
+        for minute, lat, lng in json.loads(row.track):
+            points.append([(base + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M:%S'), lat, lng])
+    return points
+
+
+# ============================================================
+# ROTASI
+# ============================================================
+
+def _delete_raw_day(day, chunk_size, pause):
+    """Hapus SEMUA titik raw satu tanggal per chunk id. Return jumlah baris."""
+    start = _day_start(day)
+    deleted = 0
+    while True:
+        ids = [i for (i,) in db.session.execute(
+            select(_raw.c.id).where(_raw.c.waktu >= start, _raw.c.waktu < start + timedelta(days=1))
+            .order_by(_raw.c.id).limit(chunk_size))]
+        if not ids:
+            return deleted
+        db.session.execute(_raw.delete().where(_raw.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def prune_tracks(keep_days, dry_run=False):
+    """Hapus jejak harian lebih tua dari keep_days (per tanggal). Return jumlah baris."""
+    if not keep_days:
+        return 0
+    cutoff = date.today() - timedelta(days=keep_days)
+    if dry_run:
+        return db.session.query(func.count()).select_from(_track).where(_track.c.tanggal < cutoff).scalar() or 0
+    deleted = 0
+    for (tanggal,) in db.session.execute(
+            select(_track.c.tanggal).where(_track.c.tanggal < cutoff).distinct().order_by(_track.c.tanggal)).all():
+        deleted += db.session.execute(_track.delete().where(_track.c.tanggal == tanggal)).rowcount
+        db.session.commit()
+    return deleted
+
+
+def rotate(raw_days=None, track_days=None, ahead=None, dry_run=False, log=print):
+    """Satu putaran maintenance (lihat docstring modul). Return ringkasan."""
+    config = current_app.config
+    raw_days = config.get('LOKASI_RAW_RETENTION_DAYS', 180) if raw_days is None else raw_days
+    track_days = config.get('LOKASI_TRACK_RETENTION_DAYS', 0) if track_days is None else track_days
+    cutoff = date.today() - timedelta(days=raw_days)
+    summary = {'cutoff': cutoff.isoformat(), 'partitioned': bool(partitions()), 'new_partitions': [],
+               'dropped_partitions': [], 'downsampled_days': 0, 'tracks': 0, 'raw_deleted': 0,
+               'tracks_deleted': 0}
+
+    if summary['partitioned']:
+        summary['new_partitions'] = ensure_future_partitions(ahead, dry_run)
+        # Hanya partisi yang SELURUH bulannya lebih tua dari cutoff
+        expired = [(name, bound, n) for name, bound, n in partitions() if bound and bound <= cutoff]
+        remove_before = expired[-1][1] if expired else None
+    else:
+        expired = []
+        remove_before = cutoff
+    oldest = db.session.query(func.min(LokasiHistory.waktu)).scalar()
+    db.session.rollback()
+
+    if remove_before and oldest and oldest.date() < remove_before:
+        log(f"   downsample {oldest.date()} s.d. {remove_before - timedelta(days=1)} → lokasi_track_harian")
+        if summary['partitioned'] or dry_run:
+            summary['downsampled_days'], summary['tracks'] = downsample_range(
+                oldest.date(), remove_before, dry_run=dry_run)
+        if summary['partitioned']:
+            names = [name for name, _, _ in expired]
+            _alter(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(names)}", dry_run)
+            summary['dropped_partitions'] = names
+            summary['raw_deleted'] = sum(n for _, _, n in expired)  # perkiraan information_schema
+        elif dry_run:
+            summary['raw_deleted'] = db.session.query(func.count(LokasiHistory.id))\
+                .filter(LokasiHistory.waktu < _day_start(cutoff)).scalar() or 0
+        else:
+            # Per hari: jejak dulu, lalu raw hari itu sampai habis
+            chunk_size = max(1, config.get('DELETE_CHUNK_SIZE', 1000))
+            pause = config.get('DELETE_CHUNK_PAUSE', 0.05)
+            day = oldest.date()
+            while day < remove_before:
+                summary['tracks'] += downsample_day(day)
+                summary['raw_deleted'] += _delete_raw_day(day, chunk_size, pause)
+                summary['downsampled_days'] += 1
+                day += timedelta(days=1)
+
+    summary['tracks_deleted'] = prune_tracks(track_days, dry_run)
+    return summary
+
+
+def status():
+    """Ringkasan ukuran raw / jejak harian / partisi untuk `--status`."""
+    oldest, newest, raw = db.session.query(
+        func.min(LokasiHistory.waktu), func.max(LokasiHistory.waktu), func.count(LokasiHistory.id)).one()
+    track_oldest, tracks = db.session.query(
+        func.min(LokasiTrackHarian.tanggal), func.count()).select_from(LokasiTrackHarian).one()
+    return {'raw_rows': raw, 'raw_oldest': oldest, 'raw_newest': newest,
+            'track_rows': tracks, 'track_oldest': track_oldest, 'partitions': partitions()}
@@ -5,10 +5,30 @@ Usage:
     python manage.py seed          # Seed with dummy data
     python manage.py drop-db       # Drop all tables (WARNING!)
     python manage.py reset-db      # Drop + Create + Seed
+    python manage.py seed-scale [--anggota N] [--trx N] [--lokasi N] [--trackers N] [--days N]
+                                   [--processes N] [--batch-size N] [--seed N]
+                                   # Data sintetis skala produksi untuk load test
     python manage.py create-user   # Create a new user
     python manage.py migrate-totp  # Add 2FA columns to existing users table
     python manage.py migrate-hutang # Add hutang columns (anggota + transaksi)
     python manage.py reset-totp    # Reset 2FA for a specific user
+    python manage.py migrate-backup-codes [--drop-legacy]
+                                   # Cek / buang kode cadangan 2FA format lama (tanpa lookup id)
+    python manage.py bulk-create-users [--processes N] [--batch-size N]
+                                   # Akun login untuk semua anggota tanpa user (username/password = NRP)
+    python manage.py import-anggota <file.csv|file.xlsx> [--dry-run] [--report error.csv] [--batch-size N]
+                                   # Bulk import anggota, laporan error per baris
+    python manage.py export transaksi|lokasi --out file.csv|file.xlsx [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+                                   [--jenis J] [--status S] [--metode M] [--operator-id N] [--sumber S] [--anggota KARTU/NRP]
+                                   # Export streaming (untuk cron)
+    python manage.py rebuild-rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+                                   # Hitung ulang rollup harian transaksi (backfill)
+    python manage.py delete-anggota [KARTU/NRP ...] [--file daftar.txt] [--kartu-prefix P] [--nrp-prefix P]
+                                   [--chunk-size N] [--pause DETIK] [--yes]
+                                   # Hapus anggota + transaksi/riwayat lokasi per chunk (mis. angkatan lulus)
+    python manage.py lokasi-maintenance [--raw-days N] [--track-days N] [--ahead N] [--dry-run]
+                                   [--init-partitions] [--status]
+                                   # Retensi lokasi_history: partisi bulanan, downsample ke jejak harian (cron harian)
 """
 
 import sys
@@ -50,6 +70,43 @@ def seed():
         seed_database()
 
 
+def seed_scale():
+    """Generate data sintetis besar (anggota, transaksi, lokasi, tracker) untuk load test."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='manage.py seed-scale')
+    parser.add_argument('--anggota', type=int, default=1000)
+    parser.add_argument('--trx', type=int, default=50000, help='Total transaksi')
+    parser.add_argument('--lokasi', type=int, default=200000, help='Total baris lokasi_history')
+    parser.add_argument('--trackers', type=int, default=None, help='Jumlah tracker FindMy (default: anggota/10)')
+    parser.add_argument('--days', type=int, default=365, help='Rentang hari ke belakang dari hari ini')
+    parser.add_argument('--processes', type=int, default=None, help='Proses paralel (default: CPU, maks 8)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Baris per INSERT multi-row + commit')
+    parser.add_argument('--seed', type=int, default=42, help='Seed random (hasil sama untuk seed sama)')
+    args = parser.parse_args(sys.argv[2:])
+
+    app = create_app()
+    with app.app_context():
+        import time
+        from seed import seed_scale as run_seed_scale
+        db.create_all()
+        started = time.time()
+
+        def progress(done, total, counts):
+            elapsed = time.time() - started
+            print(f"\r   {done}/{total} anggota | {counts.get('transaksi', 0)} transaksi | "
+                  f"{counts.get('lokasi', 0)} lokasi | {elapsed:.0f}s", end='', flush=True)
+
+        result = run_seed_scale(anggota=args.anggota, trx=args.trx, lokasi=args.lokasi, trackers=args.trackers,
+                                days=args.days, processes=args.processes, batch_size=args.batch_size,
+                                seed=args.seed, progress=progress)
+        elapsed = time.time() - started
+        rows = result['anggota'] + result['transaksi'] + result['lokasi'] + result['tracker']
+        print()
+        print(f"✅ Seed skala selesai dalam {elapsed:.1f}s ({rows / elapsed:.0f} baris/detik): "
+              f"{result['anggota']} anggota, {result['transaksi']} transaksi, "
+              f"{result['lokasi']} lokasi, {result['tracker']} tracker.")
+
+
 def reset_db():
     """Drop + Create + Seed"""
     app = create_app()
@@ -173,6 +230,282 @@ def reset_totp():
         print(f"✅ 2FA untuk '{username}' di-reset. User akan setup ulang saat login berikutnya.")
 
 
+def migrate_backup_codes():
+    """
+    Kode cadangan format lama = list hash pbkdf2 tanpa lookup id → kode salah
+    memicu sampai 8x pbkdf2. Hash bersifat satu arah, jadi lookup id tidak bisa
+    dihitung tanpa kode aslinya: entri lama tetap berlaku (dicek cara lama)
+    sampai user setup ulang 2FA, atau dibuang dengan --drop-legacy.
+    """
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(prog='manage.py migrate-backup-codes')
+    parser.add_argument('--drop-legacy', action='store_true',
+                        help='Buang kode cadangan format lama (user tetap login dengan Authenticator; '
+                             'reset 2FA dari admin untuk mendapat kode baru)')
+    args = parser.parse_args(sys.argv[2:])
+
+    app = create_app()
+    with app.app_context():
+        users = [u for u in User.query.filter(User.totp_backup_codes.isnot(None)) if u.has_legacy_backup_codes()]
+        if not users:
+            print("✅ Semua kode cadangan sudah format baru. Tidak ada perubahan.")
+            return
+        print(f"   {len(users)} user masih punya kode cadangan format lama:")
+        for u in users[:20]:
+            print(f"   - {u.username}")
+        if len(users) > 20:
+            print(f"   ... {len(users) - 20} lainnya")
+        if not args.drop_legacy:
+            print("   Jalankan dengan --drop-legacy untuk membuangnya.")
+            return
+        for u in users:
+            entries = [e for e in json.loads(u.totp_backup_codes) if not isinstance(e, str)]
+            u.totp_backup_codes = json.dumps(entries) if entries else None
+        db.session.commit()
+        print(f"✅ Kode cadangan format lama dibuang dari {len(users)} user.")
+
+
+def bulk_create_users():
+    """Buat user untuk semua anggota tanpa akun (hash paralel, insert per batch)."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='manage.py bulk-create-users')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Jumlah proses hash password (default: PROVISION_PROCESSES / otomatis)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='User per INSERT + commit (default: PROVISION_BATCH_SIZE)')
+    args = parser.parse_args(sys.argv[2:])
+
+    app = create_app()
+    with app.app_context():
+        import time
+        from provisioning import bulk_create_users as run_bulk
+
+        def progress(done, total, message=None):
+            if total:
+                print(f"\r   {done}/{total} ({100 * done // total}%)", end='', flush=True)
+
+        started = time.time()
+        result = run_bulk(progress=progress, processes=args.processes, batch_size=args.batch_size)
+        print()
+        print(f"✅ Bulk create selesai dalam {time.time() - started:.1f}s: "
+              f"{result['created']} akun dibuat, {result['skipped']} dilewati (username sudah ada).")
+
+
+def import_anggota():
+    """Bulk import anggota dari CSV/XLSX."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='manage.py import-anggota')
+    parser.add_argument('file', help='File .csv / .xlsx (baris pertama = header)')
+    parser.add_argument('--dry-run', action='store_true', help='Validasi saja, tidak menyimpan')
+    parser.add_argument('--report', help='Tulis laporan error per baris ke file CSV ini')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Baris per INSERT + commit (default: IMPORT_BATCH_SIZE)')
+    args = parser.parse_args(sys.argv[2:])
+
+    if not os.path.isfile(args.file):
+        print(f"❌ File tidak ditemukan: {args.file}")
+        sys.exit(1)
+
+    app = create_app()
+    with app.app_context():
+        import time
+        from anggota_import import import_anggota as run_import, ImportFileError, write_error_report
+
+        all_errors = []
+
+        def progress(done, total, message=None):
+            print(f"\r   {message or done}", end='', flush=True)
+
+        started = time.time()
+        try:
+            result = run_import(args.file, dry_run=args.dry_run, batch_size=args.batch_size,
+                                progress=progress, on_error=all_errors.append)
+        except ImportFileError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print()
+
+        label = "Dry run" if args.dry_run else "Import"
+        print(f"✅ {label} selesai dalam {time.time() - started:.1f}s: "
+              f"{result['imported']} {'valid' if args.dry_run else 'diimport'}, "
+              f"{result['invalid']} invalid dari {result['total']} baris.")
+        if result['kartu_id_first']:
+            print(f"   kartu_id: {result['kartu_id_first']} s/d {result['kartu_id_last']}")
+        if all_errors:
+            if args.report:
+                with open(args.report, 'w', newline='', encoding='utf-8') as fp:
+                    write_error_report(all_errors, fp)
+                print(f"   Laporan error: {args.report}")
+            else:
+                for e in all_errors[:20]:
+                    print(f"   ⚠️  baris {e['baris']} ({e['nrp']}): {'; '.join(e['errors'])}")
+                if len(all_errors) > 20:
+                    print(f"   ... {len(all_errors) - 20} error lain (pakai --report error.csv)")
+
+
+def export():
+    """Export transaksi / lokasi_history ke CSV/XLSX (streaming, memory konstan)."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='manage.py export')
+    parser.add_argument('kind', choices=['transaksi', 'lokasi'])
+    # Wajib file: stdout sudah berisi log init (FindMy) dari import app
+    parser.add_argument('--out', required=True, help='File output (.csv / .xlsx)')
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default=None,
+                        help='Default: dari ekstensi --out')
+    parser.add_argument('--start', help='Dari tanggal (YYYY-MM-DD)')
+    parser.add_argument('--end', help='Sampai tanggal, inklusif (YYYY-MM-DD)')
+    parser.add_argument('--jenis')
+    parser.add_argument('--status')
+    parser.add_argument('--metode')
+    parser.add_argument('--operator-id')
+    parser.add_argument('--sumber')
+    parser.add_argument('--anggota', help='kartu_id atau NRP')
+    args = parser.parse_args(sys.argv[2:])
+
+    fmt = args.format or ('xlsx' if args.out.lower().endswith('.xlsx') else 'csv')
+    filters = {k: v for k, v in vars(args).items()
+               if k in ('start', 'end', 'jenis', 'status', 'metode', 'operator_id', 'sumber', 'anggota') and v}
+
+    app = create_app()
+    with app.app_context():
+        from exports import export_chunks, ExportFilterError
+        try:
+            chunks, _, _ = export_chunks(args.kind, fmt, filters)
+        except ExportFilterError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        mode, kwargs = ('w', {'newline': '', 'encoding': 'utf-8'}) if fmt == 'csv' else ('wb', {})
+        with open(args.out, mode, **kwargs) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        print(f"✅ Export {args.kind} → {args.out}")
+
+
+def rebuild_rollups():
+    """Backfill / hitung ulang rollup_transaksi_harian dari tabel transaksi."""
+    import argparse
+    from datetime import datetime
+    parser = argparse.ArgumentParser(prog='manage.py rebuild-rollups')
+    parser.add_argument('--start', type=lambda v: datetime.strptime(v, '%Y-%m-%d').date(),
+                        help='Dari tanggal (default: semua)')
+    parser.add_argument('--end', type=lambda v: datetime.strptime(v, '%Y-%m-%d').date(),
+                        help='Sampai tanggal, inklusif (default: semua)')
+    args = parser.parse_args(sys.argv[2:])
+
+    app = create_app()
+    with app.app_context():
+        import time
+        from rollups import rebuild
+        db.create_all()  # tabel rollup baru
+        started = time.time()
+        n = rebuild(args.start, args.end)
+        print(f"✅ Rollup dibangun ulang: {n} baris agregat dalam {time.time() - started:.1f}s")
+
+
+def delete_anggota():
+    """Hapus anggota (cascade transaksi & riwayat lokasi) per chunk."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='manage.py delete-anggota')
+    parser.add_argument('anggota', nargs='*', help='kartu_id / NRP')
+    parser.add_argument('--file', help='File berisi kartu_id / NRP, satu per baris')
+    parser.add_argument('--kartu-prefix', help='Semua anggota dengan kartu_id berawalan ini (mis. KP-2022-)')
+    parser.add_argument('--nrp-prefix', help='Semua anggota dengan NRP berawalan ini')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Baris per DELETE + commit (default: DELETE_CHUNK_SIZE)')
+    parser.add_argument('--pause', type=float, default=None,
+                        help='Jeda antar chunk dalam detik (default: DELETE_CHUNK_PAUSE)')
+    parser.add_argument('--yes', action='store_true', help='Tanpa konfirmasi')
+    args = parser.parse_args(sys.argv[2:])
+
+    daftar = list(args.anggota)
+    if args.file:
+        with open(args.file, encoding='utf-8-sig') as fp:
+            daftar += fp.read().replace(',', '\n').splitlines()
+
+    app = create_app()
+    with app.app_context():
+        import time
+        from anggota_deletion import resolve_anggota_ids, delete_anggota as run_delete
+
+        anggota_ids = resolve_anggota_ids(daftar, args.kartu_prefix, args.nrp_prefix)
+        if not anggota_ids:
+            print("❌ Tidak ada anggota yang cocok.")
+            sys.exit(1)
+        if not args.yes:
+            confirm = input(f"⚠️  Hapus {len(anggota_ids)} anggota beserta transaksi & riwayat lokasinya? Type 'yes' to confirm: ")
+            if confirm.lower() != 'yes':
+                print("❌ Cancelled.")
+                return
+
+        def progress(done, total, message=None):
+            if total:
+                print(f"\r   {done}/{total} ({100 * done // total}%)", end='', flush=True)
+
+        started = time.time()
+        result = run_delete(anggota_ids, progress=progress, chunk_size=args.chunk_size, pause=args.pause)
+        print()
+        print(f"✅ Selesai dalam {time.time() - started:.1f}s: {result['anggota']} anggota dihapus, "
+              f"{result['transaksi_lokasi']} transaksi/riwayat lokasi.")
+
+
+def lokasi_maintenance():
+    """Rotasi partisi lokasi_history + downsample ke lokasi_track_harian (lihat lokasi_retention.py)."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='manage.py lokasi-maintenance')
+    parser.add_argument('--raw-days', type=int, default=None,
+                        help='Retensi titik raw dalam hari (default: LOKASI_RAW_RETENTION_DAYS)')
+    parser.add_argument('--track-days', type=int, default=None,
+                        help='Retensi jejak harian, 0 = selamanya (default: LOKASI_TRACK_RETENTION_DAYS)')
+    parser.add_argument('--ahead', type=int, default=None,
+                        help='Partisi bulan ke depan yang disiapkan (default: LOKASI_PARTITIONS_AHEAD)')
+    parser.add_argument('--dry-run', action='store_true', help='Tampilkan rencana/SQL tanpa mengubah data')
+    parser.add_argument('--init-partitions', action='store_true',
+                        help='Konversi sekali lokasi_history ke partisi bulanan (MySQL, copy tabel penuh)')
+    parser.add_argument('--status', action='store_true', help='Ukuran raw / jejak harian / partisi')
+    args = parser.parse_args(sys.argv[2:])
+
+    app = create_app()
+    with app.app_context():
+        import time
+        import lokasi_retention
+        db.create_all()  # tabel lokasi_track_harian baru
+
+        if args.status:
+            info = lokasi_retention.status()
+            print(f"lokasi_history      : {info['raw_rows']} baris ({info['raw_oldest']} s.d. {info['raw_newest']})")
+            print(f"lokasi_track_harian : {info['track_rows']} baris (sejak {info['track_oldest']})")
+            if not info['partitions']:
+                print("Partisi             : - (jalankan --init-partitions di MySQL)")
+            for name, bound, rows in info['partitions']:
+                print(f"   {name:<10} < {bound or 'MAXVALUE'}  ±{rows} baris")
+            return
+
+        started = time.time()
+        if args.init_partitions:
+            try:
+                n = lokasi_retention.init_partitions(args.ahead, args.dry_run)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            if not n:
+                print("ℹ️  lokasi_history sudah dipartisi.")
+            else:
+                print(f"✅ {n} partisi bulanan{' (dry run)' if args.dry_run else ''} dalam {time.time() - started:.1f}s")
+            return
+
+        result = lokasi_retention.rotate(args.raw_days, args.track_days, args.ahead, args.dry_run)
+        label = ' (dry run, tidak ada yang diubah)' if args.dry_run else ''
+        print(f"✅ Retensi lokasi{label} — cutoff raw {result['cutoff']}, {time.time() - started:.1f}s")
+        if result['new_partitions']:
+            print(f"   partisi baru   : {', '.join(result['new_partitions'])}")
+        if result['dropped_partitions']:
+            print(f"   partisi dibuang: {', '.join(result['dropped_partitions'])}")
+        print(f"   downsample     : {result['downsampled_days']} hari, {result['tracks']} jejak anggota")
+        print(f"   raw dihapus    : {result['raw_deleted']}{' (perkiraan)' if result['partitioned'] else ''}")
+        print(f"   jejak dihapus  : {result['tracks_deleted']}")
+
+
 def show_help():
     print(__doc__)
 
@@ -183,10 +516,18 @@ if __name__ == '__main__':
         'drop-db': drop_db,
         'seed': seed,
         'reset-db': reset_db,
+        'seed-scale': seed_scale,
         'create-user': create_user,
         'migrate-totp': migrate_totp,
         'migrate-hutang': migrate_hutang,
         'reset-totp': reset_totp,
+        'migrate-backup-codes': migrate_backup_codes,
+        'bulk-create-users': bulk_create_users,
+        'import-anggota': import_anggota,
+        'export': export,
+        'rebuild-rollups': rebuild_rollups,
+        'delete-anggota': delete_anggota,
+        'lokasi-maintenance': lokasi_maintenance,
         'help': show_help,
     }
 
@@ -0,0 +1,256 @@
+"""
+Kartu Pintar - Metrics Prometheus (web + FindMy worker)
+=========================================================
+
+Sebelumnya angka operasional hanya ada di baris `print(..., flush=True)`
+docker logs. Modul ini mengekspor metrics format Prometheus:
+
+  WEB (gunicorn, GET /metrics)
+    kartupintar_http_request_duration_seconds{method,endpoint}   histogram
+    kartupintar_http_requests_total{method,endpoint,status}
+    kartupintar_transaksi_total{jenis,status,metode}              (setelah commit)
+    kartupintar_transaksi_nominal_rupiah_total{jenis,status,metode}
+    kartupintar_db_pool_checked_out / _connections / _capacity    (per proses, dijumlah)
+    kartupintar_db_pool_overflow                                  koneksi di atas pool_size
+    kartupintar_db_pool_checkout_wait_seconds                     histogram (db_pool.py)
+    kartupintar_db_pool_overflow_checkouts_total
+    kartupintar_db_pool_timeouts_total
+    kartupintar_db_pool_invalidations_total{reason}               pre_ping | disconnect
+
+  FINDMY WORKER (findmy_worker.py, HTTP exporter sendiri di FINDMY_METRICS_PORT)
+    kartupintar_findmy_cycle_duration_seconds                    histogram
+    kartupintar_findmy_cycles_total{result}
+    kartupintar_findmy_locate_duration_seconds{result}           histogram
+    kartupintar_findmy_tracker_locate_seconds{kartu_id}          latency locate terakhir per tracker
+    kartupintar_findmy_job_queue_depth                           job locate/update-all antri/jalan
+    kartupintar_findmy_last_success_timestamp_seconds
+
+MULTIPROCESS: gunicorn punya beberapa worker → tiap proses menulis nilai
+ke file mmap di PROMETHEUS_MULTIPROC_DIR (diset gunicorn.conf.py SEBELUM
+worker di-fork), /metrics menjumlahkan semua file lewat
+MultiProcessCollector. Tanpa env itu (flask run, worker FindMy) registry
+biasa di memory proses.
+
+Butuh paket `prometheus-client` (requirements.txt). Kalau tidak terpasang
+atau METRICS_ENABLED=0, semua fungsi di sini no-op dan /metrics tidak ada.
+/metrics dilindungi METRICS_TOKEN (header `Authorization: Bearer <token>`);
+tanpa token hanya bisa diakses dari localhost.
+"""
+
+import os
+import time
+
+from flask import Response, g, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+try:
+    import prometheus_client as prom
+    from prometheus_client import multiprocess
+except ImportError:  # metrics opsional
+    prom = None
+
+from models import db, Transaksi
+
+if prom is not None:
+    HTTP_LATENCY = prom.Histogram(
+        'kartupintar_http_request_duration_seconds', 'Latency request HTTP per endpoint',
+        ['method', 'endpoint'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+    HTTP_REQUESTS = prom.Counter(
+        'kartupintar_http_requests_total', 'Jumlah request HTTP', ['method', 'endpoint', 'status'])
+    TRANSAKSI = prom.Counter(
+        'kartupintar_transaksi_total', 'Transaksi ter-commit (pembayaran, top up, bayar hutang)',
+        ['jenis', 'status', 'metode'])
+    TRANSAKSI_NOMINAL = prom.Counter(
+        'kartupintar_transaksi_nominal_rupiah_total', 'Total nominal transaksi ter-commit (Rupiah)',
+        ['jenis', 'status', 'metode'])
+    DB_POOL_CHECKED_OUT = prom.Gauge(
+        'kartupintar_db_pool_checked_out', 'Koneksi DB yang sedang dipinjam request', multiprocess_mode='livesum')
+    DB_POOL_CONNECTIONS = prom.Gauge(
+        'kartupintar_db_pool_connections', 'Koneksi DB terbuka (idle + dipinjam)', multiprocess_mode='livesum')
+    DB_POOL_CAPACITY = prom.Gauge(
+        'kartupintar_db_pool_capacity', 'pool_size + max_overflow', multiprocess_mode='livesum')
+    DB_POOL_OVERFLOW = prom.Gauge(
+        'kartupintar_db_pool_overflow', 'Koneksi overflow (di atas pool_size) yang terbuka',
+        multiprocess_mode='livesum')
+    DB_POOL_WAIT = prom.Histogram(
+        'kartupintar_db_pool_checkout_wait_seconds', 'Lama menunggu koneksi dari pool (termasuk connect & pre-ping)',
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+    DB_POOL_OVERFLOW_CHECKOUTS = prom.Counter(
+        'kartupintar_db_pool_overflow_checkouts_total', 'Checkout yang butuh koneksi di atas pool_size')
+    DB_POOL_TIMEOUTS = prom.Counter(
+        'kartupintar_db_pool_timeouts_total', 'Checkout gagal karena pool habis (pool_timeout)')
+    DB_POOL_INVALIDATIONS = prom.Counter(
+        'kartupintar_db_pool_invalidations_total', 'Koneksi dibuang: pre-ping gagal / putus saat query',
+        ['reason'])
+
+    FINDMY_CYCLE = prom.Histogram(
+        'kartupintar_findmy_cycle_duration_seconds', 'Durasi satu cycle update lokasi semua tracker',
+        buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200))
+    FINDMY_CYCLES = prom.Counter('kartupintar_findmy_cycles_total', 'Cycle FindMy', ['result'])
+    FINDMY_LOCATE = prom.Histogram(
+        'kartupintar_findmy_locate_duration_seconds', 'Latency locate satu tracker (request FCM s.d. balasan)',
+        ['result'], buckets=(0.5, 1, 2, 5, 10, 15, 20, 30, 45))
+    FINDMY_TRACKER_LOCATE = prom.Gauge(
+        'kartupintar_findmy_tracker_locate_seconds', 'Latency locate terakhir per tracker',
+        ['kartu_id'], multiprocess_mode='max')
+    FINDMY_QUEUE = prom.Gauge(
+        'kartupintar_findmy_job_queue_depth', 'Job locate / update-all yang masih antri atau jalan',
+        multiprocess_mode='max')
+    FINDMY_LAST_SUCCESS = prom.Gauge(
+        'kartupintar_findmy_last_success_timestamp_seconds', 'Waktu cycle FindMy terakhir yang berhasil',
+        multiprocess_mode='max')
+
+_transaksi_listener_installed = False
+
+
+# ============================================================
+# WEB
+# ============================================================
+
+def init_metrics(app):
+    """Pasang hook request, pool, transaksi, dan route /metrics."""
+    if prom is None or not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _metrics_finish(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'not_found'
+            HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+        return response
+
+    with app.app_context():
+        _instrument_pool(db.engine, app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    _install_transaksi_listener()
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        token = app.config.get('METRICS_TOKEN')
+        if token:
+            if request.headers.get('Authorization', '') != f'Bearer {token}':
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        elif request.remote_addr not in ('127.0.0.1', '::1'):
+            return Response('Not found\n', status=404, mimetype='text/plain')
+        return Response(render_latest(), mimetype=prom.CONTENT_TYPE_LATEST)
+
+
+def render_latest():
+    """Teks exposition semua metrics (gabungan semua worker kalau multiprocess)."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prom.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return prom.generate_latest(registry)
+    return prom.generate_latest()
+
+
+def _instrument_pool(engine, options):
+    DB_POOL_CAPACITY.set(options.get('pool_size', 5) + options.get('max_overflow', 10))
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_conn, record):
+        DB_POOL_CONNECTIONS.inc()
+
+    @event.listens_for(engine, 'close')
+    def _on_close(dbapi_conn, record):
+        DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(engine, 'checkout')
+    def _on_checkout(dbapi_conn, record, proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def _on_checkin(dbapi_conn, record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def observe_pool_checkout(wait, overflow, beyond_size):
+    if prom is None:
+        return
+    DB_POOL_WAIT.observe(wait)
+    DB_POOL_OVERFLOW.set(overflow)
+    if beyond_size:
+        DB_POOL_OVERFLOW_CHECKOUTS.inc()
+
+
+def set_pool_overflow(overflow):
+    if prom is not None:
+        DB_POOL_OVERFLOW.set(overflow)
+
+
+def observe_pool_timeout():
+    if prom is not None:
+        DB_POOL_TIMEOUTS.inc()
+
+
+def observe_pool_invalidate(reason):
+    if prom is not None:
+        DB_POOL_INVALIDATIONS.labels(reason).inc()
+
+
+def _install_transaksi_listener():
+    """Hitung Transaksi baru / yang status-nya berubah, dicatat hanya kalau commit."""
+    global _transaksi_listener_installed
+    if _transaksi_listener_installed:
+        return
+    _transaksi_listener_installed = True
+
+    @event.listens_for(Session, 'after_flush')
+    def _collect(session, flush_context):
+        pending = session.info.setdefault('_metrics_transaksi', [])
+        for obj in session.new:
+            if isinstance(obj, Transaksi):
+                pending.append((obj.jenis, obj.status, obj.metode or '-', obj.nominal or 0))
+        for obj in session.dirty:
+            if isinstance(obj, Transaksi) and inspect(obj).attrs.status.history.has_changes():
+                pending.append((obj.jenis, obj.status, obj.metode or '-', obj.nominal or 0))
+
+    @event.listens_for(Session, 'after_commit')
+    def _flush_counters(session):
+        for jenis, status, metode, nominal in session.info.pop('_metrics_transaksi', ()):
+            TRANSAKSI.labels(jenis, status, metode).inc()
+            TRANSAKSI_NOMINAL.labels(jenis, status, metode).inc(nominal)
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard(session):
+        session.info.pop('_metrics_transaksi', None)
+
+
+# ============================================================
+# FINDMY WORKER
+# ============================================================
+
+def start_exporter(port, addr='0.0.0.0'):
+    """HTTP exporter terpisah untuk proses findmy_worker.py. Return True kalau jalan."""
+    if prom is None or not port:
+        return False
+    prom.start_http_server(int(port), addr=addr)
+    return True
+
+
+def observe_findmy_cycle(seconds, ok):
+    if prom is None:
+        return
+    FINDMY_CYCLE.observe(seconds)
+    FINDMY_CYCLES.labels('success' if ok else 'error').inc()
+    if ok:
+        FINDMY_LAST_SUCCESS.set(time.time())
+
+
+def observe_findmy_locate(kartu_id, seconds, ok):
+    if prom is None:
+        return
+    FINDMY_LOCATE.labels('success' if ok else 'error').observe(seconds)
+    FINDMY_TRACKER_LOCATE.labels(kartu_id).set(seconds)
+
+
+def set_findmy_queue_depth(depth):
+    if prom is not None and depth is not None:
+        FINDMY_QUEUE.set(depth)
@@ -2,18 +2,25 @@
 Kartu Pintar - Database Models
 SQLAlchemy ORM Models for MySQL
 """
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import hashlib
+import hmac
 import uuid
 import json
 
+from serving import run_blocking
+
 db = SQLAlchemy()
 
 
 # Export all models at module level
 __all__ = ['db', 'User', 'Anggota', 'Transaksi', 'TransaksiItem', 
-           'LokasiHistory', 'MenuKantin', 'KategoriProduk', 'Produk', 'FindMyTracker']
+           'LokasiHistory', 'LokasiTrackHarian', 'MenuKantin', 'KategoriProduk', 'Produk', 'FindMyTracker',
+           'FindMyJob', 'LiveEvent', 'FindMyWorkerStatus', 'BackgroundJob',
+           'IdSequence', 'RollupTransaksiHarian']
 
 
 def generate_id(prefix='KP'):
@@ -39,6 +46,8 @@ class User(db.Model):
     totp_secret = db.Column(db.String(64), nullable=True)
     totp_enabled = db.Column(db.Boolean, default=False, nullable=False)
     totp_backup_codes = db.Column(db.Text, nullable=True)  # JSON list of hashed backup codes
+    # Naik setiap password/role/status/link anggota berubah → JWT lama ditolak (jwt_auth.py)
+    token_version = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
 
@@ -46,10 +55,10 @@ class User(db.Model):
     anggota = db.relationship('Anggota', backref=db.backref('user_account', uselist=False), foreign_keys=[anggota_id])
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = run_blocking(generate_password_hash, password, method='pbkdf2:sha256')
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return run_blocking(check_password_hash, self.password_hash, password)
 
     # ------- TOTP / Backup-codes helpers -------
     @staticmethod
@@ -57,36 +66,62 @@ class User(db.Model):
         """Canonical form: uppercase, no spaces/dashes."""
         return (code or '').strip().replace('-', '').replace(' ', '').upper()
 
+    @staticmethod
+    def _backup_code_lookup(norm):
+        """Lookup id kode cadangan: HMAC-SHA256(SECRET_KEY, kode) dipotong 16 hex.
+        Menunjuk langsung ke SATU hash yang perlu dicek dengan pbkdf2 — kode salah
+        tidak memicu perhitungan KDF sama sekali. (Ganti SECRET_KEY = kode cadangan
+        lama tidak cocok lagi, sama seperti session/JWT.)"""
+        key = current_app.config['SECRET_KEY'].encode('utf-8')
+        return hmac.new(key, b'totp-backup:' + norm.encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
     def set_backup_codes(self, codes_plain):
         """Stores HASHED backup codes; returns plain list (caller shows ONCE).
         Codes are hashed in normalized form so the user can type them with or
-        without dashes / in any case."""
+        without dashes / in any case. Each entry: {"id": lookup id, "hash": pbkdf2}."""
         norm = [self._normalize_backup_code(c) for c in codes_plain]
-        hashed = [generate_password_hash(c, method='pbkdf2:sha256') for c in norm]
-        self.totp_backup_codes = json.dumps(hashed)
+        entries = [{'id': self._backup_code_lookup(c), 'hash': generate_password_hash(c, method='pbkdf2:sha256')}
+                   for c in norm]
+        self.totp_backup_codes = json.dumps(entries)
         return codes_plain
 
     def consume_backup_code(self, code):
-        """Verify & remove a backup code on use. Returns True if valid."""
+        """Verify & remove a backup code on use. Returns True if valid.
+        Format baru: maksimal satu check_password_hash (via lookup id).
+        Entri lama (string hash tanpa lookup id, sebelum migrasi) masih dicek
+        satu per satu — lihat `manage.py migrate-backup-codes`."""
         if not self.totp_backup_codes:
             return False
         try:
-            hashed = json.loads(self.totp_backup_codes)
+            entries = json.loads(self.totp_backup_codes)
         except Exception:
             return False
         norm = self._normalize_backup_code(code)
         if not norm:
             return False
-        for h in list(hashed):
+        lookup = self._backup_code_lookup(norm)
+        for entry in list(entries):
             try:
-                if check_password_hash(h, norm):
-                    hashed.remove(h)
-                    self.totp_backup_codes = json.dumps(hashed)
+                if isinstance(entry, dict):
+                    if not hmac.compare_digest(entry.get('id', ''), lookup):
+                        continue
+                elif not isinstance(entry, str):
+                    continue
+                if run_blocking(check_password_hash, entry['hash'] if isinstance(entry, dict) else entry, norm):
+                    entries.remove(entry)
+                    self.totp_backup_codes = json.dumps(entries)
                     return True
             except Exception:
                 continue
         return False
 
+    def has_legacy_backup_codes(self):
+        """True kalau masih ada kode cadangan format lama (tanpa lookup id)."""
+        try:
+            return any(isinstance(e, str) for e in json.loads(self.totp_backup_codes or '[]'))
+        except Exception:
+            return False
+
     def remaining_backup_codes(self):
         if not self.totp_backup_codes:
             return 0
@@ -284,10 +319,12 @@ class Anggota(db.Model):
 class Transaksi(db.Model):
     """Transaction records: payments and top-ups"""
     __tablename__ = 'transaksi'
+    # Riwayat transaksi per anggota (terbaru dulu) tanpa filesort — juga index FK anggota_id
+    __table_args__ = (db.Index('idx_transaksi_anggota_created', 'anggota_id', 'created_at'),)
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     trx_id = db.Column(db.String(30), unique=True, nullable=False, index=True)
-    anggota_id = db.Column(db.Integer, db.ForeignKey('anggota.id'), nullable=False, index=True)
+    anggota_id = db.Column(db.Integer, db.ForeignKey('anggota.id'), nullable=False)
     jenis = db.Column(db.Enum('Pembelian', 'Top Up', 'Bayar Hutang'), nullable=False)
     keterangan = db.Column(db.String(200), nullable=True)
     nominal = db.Column(db.BigInteger, nullable=False)
@@ -326,9 +363,12 @@ class Transaksi(db.Model):
 class LokasiHistory(db.Model):
     """Location tracking history for card tracking"""
     __tablename__ = 'lokasi_history'
+    # N titik terbaru per anggota tanpa filesort; lat/lng ikut di index → query
+    # jejak (waktu, lat, lng) cukup baca index (covering). Juga index FK anggota_id.
+    __table_args__ = (db.Index('idx_lokasi_anggota_waktu', 'anggota_id', 'waktu', 'latitude', 'longitude'),)
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    anggota_id = db.Column(db.Integer, db.ForeignKey('anggota.id'), nullable=False, index=True)
+    anggota_id = db.Column(db.Integer, db.ForeignKey('anggota.id'), nullable=False)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     lokasi_nama = db.Column(db.String(200), nullable=True)
@@ -355,6 +395,27 @@ class LokasiHistory(db.Model):
         }
 
 
+class LokasiTrackHarian(db.Model):
+    """
+    Jejak harian per anggota hasil downsample lokasi_history yang sudah
+    lewat retensi raw (lokasi_retention.py). `track` = JSON
+    [[menit_sejak_00:00, lat, lng], ...], satu titik per interval.
+    """
+    __tablename__ = 'lokasi_track_harian'
+
+    anggota_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tanggal = db.Column(db.Date, primary_key=True, index=True)  # prune per tanggal
+    jumlah_titik = db.Column(db.Integer, default=0, nullable=False)  # titik raw sebelum downsample
+    waktu_awal = db.Column(db.DateTime, nullable=False)
+    waktu_akhir = db.Column(db.DateTime, nullable=False)
+    lat_min = db.Column(db.Float, nullable=False)
+    lat_max = db.Column(db.Float, nullable=False)
+    lng_min = db.Column(db.Float, nullable=False)
+    lng_max = db.Column(db.Float, nullable=False)
+    track = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+
 class MenuKantin(db.Model):
     """Canteen menu items - LEGACY, kept for backward compatibility"""
     __tablename__ = 'menu_kantin'
@@ -410,3 +471,165 @@ class FindMyTracker(db.Model):
             'last_address': self.last_address,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
         }
+
+
+class FindMyJob(db.Model):
+    """Background job FindMy (locate on-demand / update-all) — status dibaca lintas proses"""
+    __tablename__ = 'findmy_job'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    jenis = db.Column(db.Enum('locate', 'update_all'), nullable=False)
+    target = db.Column(db.String(100), nullable=True, index=True)  # canonical_id (locate) / NULL (update_all)
+    kartu_id = db.Column(db.String(20), nullable=True)
+    status = db.Column(db.Enum('pending', 'running', 'done', 'error'), default='pending', nullable=False, index=True)
+    # "jenis:target" selama pending/running, NULL setelah selesai → UNIQUE
+    # menjamin satu job aktif per target lintas proses (coalescing)
+    active_key = db.Column(db.String(120), nullable=True, unique=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.String(255), nullable=True)
+    requested_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Diperbarui proses yang menjalankan job (start + tiap tracker) → dasar cek basi
+    heartbeat_at = db.Column(db.DateTime, default=datetime.now, nullable=True)
+
+    def to_dict(self):
+        result = None
+        if self.result:
+            try:
+                result = json.loads(self.result)
+            except Exception:
+                result = None
+        return {
+            'job_id': self.id,
+            'jenis': self.jenis,
+            'target': self.target,
+            'kartu_id': self.kartu_id,
+            'status': self.status,
+            'result': result,
+            'error': self.error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+            'heartbeat_at': self.heartbeat_at.strftime('%Y-%m-%d %H:%M:%S') if self.heartbeat_at else None,
+        }
+
+
+class LiveEvent(db.Model):
+    """Event log untuk SSE /api/live/stream — fan-out lintas proses (web + findmy worker)"""
+    __tablename__ = 'live_event'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    jenis = db.Column(db.String(30), nullable=False)  # lokasi, worker_status, findmy_job
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
+
+
+class FindMyWorkerStatus(db.Model):
+    """Status + metrics loop FindMy, ditulis proses worker, dibaca semua proses web"""
+    __tablename__ = 'findmy_worker_status'
+
+    id = db.Column(db.String(30), primary_key=True)  # 'leader' | 'device_refresh'
+    status = db.Column(db.Text, nullable=True)  # JSON snapshot FindMyLocationService.get_status()
+    # 'leader': tulis terakhir loop; 'device_refresh': waktu refresh device list diminta
+    heartbeat_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+
+class BackgroundJob(db.Model):
+    """Job admin yang berjalan di background (bulk create user, import, hapus massal) + progress"""
+    __tablename__ = 'background_job'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    jenis = db.Column(db.String(50), nullable=False, index=True)  # bulk_create_user, ...
+    status = db.Column(db.Enum('pending', 'running', 'done', 'error'), default='pending', nullable=False, index=True)
+    progress_done = db.Column(db.Integer, default=0, nullable=False)
+    progress_total = db.Column(db.Integer, default=0, nullable=False)
+    message = db.Column(db.String(255), nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.String(255), nullable=True)
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        result = None
+        if self.result:
+            try:
+                result = json.loads(self.result)
+            except Exception:
+                result = None
+        total = self.progress_total or 0
+        return {
+            'job_id': self.id,
+            'jenis': self.jenis,
+            'status': self.status,
+            'progress_done': self.progress_done or 0,
+            'progress_total': total,
+            'progress_percent': round(100.0 * (self.progress_done or 0) / total, 1) if total else None,
+            'message': self.message,
+            'result': result,
+            'error': self.error,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+        }
+
+
+class IdSequence(db.Model):
+    """Counter untuk ID berurutan (kartu_id per tahun, trx_id per hari) — lihat id_allocator.py"""
+    __tablename__ = 'id_sequence'
+
+    name = db.Column(db.String(50), primary_key=True)  # 'kartu:2026', 'trx:20261019'
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)  # nilai berikutnya yang belum dibagikan
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+
+class RollupTransaksiHarian(db.Model):
+    """
+    Agregat harian transaksi per (tanggal, jenis, metode, operator, status).
+    Di-update inkremental saat flush transaksi (rollups.py) — laporan &
+    grafik membaca tabel ini, bukan scan tabel transaksi.
+    """
+    __tablename__ = 'rollup_transaksi_harian'
+
+    tanggal = db.Column(db.Date, primary_key=True)
+    jenis = db.Column(db.String(20), primary_key=True)
+    metode = db.Column(db.String(20), primary_key=True, default='')  # '' = tidak diisi
+    operator_id = db.Column(db.Integer, primary_key=True, default=0, autoincrement=False)  # 0 = tanpa operator
+    status = db.Column(db.String(20), primary_key=True)
+    jumlah = db.Column(db.Integer, default=0, nullable=False)
+    total_nominal = db.Column(db.BigInteger, default=0, nullable=False)
+    total_hutang_ditambah = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
+
+
+class RateLimitBucket(db.Model):
+    """Token bucket percobaan login / 2FA per username & IP, dipakai bersama semua worker — lihat throttle.py"""
+    __tablename__ = 'rate_limit_bucket'
+
+    key = db.Column(db.String(191), primary_key=True)  # 'login:ip:10.0.0.5', 'login:user:admin'
+    scope = db.Column(db.String(20), nullable=False, index=True)  # 'login:ip', 'totp:user', ...
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False, index=True)  # epoch detik (refill dihitung dari sini)
+    allowed = db.Column(db.BigInteger, nullable=False, default=0)
+    rejected = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class SlowRequest(db.Model):
+    """Request yang melewati PROFILING_SLOW_MS + daftar query & trace profiler — lihat profiling.py"""
+    __tablename__ = 'slow_request_log'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
+    method = db.Column(db.String(10), nullable=False)
+    path = db.Column(db.String(255), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False, index=True)
+    status = db.Column(db.Integer, nullable=False)
+    total_ms = db.Column(db.Float, nullable=False)
+    db_ms = db.Column(db.Float, nullable=False)
+    query_count = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    queries = db.Column(db.Text, nullable=True)  # JSON {queries: [{sql, ms}], repeated: [{sql, count}]}
+    profile = db.Column(db.Text, nullable=True)  # output cProfile / pyinstrument (kalau di-sample)
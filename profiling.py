@@ -0,0 +1,276 @@
+"""
+Kartu Pintar - Instrumentasi Query & Profil Request Lambat
+===========================================================
+
+Opt-in (PROFILING_ENABLED=1). Hook SQLAlchemy `before/after_cursor_execute`
++ Flask `before_request` / `after_request`, per request dicatat:
+
+  - jumlah query, waktu DB, waktu total, endpoint, status, user
+  - agregat per endpoint di proses ini (count, mean, p95, max, query/req)
+    → GET /api/profiling/stats (admin). Tiap worker gunicorn punya agregat
+    sendiri (field `pid` di respons).
+  - request > PROFILING_SLOW_MS → log (print) + disimpan ke tabel
+    `slow_request_log` beserta daftar query (SQL tanpa parameter + durasi)
+    dan statement yang berulang (kandidat N+1). Tabel dipakai bersama
+    semua worker → GET /api/profiling/slow[/<id>] (admin).
+  - PROFILING_SAMPLE_RATE (0..1): fraksi request yang dijalankan di bawah
+    profiler (pyinstrument kalau terpasang & PROFILING_PROFILER=pyinstrument,
+    else cProfile). Trace hanya disimpan kalau request-nya lambat. Profiler
+    menambah overhead — pakai rate kecil di production.
+
+Response streaming (SSE, export) diukur sampai handler return, bukan
+sampai stream selesai; endpoint di PROFILING_EXCLUDE tidak dicatat sama sekali.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta
+from itertools import count
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event, func, select
+
+from models import db, SlowRequest
+
+MAX_QUERIES_KEPT = 200    # query per request yang disimpan di log lambat
+SQL_MAX_LEN = 500
+PROFILE_MAX_LEN = 60000   # muat di kolom TEXT MySQL
+PRUNE_EVERY = 100         # hapus log lama setiap N request lambat per proses
+
+_stats = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'db_ms': 0.0, 'queries': 0,
+                              'max_ms': 0.0, 'slow': 0, 'recent': deque(maxlen=256)})
+_stats_lock = Lock()
+_started_at = datetime.now()
+_slow_count = count()
+
+
+# ============================================================
+# SQLALCHEMY HOOKS
+# ============================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_prof' in g:
+        conn.info.setdefault('_prof_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and '_prof' in g):
+        return
+    starts = conn.info.get('_prof_start')
+    if not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    prof = g._prof
+    prof['db_ms'] += ms
+    prof['queries'] += 1
+    sql = ' '.join(statement.split())[:SQL_MAX_LEN]
+    prof['statements'][sql] += 1
+    if len(prof['query_list']) < MAX_QUERIES_KEPT:
+        prof['query_list'].append({'sql': sql, 'ms': round(ms, 2)})
+
+
+# ============================================================
+# FLASK HOOKS
+# ============================================================
+
+def _start_profiler(app):
+    if app.config.get('PROFILING_PROFILER') == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode='disabled')
+            profiler.start()
+            return profiler
+        except ImportError:
+            pass
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler, keep):
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        if not keep:
+            return None
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(40)
+        return out.getvalue()[:PROFILE_MAX_LEN]
+    profiler.stop()
+    return profiler.output_text(unicode=True, color=False)[:PROFILE_MAX_LEN] if keep else None
+
+
+def init_profiling(app):
+    """Pasang hook kalau PROFILING_ENABLED; no-op kalau tidak."""
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    exclude = {e.strip() for e in app.config.get('PROFILING_EXCLUDE', '').split(',') if e.strip()}
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _profiling_start():
+        if request.endpoint in exclude:
+            return
+        g._prof = {'start': time.perf_counter(), 'db_ms': 0.0, 'queries': 0,
+                   'query_list': [], 'statements': Counter(), 'profiler': None}
+        rate = app.config.get('PROFILING_SAMPLE_RATE', 0.0)
+        if rate > 0 and random.random() < rate:
+            g._prof['profiler'] = _start_profiler(app)
+
+    @app.after_request
+    def _profiling_finish(response):
+        prof = g.pop('_prof', None)
+        if prof is None:
+            return response
+        total_ms = (time.perf_counter() - prof['start']) * 1000
+        slow = total_ms >= app.config.get('PROFILING_SLOW_MS', 500)
+        profile_text = _stop_profiler(prof['profiler'], slow) if prof['profiler'] else None
+        endpoint = request.endpoint or '<404>'
+        _record(endpoint, total_ms, prof, slow)
+        if slow:
+            try:
+                _log_slow(endpoint, response.status_code, total_ms, prof, profile_text)
+            except Exception as e:  # log lambat tidak boleh menggagalkan request
+                print(f"[Profiling] gagal simpan slow request: {e}", flush=True)
+        return response
+
+
+def _record(endpoint, total_ms, prof, slow):
+    with _stats_lock:
+        s = _stats[endpoint]
+        s['count'] += 1
+        s['total_ms'] += total_ms
+        s['db_ms'] += prof['db_ms']
+        s['queries'] += prof['queries']
+        s['max_ms'] = max(s['max_ms'], total_ms)
+        s['slow'] += 1 if slow else 0
+        s['recent'].append(total_ms)
+
+
+def _repeated(statements, top=5):
+    """Statement yang dijalankan berkali-kali dalam satu request (kandidat N+1)."""
+    return [{'sql': sql, 'count': n} for sql, n in statements.most_common(top) if n > 1]
+
+
+def _log_slow(endpoint, status, total_ms, prof, profile_text):
+    repeated = _repeated(prof['statements'])
+    print(f"[Profiling] 🐢 {request.method} {request.path} ({endpoint}) {status} "
+          f"{total_ms:.0f} ms, db {prof['db_ms']:.0f} ms / {prof['queries']} query", flush=True)
+    for r in repeated:
+        print(f"[Profiling]    {r['count']}x {r['sql'][:160]}", flush=True)
+
+    with db.engine.begin() as conn:
+        conn.execute(SlowRequest.__table__.insert().values(
+            created_at=datetime.now(),
+            method=request.method,
+            path=request.full_path.rstrip('?')[:255],
+            endpoint=endpoint[:100],
+            status=status,
+            total_ms=round(total_ms, 2),
+            db_ms=round(prof['db_ms'], 2),
+            query_count=prof['queries'],
+            user_id=session.get('user_id') or getattr(request, 'current_user_id', None),
+            queries=json.dumps({'queries': prof['query_list'], 'repeated': repeated}),
+            profile=profile_text,
+        ))
+    if next(_slow_count) % PRUNE_EVERY == PRUNE_EVERY - 1:
+        prune()
+
+
+def prune(keep_days=None):
+    """Hapus log request lambat lebih tua dari PROFILING_SLOW_KEEP_DAYS."""
+    if keep_days is None:
+        keep_days = current_app.config.get('PROFILING_SLOW_KEEP_DAYS', 7)
+    cutoff = datetime.now() - timedelta(days=keep_days)
+    with db.engine.begin() as conn:
+        return conn.execute(SlowRequest.__table__.delete().where(SlowRequest.created_at < cutoff)).rowcount
+
+
+# ============================================================
+# LAPORAN (admin)
+# ============================================================
+
+def _p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * 0.95))] if values else None
+
+
+def endpoint_stats(order_by='total_ms'):
+    """Agregat per endpoint di proses ini, diurutkan dari yang paling mahal."""
+    rows = []
+    with _stats_lock:
+        items = [(e, dict(s, recent=list(s['recent']))) for e, s in _stats.items()]
+    for endpoint, s in items:
+        n = s['count']
+        rows.append({
+            'endpoint': endpoint,
+            'count': n,
+            'mean_ms': round(s['total_ms'] / n, 2),
+            'p95_ms': round(_p95(s['recent']), 2),
+            'max_ms': round(s['max_ms'], 2),
+            'db_ms_per_request': round(s['db_ms'] / n, 2),
+            'queries_per_request': round(s['queries'] / n, 2),
+            'slow': s['slow'],
+            'total_ms': round(s['total_ms'], 1),
+        })
+    key = order_by if rows and order_by in rows[0] else 'total_ms'
+    return sorted(rows, key=lambda r: r[key], reverse=True)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def recent_slow(limit=50, endpoint=None):
+    """Ringkasan request lambat terbaru (semua worker)."""
+    t = SlowRequest.__table__.c
+    q = select(t.id, t.created_at, t.method, t.path, t.endpoint, t.status,
+               t.total_ms, t.db_ms, t.query_count, t.user_id).order_by(t.id.desc()).limit(limit)
+    if endpoint:
+        q = q.where(t.endpoint == endpoint)
+    return [{
+        'id': r.id, 'created_at': r.created_at.strftime('%Y-%m-%d %H:%M:%S'), 'method': r.method,
+        'path': r.path, 'endpoint': r.endpoint, 'status': r.status, 'total_ms': r.total_ms,
+        'db_ms': r.db_ms, 'query_count': r.query_count, 'user_id': r.user_id,
+    } for r in db.session.execute(q)]
+
+
+def slow_endpoints(since_hours=24):
+    """Jumlah request lambat per endpoint (semua worker) sejak N jam terakhir."""
+    t = SlowRequest.__table__.c
+    rows = db.session.execute(
+        select(t.endpoint, func.count(), func.avg(t.total_ms), func.max(t.total_ms), func.avg(t.query_count))
+        .where(t.created_at >= datetime.now() - timedelta(hours=since_hours))
+        .group_by(t.endpoint).order_by(func.count().desc()))
+    return [{'endpoint': e, 'count': n, 'mean_ms': round(avg or 0, 1), 'max_ms': round(mx or 0, 1),
+             'queries_per_request': round(avg_q or 0, 1)} for e, n, avg, mx, avg_q in rows]
+
+
+def slow_detail(slow_id):
+    """Satu request lambat lengkap dengan daftar query & trace profiler (None kalau tidak ada)."""
+    s = db.session.get(SlowRequest, slow_id)
+    if not s:
+        return None
+    data = json.loads(s.queries or '{}')
+    return {
+        'id': s.id, 'created_at': s.created_at.strftime('%Y-%m-%d %H:%M:%S'), 'method': s.method,
+        'path': s.path, 'endpoint': s.endpoint, 'status': s.status, 'total_ms': s.total_ms,
+        'db_ms': s.db_ms, 'query_count': s.query_count, 'user_id': s.user_id,
+        'queries': data.get('queries', []), 'repeated': data.get('repeated', []),
+        'profile': s.profile,
+    }
+
+
+def process_info():
+    return {'pid': os.getpid(), 'since': _started_at.strftime('%Y-%m-%d %H:%M:%S')}
@@ -0,0 +1,143 @@
+"""
+Kartu Pintar - Bulk Provisioning User
+======================================
+
+Buat akun login untuk semua anggota yang belum punya user
+(username & password awal = NRP).
+
+Kenapa tidak cukup loop `User(...)` + `set_password()`:
+  - pbkdf2:sha256 werkzeug = 1.000.000 iterasi → ±0.3–1 detik per hash.
+    800 anggota di satu thread request = menit-an → kena timeout gunicorn.
+  - Cek `User.query.filter_by(username=...)` per anggota = N query.
+
+Di sini:
+  1. Username yang sudah ada di-prefetch dengan SATU query.
+  2. Hash password dibagi ke ProcessPoolExecutor (CPU-bound, GIL tidak
+     menghalangi karena beda proses). Hasil dikonsumsi per batch sementara
+     pool terus menghitung batch berikutnya.
+     Proses pool dibuat dengan start method 'spawn' (seperti seed-scale),
+     BUKAN fork: job web jalan di thread worker gunicorn yang multi-thread —
+     child hasil fork mewarisi socket DB yang terbuka, lock yang sedang
+     dipegang thread lain, dan hub gevent yang di-patch. Di mode gevent
+     (serving.gevent_active) hash tetap di SATU proses: thread manajemen
+     ProcessPoolExecutor ikut ter-patch jadi greenlet. Job jalan di thread
+     native (start_background) dan hashlib melepas GIL, jadi worker tetap
+     responsif — hanya lebih lambat.
+  3. INSERT per batch (executemany) + commit per batch, lapor progress.
+
+DIPAKAI OLEH:
+  - POST /users/bulk-create  → background job (jobs.py), progress di /api/jobs/<id>
+  - python manage.py bulk-create-users
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from datetime import datetime
+from itertools import islice
+
+from flask import current_app
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Anggota
+from serving import gevent_active
+
+
+def hash_password(password):
+    """Top-level (picklable) supaya bisa dijalankan di proses pool. Sama dengan User.set_password."""
+    return generate_password_hash(password, method='pbkdf2:sha256')
+
+
+def plan_bulk_users():
+    """
+    Daftar user yang akan dibuat untuk anggota tanpa akun.
+    Return (planned, skipped): planned = list dict kolom user (+ 'password'),
+    skipped = jumlah anggota yang username-nya (NRP) sudah dipakai.
+    """
+    linked = db.session.query(User.anggota_id).filter(User.anggota_id.isnot(None))
+    rows = db.session.query(Anggota.id, Anggota.nrp, Anggota.nama)\
+        .filter(~Anggota.id.in_(linked)).order_by(Anggota.id).all()
+
+    existing = {u.lower() for (u,) in db.session.query(User.username)}
+    planned = []
+    skipped = 0
+    for anggota_id, nrp, nama in rows:
+        username = nrp.lower()
+        if username in existing:
+            skipped += 1
+            continue
+        existing.add(username)  # NRP dobel beda huruf besar/kecil
+        planned.append({
+            'username': username,
+            'nama': nama,
+            'anggota_id': anggota_id,
+            'password': nrp,
+        })
+    return planned, skipped
+
+
+def _default_processes():
+    configured = current_app.config.get('PROVISION_PROCESSES') or 0
+    if configured > 0:
+        return configured
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def provision_users(planned, processes=None, batch_size=None, progress=None):
+    """Hash password (paralel) lalu INSERT per batch. Return jumlah user dibuat."""
+    total = len(planned)
+    if not total:
+        if progress:
+            progress(0, 0)
+        return 0
+    if processes is None:
+        processes = _default_processes()
+    if gevent_active():
+        processes = 1  # tanpa multiprocessing di worker gevent (lihat docstring)
+    if batch_size is None:
+        batch_size = current_app.config.get('PROVISION_BATCH_SIZE', 200)
+    batch_size = max(1, batch_size)
+
+    passwords = [p['password'] for p in planned]
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=get_context('spawn')) if processes > 1 else None
+    try:
+        if pool:
+            chunksize = max(1, min(32, total // (processes * 4) or 1))
+            hashes = pool.map(hash_password, passwords, chunksize=chunksize)
+        else:
+            hashes = map(hash_password, passwords)
+
+        created = 0
+        if progress:
+            progress(0, total, f'Hash password dengan {processes} proses...')
+        while created < total:
+            batch = planned[created:created + batch_size]
+            now = datetime.now()
+            db.session.execute(db.insert(User), [{
+                'username': p['username'],
+                'nama': p['nama'],
+                'anggota_id': p['anggota_id'],
+                'password_hash': h,
+                'role': 'user',
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now,
+            } for p, h in zip(batch, islice(hashes, len(batch)))])
+            db.session.commit()
+            created += len(batch)
+            if progress:
+                progress(created, total, f'{created}/{total} akun dibuat')
+        return created
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+
+def bulk_create_users(progress=None, processes=None, batch_size=None):
+    """Entry point job / CLI. Return ringkasan {'created', 'skipped'}."""
+    planned, skipped = plan_bulk_users()
+    created = provision_users(planned, processes=processes, batch_size=batch_size, progress=progress)
+    return {'created': created, 'skipped': skipped}
@@ -0,0 +1,320 @@
+"""
+Kartu Pintar - Rollup Harian Transaksi
+=======================================
+
+Pendapatan kantin per hari/operator/metode, total top up, dan hutang
+sebelumnya hanya bisa dihitung dengan scan tabel `transaksi` — makin
+lama makin lambat. Di sini agregat harian disimpan di tabel
+`rollup_transaksi_harian` (kunci: tanggal, jenis, metode, operator_id,
+status → jumlah, total_nominal, total_hutang_ditambah).
+
+UPDATE INKREMENTAL
+  Listener `after_flush` pada Session: setiap Transaksi baru / berubah /
+  dihapus lewat ORM diubah jadi delta lalu di-UPSERT (MySQL ON DUPLICATE
+  KEY UPDATE, SQLite ON CONFLICT) di koneksi & transaksi yang SAMA dengan
+  transaksinya → rollup ikut commit/rollback, tidak pernah selisih.
+  Tidak ada call site yang perlu diubah.
+
+  Bulk delete (Query.delete) melewati event ORM — panggil
+  `subtract_transaksi(kondisi)` sebelum delete (lihat anggota_deletion.py).
+
+REBUILD
+  python manage.py rebuild-rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+  Hitung ulang dari tabel transaksi (setelah perubahan data manual di DB;
+  backfill pertama kali sudah di migrate_rollup_transaksi.sql). Per bulan,
+  satu transaksi pendek per bulan: DELETE rollup bulan itu lalu GROUP BY
+  transaksi bulan itu lewat rentang primary key (id min/max per hari dibaca
+  sekali di awal, tanpa lock) — UPSERT pembayaran yang sedang jalan hanya
+  menunggu satu bulan, bukan seluruh scan.
+
+LAPORAN (membaca rollup saja, tidak menyentuh tabel transaksi):
+  laporan_harian(start, end), laporan_operator(start, end), laporan_hutang(start, end),
+  total_transaksi()
+  → GET /api/laporan/harian | operator | hutang ?start=YYYY-MM-DD&end=YYYY-MM-DD
+"""
+
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from models import db, Transaksi, RollupTransaksiHarian, Anggota, User
+
+_table = RollupTransaksiHarian.__table__
+_KEY_COLUMNS = ('tanggal', 'jenis', 'metode', 'operator_id', 'status')
+_TRACKED = ('created_at', 'jenis', 'metode', 'operator_id', 'status', 'nominal', 'hutang_ditambah')
+
+
+# ============================================================
+# DELTA & UPSERT
+# ============================================================
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()  # func.date() di SQLite = string
+
+
+def _key(tanggal, jenis, metode, operator_id, status):
+    return (_as_date(tanggal), jenis, metode or '', operator_id or 0, status)
+
+
+def _add(deltas, values, sign):
+    """values: dict kolom Transaksi (lihat _TRACKED)."""
+    key = _key(values['created_at'] or datetime.now(), values['jenis'], values['metode'],
+               values['operator_id'], values['status'] or 'Pending')
+    d = deltas[key]
+    d[0] += sign
+    d[1] += sign * (values['nominal'] or 0)
+    d[2] += sign * (values['hutang_ditambah'] or 0)
+
+
+def apply_deltas(conn, deltas):
+    """UPSERT `deltas` {key: [jumlah, nominal, hutang]} — nilai negatif mengurangi."""
+    now = datetime.now()
+    rows = [dict(zip(_KEY_COLUMNS, key), jumlah=v[0], total_nominal=v[1],
+                 total_hutang_ditambah=v[2], updated_at=now)
+            for key, v in deltas.items() if any(v)]
+    if not rows:
+        return
+    c = _table.c
+    if conn.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(_table)
+        stmt = stmt.on_duplicate_key_update(
+            jumlah=c.jumlah + stmt.inserted.jumlah,
+            total_nominal=c.total_nominal + stmt.inserted.total_nominal,
+            total_hutang_ditambah=c.total_hutang_ditambah + stmt.inserted.total_hutang_ditambah,
+            updated_at=stmt.inserted.updated_at,
+        )
+    else:
+        if conn.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_KEY_COLUMNS),
+            set_={
+                'jumlah': c.jumlah + stmt.excluded.jumlah,
+                'total_nominal': c.total_nominal + stmt.excluded.total_nominal,
+                'total_hutang_ditambah': c.total_hutang_ditambah + stmt.excluded.total_hutang_ditambah,
+                'updated_at': stmt.excluded.updated_at,
+            },
+        )
+    conn.execute(stmt, rows)
+
+
+def _current(obj):
+    return {f: getattr(obj, f) for f in _TRACKED}
+
+
+def _committed(obj):
+    """Nilai sebelum perubahan di flush ini (history.deleted = nilai lama)."""
+    state = inspect(obj)
+    values = {}
+    for f in _TRACKED:
+        hist = state.attrs[f].history
+        values[f] = hist.deleted[0] if hist.deleted else getattr(obj, f)
+    return values
+
+
+@event.listens_for(Session, 'after_flush')
+def _rollup_after_flush(session, flush_context):
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for obj in session.new:
+        if isinstance(obj, Transaksi):
+            _add(deltas, _current(obj), +1)
+    for obj in session.dirty:
+        if isinstance(obj, Transaksi) and session.is_modified(obj, include_collections=False):
+            old, new = _committed(obj), _current(obj)
+            if old != new:
+                _add(deltas, old, -1)
+                _add(deltas, new, +1)
+    for obj in session.deleted:
+        if isinstance(obj, Transaksi):
+            _add(deltas, _committed(obj), -1)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def _grouped(conditions):
+    tanggal = func.date(Transaksi.created_at)
+    return select(
+        tanggal, Transaksi.jenis, Transaksi.metode, Transaksi.operator_id, Transaksi.status,
+        func.count(), func.coalesce(func.sum(Transaksi.nominal), 0),
+        func.coalesce(func.sum(Transaksi.hutang_ditambah), 0),
+    ).where(*conditions).group_by(
+        tanggal, Transaksi.jenis, Transaksi.metode, Transaksi.operator_id, Transaksi.status)
+
+
+def _deltas_from(rows, sign):
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for tanggal, jenis, metode, operator_id, status, jumlah, nominal, hutang in rows:
+        d = deltas[_key(tanggal, jenis, metode, operator_id, status)]
+        d[0] += sign * jumlah
+        d[1] += sign * int(nominal)
+        d[2] += sign * int(hutang)
+    return deltas
+
+
+def subtract_transaksi(*conditions):
+    """Kurangi rollup untuk transaksi yang akan di-bulk-delete (satu GROUP BY, di transaksi caller)."""
+    conn = db.session.connection()
+    apply_deltas(conn, _deltas_from(conn.execute(_grouped(conditions)), -1))
+
+
+def _day_start(d):
+    return datetime.combine(d, datetime.min.time())
+
+
+def rebuild(start=None, end=None):
+    """Hitung ulang rollup dari tabel transaksi untuk rentang tanggal (None = semua). Return jumlah baris rollup."""
+    conditions = []
+    if start:
+        conditions.append(Transaksi.created_at >= _day_start(start))
+    if end:
+        conditions.append(Transaksi.created_at < _day_start(end + timedelta(days=1)))
+    # Rentang id per hari — consistent read tanpa lock, satu scan
+    tanggal = func.date(Transaksi.created_at)
+    with db.engine.connect() as conn:
+        days = {_as_date(d): (lo, hi) for d, lo, hi in conn.execute(
+            select(tanggal, func.min(Transaksi.id), func.max(Transaksi.id)).where(*conditions).group_by(tanggal))}
+    today = date.today()
+    first = start or min(days, default=today)
+    last = end or max(max(days, default=today), today)
+    max_id = max((hi for _, hi in days.values()), default=0)
+
+    if not start and not end:
+        with db.engine.begin() as conn:  # rollup di luar rentang data = sisa lama
+            conn.execute(_table.delete().where((_table.c.tanggal < first) | (_table.c.tanggal > last)))
+
+    total = 0
+    month = first.replace(day=1)
+    while month <= last:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        m_start, m_end = max(first, month), min(last, next_month - timedelta(days=1))
+        ranges = [r for d, r in days.items() if m_start <= d <= m_end]
+        # Hari lampau tanpa transaksi cukup dihapus; bulan yang menyentuh kemarin/hari
+        # ini dibuka ke atas (transaksi baru setelah rentang id dibaca)
+        recent = m_end >= today - timedelta(days=1)
+        chunk = [Transaksi.created_at >= _day_start(m_start),
+                 Transaksi.created_at < _day_start(m_end + timedelta(days=1)),
+                 Transaksi.id >= (min(lo for lo, _ in ranges) if ranges else max_id + 1)]
+        if ranges and not recent:
+            chunk.append(Transaksi.id <= max(hi for _, hi in ranges))
+        with db.engine.begin() as conn:
+            # DELETE dulu: UPSERT pembayaran bersamaan menunggu lock baris rollup,
+            # GROUP BY sesudahnya sudah melihat transaksi yang commit sebelumnya
+            conn.execute(_table.delete().where(_table.c.tanggal >= m_start, _table.c.tanggal <= m_end))
+            if ranges or recent:
+                deltas = _deltas_from(conn.execute(_grouped(chunk)), +1)
+                apply_deltas(conn, deltas)
+                total += len(deltas)
+        month = next_month
+    return total
+
+
+# ============================================================
+# LAPORAN
+# ============================================================
+
+def _rollup_rows(start, end):
+    return db.session.execute(
+        select(_table.c.tanggal, _table.c.jenis, _table.c.metode, _table.c.operator_id, _table.c.status,
+               _table.c.jumlah, _table.c.total_nominal, _table.c.total_hutang_ditambah)
+        .where(_table.c.tanggal >= start, _table.c.tanggal <= end)
+    ).all()
+
+
+def total_transaksi():
+    """
+    Jumlah semua transaksi — pengganti Transaksi.query.count() (full scan di
+    InnoDB). Selama rollup masih kosong (belum di-backfill) pakai count lama.
+    """
+    total = db.session.query(func.sum(RollupTransaksiHarian.jumlah)).scalar()
+    if total is None:
+        return Transaksi.query.count()
+    return int(total)
+
+
+def laporan_harian(start, end):
+    """Per tanggal: pendapatan kantin, top up, hutang ditambah/dibayar, transaksi gagal."""
+    days = {}
+    d = start
+    while d <= end:
+        days[d] = {
+            'tanggal': d.isoformat(), 'pendapatan_kantin': 0, 'jumlah_pembelian': 0,
+            'topup': 0, 'jumlah_topup': 0, 'hutang_ditambah': 0, 'hutang_dibayar': 0,
+            'jumlah_gagal': 0,
+        }
+        d += timedelta(days=1)
+    for tanggal, jenis, _, _, status, jumlah, nominal, hutang in _rollup_rows(start, end):
+        day = days[_as_date(tanggal)]
+        if status == 'Gagal':
+            day['jumlah_gagal'] += jumlah
+        if status != 'Berhasil':
+            continue
+        if jenis == 'Pembelian':
+            day['pendapatan_kantin'] += nominal
+            day['jumlah_pembelian'] += jumlah
+            day['hutang_ditambah'] += hutang
+        elif jenis == 'Top Up':
+            day['topup'] += nominal
+            day['jumlah_topup'] += jumlah
+        elif jenis == 'Bayar Hutang':
+            day['hutang_dibayar'] += nominal
+    return list(days.values())
+
+
+def laporan_operator(start, end):
+    """Pendapatan kantin (Pembelian berhasil) per operator, dengan rincian per metode."""
+    per_operator = {}
+    for _, jenis, metode, operator_id, status, jumlah, nominal, _ in _rollup_rows(start, end):
+        if jenis != 'Pembelian' or status != 'Berhasil':
+            continue
+        op = per_operator.setdefault(operator_id, {
+            'operator_id': operator_id or None, 'operator': None,
+            'pendapatan': 0, 'jumlah': 0, 'per_metode': {},
+        })
+        op['pendapatan'] += nominal
+        op['jumlah'] += jumlah
+        m = op['per_metode'].setdefault(metode or '-', {'pendapatan': 0, 'jumlah': 0})
+        m['pendapatan'] += nominal
+        m['jumlah'] += jumlah
+    ids = [i for i in per_operator if i]
+    if ids:
+        for uid, username in db.session.query(User.id, User.username).filter(User.id.in_(ids)):
+            per_operator[uid]['operator'] = username
+    return sorted(per_operator.values(), key=lambda o: -o['pendapatan'])
+
+
+def laporan_hutang(start, end):
+    """
+    Total hutang beredar di akhir tiap hari. Dijangkar ke nilai sekarang
+    (SUM anggota.hutang) lalu dihitung mundur pakai perubahan harian dari
+    rollup — tetap benar walau ada hutang lama sebelum rollup ada.
+    """
+    today = date.today()
+    current = db.session.query(func.coalesce(func.sum(Anggota.hutang), 0)).scalar() or 0
+    net = defaultdict(int)  # perubahan hutang per tanggal
+    for tanggal, jenis, _, _, status, _, nominal, hutang in _rollup_rows(start, max(end, today)):
+        if status != 'Berhasil':
+            continue
+        if jenis == 'Pembelian':
+            net[_as_date(tanggal)] += hutang
+        elif jenis == 'Bayar Hutang':
+            net[_as_date(tanggal)] -= nominal
+
+    outstanding = int(current) - sum(v for d, v in net.items() if d > end)
+    series = []
+    d = end
+    while d >= start:
+        series.append({'tanggal': d.isoformat(), 'hutang_beredar': outstanding, 'perubahan': net.get(d, 0)})
+        outstanding -= net.get(d, 0)
+        d -= timedelta(days=1)
+    series.reverse()
+    return {'hutang_sekarang': int(current), 'harian': series}
@@ -2,8 +2,9 @@
 Kartu Pintar - Database Seeder
 Creates initial data for development/testing
 """
-from models import db, User, Anggota, Transaksi, LokasiHistory, MenuKantin
+from models import db, User, Anggota, Transaksi, LokasiHistory, MenuKantin, FindMyTracker
 from datetime import datetime, date, timedelta
+import os
 import random
 
 
@@ -251,3 +252,243 @@ def seed_database():
     print("  Anggota  : username=NRP / password=NRP")
     print("  Contoh   : 21250001 / 21250001")
     print("=" * 40)
+
+
+# ============================================================
+# SEED SKALA BESAR (load testing)
+# ============================================================
+#   python manage.py seed-scale --anggota 20000 --trx 5000000 --lokasi 50000000
+#
+# - Anggota di-insert oleh proses utama (kartu_id dari sequence id_allocator,
+#   NRP 9YYNNNNNNN), lalu dibagi per blok ke N proses (spawn, engine sendiri).
+# - Tiap proses membuat transaksi per anggota dengan rantai saldo yang benar
+#   (saldo_sebelum → saldo_sesudah berurutan waktu, top up saat saldo menipis,
+#   pembelian 'Gagal' kalau saldo kurang), riwayat lokasi (random walk di
+#   sekitar titik kampus), dan tracker FindMy; insert multi-row per batch,
+#   commit per batch; saldo akhir anggota = saldo_sesudah transaksi terakhir.
+# - Rollup harian dibangun ulang di akhir (bulk insert melewati listener).
+# - Deterministik untuk --seed yang sama.
+
+SCALE_SPOTS = [
+    (-6.8927, 107.6100, 'Kantin Poltekad'),
+    (-6.8930, 107.6105, 'Gedung Utama Poltekad'),
+    (-6.8925, 107.6098, 'Asrama Poltekad'),
+    (-6.8935, 107.6110, 'Ruang Kelas Poltekad'),
+    (-6.8940, 107.6095, 'Lapangan Upacara Poltekad'),
+    (-6.8928, 107.6102, 'Perpustakaan Poltekad'),
+    (-6.8932, 107.6108, 'Lab Komputer Poltekad'),
+]
+SCALE_MENU = [15000, 13000, 20000, 15000, 18000, 12000, 10000, 12000,
+              5000, 7000, 8000, 3000, 12000, 8000, 5000, 10000, 6000, 3000]
+SCALE_TOPUP = [50000, 100000, 100000, 200000, 300000, 500000]
+SCALE_MEAL_HOURS = [(6, 8), (11, 13), (17, 19), (9, 21)]  # pagi, siang, malam, jajan
+SCALE_PANGKAT = ['Prajurit Dua', 'Prajurit Satu', 'Prajurit Kepala', 'Kopral Dua',
+                 'Sersan Dua', 'Sersan Satu', 'Letnan Dua']
+SCALE_JURUSAN = ['Teknik Elektronika', 'Teknik Otomotif Kendaraan Tempur',
+                 'Rekayasa Keamanan Cyber', 'Teknik Mesin', 'Teknik Informatika']
+SCALE_NAMA_DEPAN = ['Budi', 'Andi', 'Rizki', 'Dewi', 'Agus', 'Eko', 'Fajar', 'Gilang', 'Hendra',
+                    'Indra', 'Joko', 'Kurnia', 'Lestari', 'Made', 'Nanda', 'Oki', 'Putra', 'Rina',
+                    'Sari', 'Taufik', 'Usman', 'Wahyu', 'Yoga', 'Zainal']
+SCALE_NAMA_BELAKANG = ['Santoso', 'Wijaya', 'Firmansyah', 'Kartika', 'Prasetyo', 'Saputra',
+                       'Nugroho', 'Hidayat', 'Pratama', 'Kusuma', 'Siregar', 'Simanjuntak',
+                       'Wibowo', 'Setiawan', 'Gunawan', 'Lubis', 'Hakim', 'Ramadhan']
+SCALE_SUMBER = ['NFC'] * 5 + ['QR'] * 2 + ['GPS'] * 3
+
+
+def _split(total, parts):
+    """Bagi `total` ke `parts` bagian sama rata (sisa ke bagian awal)."""
+    base, extra = divmod(total, parts) if parts else (0, 0)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _random_times(rng, n, start, days, hours=None):
+    """n waktu acak terurut dalam jendela [start, start+days)."""
+    out = []
+    for _ in range(n):
+        lo, hi = rng.choice(hours) if hours else (0, 24)
+        out.append(start + timedelta(days=rng.randrange(days), hours=rng.randrange(lo, hi),
+                                     minutes=rng.randrange(60), seconds=rng.randrange(60)))
+    out.sort()
+    return out
+
+
+def _scale_anggota_rows(rng, kartu_ids, year):
+    rows = []
+    now = datetime.now()
+    for kartu_id in kartu_ids:
+        number = int(kartu_id.rsplit('-', 1)[1])
+        nama = f"{rng.choice(SCALE_NAMA_DEPAN)} {rng.choice(SCALE_NAMA_BELAKANG)}"
+        spot = rng.choice(SCALE_SPOTS)
+        rows.append({
+            'kartu_id': kartu_id, 'nrp': f"9{year % 100:02d}{number:07d}",
+            'nama': nama, 'pangkat': rng.choice(SCALE_PANGKAT), 'satuan': 'Poltekad',
+            'jabatan': f"Taruna Tingkat {rng.choice(['I', 'II', 'III'])}",
+            'jurusan': rng.choice(SCALE_JURUSAN),
+            'tanggal_lahir': date(rng.randrange(1998, 2006), rng.randrange(1, 13), rng.randrange(1, 29)),
+            'golongan_darah': rng.choice(['A', 'B', 'AB', 'O']), 'agama': 'Islam',
+            'foto': '/static/img/avatar-default.svg', 'qr_data': kartu_id,
+            'saldo': 0, 'hutang': 0, 'status_kartu': 'Aktif', 'jml_anak': 0,
+            'lokasi_lat': spot[0], 'lokasi_lng': spot[1], 'lokasi_nama': spot[2],
+            'created_at': now, 'updated_at': now,
+        })
+    return rows
+
+
+def _scale_worker_init():
+    os.environ.setdefault('FINDMY_AUTO_START', '0')
+
+
+_scale_app = None
+
+
+def _scale_worker(task):
+    """Satu blok anggota: transaksi (rantai saldo), lokasi, tracker. Return jumlah baris."""
+    global _scale_app
+    from app import create_app
+    if _scale_app is None:
+        _scale_app = create_app()
+    members, params = task
+    rng = random.Random(params['seed'] * 1_000_003 + members[0][0])
+    start = params['start']
+    days = params['days']
+    batch_size = params['batch_size']
+    counts = {'transaksi': 0, 'lokasi': 0, 'tracker': 0}
+
+    with _scale_app.app_context():
+        trx_table = Transaksi.__table__
+        lokasi_table = LokasiHistory.__table__
+        buffers = {trx_table: [], lokasi_table: []}
+
+        def flush(table, force=False):
+            rows = buffers[table]
+            if rows and (force or len(rows) >= batch_size):
+                with db.engine.begin() as conn:
+                    conn.execute(table.insert(), rows)
+                buffers[table] = []
+
+        saldo_akhir = []
+        trackers = []
+        for anggota_id, n_trx, n_lokasi, has_tracker in members:
+            saldo = rng.choice(SCALE_TOPUP)
+            for i, waktu in enumerate(_random_times(rng, n_trx, start, days, SCALE_MEAL_HOURS)):
+                if saldo < 20000 and rng.random() < 0.9:
+                    nominal = rng.choice(SCALE_TOPUP)
+                    jenis, metode, operator_id, ket = 'Top Up', 'Manual', params['admin_id'], 'Pengisian Saldo'
+                    sesudah, status = saldo + nominal, 'Berhasil'
+                else:
+                    nominal = sum(rng.choice(SCALE_MENU) for _ in range(rng.randrange(1, 4)))
+                    jenis, metode, ket = 'Pembelian', rng.choice(['NFC', 'NFC', 'NFC', 'QR']), 'Pembelian Kantin'
+                    operator_id = rng.choice(params['operator_ids']) if params['operator_ids'] else None
+                    if nominal > saldo:
+                        sesudah, status = saldo, 'Gagal'
+                    else:
+                        sesudah, status = saldo - nominal, 'Berhasil'
+                buffers[trx_table].append({
+                    'trx_id': f"TRX-{waktu:%Y%m%d}-S{anggota_id:07d}{i:05d}"[:30],
+                    'anggota_id': anggota_id, 'jenis': jenis, 'keterangan': ket, 'nominal': nominal,
+                    'saldo_sebelum': saldo, 'saldo_sesudah': sesudah, 'hutang_ditambah': 0,
+                    'status': status, 'metode': metode, 'operator_id': operator_id, 'created_at': waktu,
+                })
+                saldo = sesudah
+                flush(trx_table)
+            counts['transaksi'] += n_trx
+            saldo_akhir.append({'b_id': anggota_id, 'b_saldo': saldo})
+
+            spot = rng.choice(SCALE_SPOTS)
+            lat, lng = spot[0], spot[1]
+            for waktu in _random_times(rng, n_lokasi, start, days, SCALE_MEAL_HOURS):
+                if rng.random() < 0.2:
+                    spot = rng.choice(SCALE_SPOTS)
+                    lat, lng = spot[0], spot[1]
+                lat += rng.uniform(-0.0002, 0.0002)
+                lng += rng.uniform(-0.0002, 0.0002)
+                sumber = 'GoogleFindHub' if has_tracker and rng.random() < 0.5 else rng.choice(SCALE_SUMBER)
+                buffers[lokasi_table].append({
+                    'anggota_id': anggota_id, 'latitude': round(lat, 6), 'longitude': round(lng, 6),
+                    'lokasi_nama': spot[2], 'sumber': sumber, 'waktu': waktu,
+                })
+                flush(lokasi_table)
+            counts['lokasi'] += n_lokasi
+
+            if has_tracker:
+                now = datetime.now()
+                trackers.append({
+                    'canonical_id': f"sim-{params['seed']}-{anggota_id}", 'anggota_id': anggota_id,
+                    'nama_tracker': f"MiCard Sim {anggota_id}", 'is_active': True,
+                    'last_seen': now, 'last_latitude': lat, 'last_longitude': lng,
+                    'created_at': now, 'updated_at': now,
+                })
+        flush(trx_table, force=True)
+        flush(lokasi_table, force=True)
+
+        anggota_table = Anggota.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                anggota_table.update().where(anggota_table.c.id == db.bindparam('b_id'))
+                .values(saldo=db.bindparam('b_saldo')),
+                saldo_akhir,
+            )
+            if trackers:
+                conn.execute(FindMyTracker.__table__.insert(), trackers)
+        counts['tracker'] = len(trackers)
+    return counts
+
+
+def seed_scale(anggota=1000, trx=50000, lokasi=200000, trackers=None, days=365,
+               processes=None, batch_size=5000, seed=42, progress=None):
+    """
+    Data sintetis skala produksi untuk load test. Return ringkasan jumlah baris.
+    `progress(done_anggota, total_anggota, counts)` dipanggil per blok selesai.
+    """
+    from multiprocessing import get_context
+    from id_allocator import reserve_kartu_ids
+    from rollups import rebuild
+
+    rng = random.Random(seed)
+    trackers = anggota // 10 if trackers is None else min(trackers, anggota)
+    processes = processes or max(1, min(8, os.cpu_count() or 1))
+    start = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+    year = datetime.now().year
+
+    # 1. Anggota (proses utama) — kartu_id dari sequence supaya tidak bentrok dengan data lama
+    anggota_table = Anggota.__table__
+    kartu_ids = reserve_kartu_ids(anggota)
+    for i in range(0, anggota, batch_size):
+        with db.engine.begin() as conn:
+            conn.execute(anggota_table.insert(), _scale_anggota_rows(rng, kartu_ids[i:i + batch_size], year))
+    anggota_ids = []
+    for i in range(0, len(kartu_ids), 1000):
+        anggota_ids += [a for (a,) in db.session.query(Anggota.id).filter(Anggota.kartu_id.in_(kartu_ids[i:i + 1000]))]
+    anggota_ids.sort()
+    if progress:
+        progress(0, len(anggota_ids), {'anggota': len(anggota_ids)})
+
+    # 2. Rencana per anggota: jumlah transaksi & lokasi, siapa punya tracker
+    tracker_set = set(rng.sample(anggota_ids, trackers)) if trackers else set()
+    members = list(zip(anggota_ids, _split(trx, len(anggota_ids)), _split(lokasi, len(anggota_ids)),
+                       [a in tracker_set for a in anggota_ids]))
+    admin = User.query.filter_by(role='admin').order_by(User.id).first()
+    params = {
+        'seed': seed, 'start': start, 'days': days, 'batch_size': batch_size,
+        'admin_id': admin.id if admin else None,
+        'operator_ids': [u for (u,) in db.session.query(User.id).filter_by(role='operator_kantin')],
+    }
+    block = max(1, min(500, len(members) // (processes * 4) or 1))
+    tasks = [(members[i:i + block], params) for i in range(0, len(members), block)]
+
+    # 3. Transaksi / lokasi / tracker paralel per blok anggota
+    totals = {'anggota': len(anggota_ids), 'transaksi': 0, 'lokasi': 0, 'tracker': 0}
+    done = 0
+    db.session.remove()
+    db.engine.dispose()  # jangan wariskan koneksi ke proses anak
+    with get_context('spawn').Pool(processes, initializer=_scale_worker_init) as pool:
+        for (task_members, _), counts in zip(tasks, pool.imap(_scale_worker, tasks)):
+            for k, v in counts.items():
+                totals[k] += v
+            done += len(task_members)
+            if progress:
+                progress(done, len(anggota_ids), totals)
+
+    # 4. Rollup harian untuk rentang data sintetis
+    rebuild(start.date(), date.today())
+    return totals
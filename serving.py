@@ -0,0 +1,86 @@
+"""
+Kartu Pintar - Mode Serving & Blocking Call
+============================================
+
+Profil SERVING_MODE (sync / gthread / gevent) ada di config.py, dipakai
+gunicorn.conf.py. Modul ini berisi helper supaya kode yang sama aman di
+ketiganya, plus hasil audit blocking call.
+
+AUDIT BLOCKING CALL
+  PyMySQL (driver MySQL)      pure Python di atas `socket` → kooperatif
+                              di gevent (socket di-patch); gthread: per thread.
+  Pool SQLAlchemy             koneksi dikembalikan tiap akhir transaksi;
+                              gevent: pool dibatasi, greenlet antri
+                              (pool_timeout) — lihat pool_profile (config.py).
+  time.sleep                  event_stream (SSE, live_events.py), jeda chunk
+                              delete (anggota_deletion.py), loop FindMy —
+                              di gevent di-patch (yield), di gthread hanya
+                              menahan thread-nya sendiri. event_stream
+                              rollback tiap poll → tidak memegang koneksi DB
+                              selama sleep.
+  pbkdf2 (login, 2FA backup,  CPU ~0.5 detik, TIDAK yield di gevent → semua
+  set password)               greenlet di worker ikut berhenti. Dijalankan
+                              lewat run_blocking() (threadpool native,
+                              hashlib melepas GIL).
+  Background job (jobs.py,    CPU-bound (hash massal, parse Excel). gevent:
+  locate FindMy)              start_background() → thread native dari pool
+                              terpisah, bukan greenlet.
+  requests / httpx (FindMy    socket → kooperatif di gevent. TAPI FcmReceiver
+  tools)                      menjalankan event loop asyncio di thread
+                              sendiri; asyncio + monkey patch tidak didukung
+                              resmi → di mode gevent loop FindMy TIDAK
+                              di-autostart di web (pakai findmy_worker.py,
+                              proses tanpa patch). Locate on-demand tetap
+                              jalan di thread native (best effort).
+  multiprocessing             seed-scale: hanya CLI. Bulk create user
+                              (POST /users/bulk-create → provision_users)
+                              jalan DI worker gunicorn: pool proses pakai
+                              'spawn' (tidak fork worker multi-thread), dan
+                              di gevent dipaksa 1 proses (hash di thread
+                              native job, tanpa ProcessPoolExecutor).
+  fcntl.flock leader lock     non-blocking (LOCK_NB), aman.
+
+Tidak ada yang perlu diubah untuk gthread; helper di bawah langsung
+memanggil fungsi / Thread biasa kalau gevent tidak aktif.
+"""
+
+from threading import Lock, Thread
+
+BACKGROUND_THREADS = 4  # thread native untuk background job di mode gevent
+
+_background_pool = None
+_background_lock = Lock()
+
+
+def gevent_active():
+    """True kalau proses ini di-monkey-patch gevent (gunicorn worker_class=gevent)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def run_blocking(func, *args, **kwargs):
+    """
+    Jalankan call CPU-bound / blocking tanpa menahan greenlet lain. Di
+    gevent: threadpool native hub (greenlet pemanggil menunggu, yang lain
+    jalan). Selain itu: panggil langsung.
+    """
+    if not gevent_active():
+        return func(*args, **kwargs)
+    import gevent
+    return gevent.get_hub().threadpool.apply(func, args, kwargs)
+
+
+def start_background(target, *args, name=None):
+    """Jalankan `target(*args)` di background: Thread daemon, atau thread native pool di gevent."""
+    global _background_pool
+    if not gevent_active():
+        Thread(target=target, args=args, daemon=True, name=name).start()
+        return
+    from gevent.threadpool import ThreadPool
+    with _background_lock:
+        if _background_pool is None:
+            _background_pool = ThreadPool(BACKGROUND_THREADS)
+    _background_pool.spawn(target, *args)
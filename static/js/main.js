@@ -138,3 +138,28 @@ function simulateQRScan() {
 function formatRupiah(num) {
     return 'Rp ' + num.toLocaleString('id-ID');
 }
+
+// ============================================================
+// LIVE UPDATES (Server-Sent Events) — /api/live/stream
+// ============================================================
+// handlers: { namaEvent: function(data) {...} }
+// Server menutup stream tiap ~25 detik; EventSource reconnect otomatis
+// dengan Last-Event-ID, jadi event di antaranya tidak hilang.
+// Return null kalau stream tidak tersedia (browser lama, atau server di
+// SERVING_MODE=sync) → pemanggil pakai fallback polling.
+
+function openLiveStream(handlers) {
+    if (!window.EventSource || document.body.dataset.liveStream !== '1') return null;
+    const jenis = Object.keys(handlers);
+    const es = new EventSource('/api/live/stream?jenis=' + encodeURIComponent(jenis.join(',')));
+    jenis.forEach(name => {
+        es.addEventListener(name, e => {
+            try {
+                handlers[name](JSON.parse(e.data));
+            } catch (err) {
+                console.error('Live event error:', name, err);
+            }
+        });
+    });
+    return es;
+}
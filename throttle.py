@@ -0,0 +1,193 @@
+"""
+Kartu Pintar - Throttling Login & 2FA
+======================================
+
+login, api_login, totp_verify, dan api_totp_verify menjalankan
+check_password_hash (pbkdf2, ~0.5 detik CPU) di setiap percobaan tanpa
+batas. Burst login salah bisa menyandera ke-4 worker sync gunicorn
+sementara pembayaran kasir mengantre di belakangnya.
+
+Token bucket disimpan di tabel `rate_limit_bucket` → berlaku bersama
+untuk semua worker & container. Dicek SEBELUM query user / hashing:
+permintaan yang melewati batas langsung ditolak (HTTP 429 + Retry-After)
+tanpa menyentuh KDF.
+
+    bucket: kapasitas `burst`, terisi ulang `per_menit` token per menit.
+    ip      tiap percobaan (berhasil atau gagal) memakai 1 token —
+            membatasi beban KDF per sumber.
+    user    login: per (username, IP); 2FA: per user id. Hanya DICEK
+            sebelum verifikasi, token dipakai lewat fail() setelah
+            password / kode SALAH. Orang lain yang sengaja salah password
+            untuk username "admin" hanya mengunci kombinasi username + IP
+            miliknya sendiri, bukan akun admin untuk semua orang. 2FA
+            per user id: endpoint-nya butuh password benar dulu.
+
+IP = request.remote_addr, yaitu IP client HANYA kalau tidak ada reverse
+proxy di depan gunicorn. Di belakang proxy set TRUST_PROXY_HOPS (jumlah
+proxy tepercaya) supaya ProxyFix memakai X-Forwarded-For — tanpa itu
+semua client berbagi satu bucket IP (IP proxy).
+
+Konfigurasi (config.py): THROTTLE_ENABLED, THROTTLE_LOGIN_IP,
+THROTTLE_LOGIN_USER, THROTTLE_TOTP_IP, THROTTLE_TOTP_USER
+("burst:per_menit"), THROTTLE_PRUNE_AFTER, TRUST_PROXY_HOPS.
+
+Metrik: counter allowed / rejected per bucket, dijumlah per scope oleh
+stats() → GET /api/throttle/stats (admin). Bucket idle lebih lama dari
+THROTTLE_PRUNE_AFTER dibuang (counter-nya ikut), jadi metrik = aktivitas
+bucket yang masih hidup.
+"""
+
+import math
+import time
+from itertools import count
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, RateLimitBucket
+
+_table = RateLimitBucket.__table__
+_calls = count()
+_calls_lock = Lock()
+PRUNE_EVERY = 1000  # prune bucket idle setiap N panggilan per proses
+
+SCOPE_CONFIG = {
+    'login:ip': 'THROTTLE_LOGIN_IP',
+    'login:user': 'THROTTLE_LOGIN_USER',
+    'totp:ip': 'THROTTLE_TOTP_IP',
+    'totp:user': 'THROTTLE_TOTP_USER',
+}
+
+
+def _limits(scope):
+    """(burst, per_menit) dari config "burst:per_menit"."""
+    burst, per_minute = str(current_app.config[SCOPE_CONFIG[scope]]).split(':')
+    return max(1.0, float(burst)), max(0.001, float(per_minute))
+
+
+def take(scope, ident, now=None):
+    """Pakai 1 token dari bucket scope:ident. Return 0 kalau boleh, else detik sampai boleh lagi."""
+    key = f'{scope}:{ident}'[:191]
+    burst, per_minute = _limits(scope)
+    rate = per_minute / 60.0
+    now = now or time.time()
+    c = _table.c
+    for _ in range(3):
+        with db.engine.begin() as conn:
+            row = conn.execute(
+                select(c.tokens, c.updated_at).where(c.key == key).with_for_update()
+            ).first()
+            if row is not None:
+                tokens = min(burst, row.tokens + max(0.0, now - row.updated_at) * rate)
+                allowed = tokens >= 1
+                conn.execute(_table.update().where(c.key == key).values(
+                    tokens=tokens - 1 if allowed else tokens, updated_at=now,
+                    allowed=c.allowed + (1 if allowed else 0),
+                    rejected=c.rejected + (0 if allowed else 1),
+                ))
+                break
+        # Bucket belum ada → penuh, langsung pakai 1 token
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(_table.insert().values(key=key, scope=scope, tokens=burst - 1,
+                                                    updated_at=now, allowed=1, rejected=0))
+            tokens, allowed = burst, True
+            break
+        except IntegrityError:
+            continue  # proses lain baru saja membuatnya → ulangi lewat UPDATE
+    else:
+        return 0  # jangan kunci user keluar karena race yang aneh
+
+    with _calls_lock:
+        n = next(_calls)
+    if n % PRUNE_EVERY == PRUNE_EVERY - 1:
+        prune(now)
+    return 0 if allowed else max(1, math.ceil((1 - tokens) / rate))
+
+
+def peek(scope, ident, now=None):
+    """Seperti take() tapi tidak memakai token. Return 0 / detik sampai boleh lagi."""
+    key = f'{scope}:{ident}'[:191]
+    burst, per_minute = _limits(scope)
+    rate = per_minute / 60.0
+    now = now or time.time()
+    c = _table.c
+    with db.engine.begin() as conn:
+        row = conn.execute(select(c.tokens, c.updated_at).where(c.key == key)).first()
+        if row is None:
+            return 0
+        tokens = min(burst, row.tokens + max(0.0, now - row.updated_at) * rate)
+        if tokens >= 1:
+            return 0
+        conn.execute(_table.update().where(c.key == key).values(rejected=c.rejected + 1))
+    return max(1, math.ceil((1 - tokens) / rate))
+
+
+def _user_ident(kind, username, user_id, ip):
+    if kind == 'login':
+        name = (username or '').strip().lower()
+        return f'{name}@{ip}' if name and ip else name or None
+    return str(user_id) if user_id else None
+
+
+def check(kind, username=None, user_id=None, ip=None):
+    """
+    Sebelum verifikasi `kind` ('login' / 'totp'): pakai 1 token bucket IP,
+    lalu cek (tanpa memakai) bucket user. Return 0 kalau boleh lanjut, else
+    retry_after (detik).
+    """
+    if not current_app.config.get('THROTTLE_ENABLED', True):
+        return 0
+    if ip:
+        retry = take(f'{kind}:ip', ip)
+        if retry:
+            return retry
+    ident = _user_ident(kind, username, user_id, ip)
+    if ident:
+        return peek(f'{kind}:user', ident)
+    return 0
+
+
+def fail(kind, username=None, user_id=None, ip=None):
+    """Password / kode salah → pakai 1 token bucket user."""
+    if not current_app.config.get('THROTTLE_ENABLED', True):
+        return
+    ident = _user_ident(kind, username, user_id, ip)
+    if ident:
+        take(f'{kind}:user', ident)
+
+
+def prune(now=None):
+    """Hapus bucket idle (sudah penuh lagi) lebih lama dari THROTTLE_PRUNE_AFTER detik."""
+    cutoff = (now or time.time()) - current_app.config.get('THROTTLE_PRUNE_AFTER', 86400)
+    with db.engine.begin() as conn:
+        return conn.execute(_table.delete().where(_table.c.updated_at < cutoff)).rowcount
+
+
+def stats(now=None, top=20):
+    """Metrik throttling per scope + bucket yang sedang menolak (token < 1)."""
+    c = _table.c
+    now = now or time.time()
+    scopes = {}
+    rows = db.session.execute(
+        select(c.scope, func.count(), func.sum(c.allowed), func.sum(c.rejected)).group_by(c.scope))
+    for scope, buckets, allowed, rejected in rows:
+        scopes[scope] = {'buckets': buckets, 'allowed': int(allowed or 0), 'rejected': int(rejected or 0)}
+
+    throttled = []
+    rows = db.session.execute(
+        select(c.key, c.scope, c.tokens, c.updated_at, c.rejected)
+        .where(c.tokens < 1).order_by(c.rejected.desc()).limit(top * 5))
+    for key, scope, tokens, updated_at, rejected in rows:
+        if scope not in SCOPE_CONFIG:
+            continue
+        burst, per_minute = _limits(scope)
+        current = min(burst, tokens + max(0.0, now - updated_at) * per_minute / 60.0)
+        if current < 1:
+            throttled.append({'key': key, 'rejected': int(rejected),
+                              'retry_after': max(1, math.ceil((1 - current) * 60.0 / per_minute))})
+        if len(throttled) >= top:
+            break
+    return {'scopes': scopes, 'throttled': throttled}
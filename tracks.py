@@ -0,0 +1,242 @@
+"""
+Kartu Pintar - Jejak Lokasi Siap Peta (simplifikasi + titik singgah)
+=====================================================================
+
+Halaman riwayat lokasi mengirim 200 titik raw, /api/lacak sampai 500 —
+Find Hub menghasilkan banyak titik yang hampir sama, jadi peta penuh
+marker bertumpuk, dan riwayat panjang tidak bisa ditampilkan.
+
+GET /api/lacak/<kartu_id>/track menghitung dari SELURUH titik dalam
+rentang waktu (raw lokasi_history lewat index covering
+idx_lokasi_anggota_waktu, ditambah jejak harian lokasi_track_harian
+untuk hari yang raw-nya sudah lewat retensi):
+
+  segmen      titik dipecah kalau jeda > gap_minutes (tidak ada garis
+              lurus menyeberangi jam-jam tanpa data), tiap segmen
+              disederhanakan Douglas–Peucker dengan toleransi meter,
+              dikirim sebagai encoded polyline Google (presisi 1e-5)
+              → ribuan titik jadi beberapa KB.
+  stay point  tempat anggota diam ≥ stay_minutes dalam radius
+              stay_radius meter (Li et al. 2008): pusat, datang, pergi,
+              durasi, jumlah titik.
+
+Semua perhitungan di array numpy (proyeksi equirectangular ke meter,
+jarak titik-segmen per langkah Douglas–Peucker, jarak jendela stay point).
+Hasil di-cache per proses per (anggota, rentang, parameter); cache
+dipakai selama MIN/MAX waktu titik raw di rentang itu tidak berubah
+(dua lookup index, bukan baca ulang semua titik).
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+
+from models import db, LokasiHistory, LokasiTrackHarian
+from lokasi_retention import daily_track
+
+EARTH_RADIUS_M = 6371000.0
+
+_cache = OrderedDict()  # key → (versi, hasil)
+_cache_lock = Lock()
+
+
+# ============================================================
+# DATA
+# ============================================================
+
+def _window(start, end):
+    return datetime.combine(start, datetime.min.time()), datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+
+def _version(anggota_id, start, end):
+    lo, hi = _window(start, end)
+    return tuple(db.session.query(func.min(LokasiHistory.waktu), func.max(LokasiHistory.waktu)).filter(
+        LokasiHistory.anggota_id == anggota_id, LokasiHistory.waktu >= lo, LokasiHistory.waktu < hi).one())
+
+
+def load_points(anggota_id, start, end):
+    """Array (t detik epoch, lat, lng) urut waktu untuk tanggal [start, end]."""
+    lo, hi = _window(start, end)
+    rows = db.session.execute(
+        select(LokasiHistory.waktu, LokasiHistory.latitude, LokasiHistory.longitude)
+        .where(LokasiHistory.anggota_id == anggota_id, LokasiHistory.waktu >= lo, LokasiHistory.waktu < hi)
+        .order_by(LokasiHistory.waktu)).all()
+    # Hari sebelum titik raw pertama → dari jejak harian (raw sudah dibuang retensi)
+    first_raw = rows[0][0].date() if rows else end + timedelta(days=1)
+    older = []
+    if first_raw > start:
+        has_tracks = db.session.query(LokasiTrackHarian.tanggal).filter(
+            LokasiTrackHarian.anggota_id == anggota_id, LokasiTrackHarian.tanggal >= start,
+            LokasiTrackHarian.tanggal < first_raw).first()
+        if has_tracks:
+            older = [(datetime.strptime(w, '%Y-%m-%d %H:%M:%S'), lat, lng)
+                     for w, lat, lng in daily_track(anggota_id, start, first_raw - timedelta(days=1))]
+    rows = older + [tuple(r) for r in rows]
+    if not rows:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty
+    waktu, lat, lng = zip(*rows)
+    t = np.array(waktu, dtype='datetime64[s]').astype(np.int64)
+    return t, np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)
+
+
+# ============================================================
+# GEOMETRI (numpy)
+# ============================================================
+
+def project(lat, lng):
+    """Proyeksi equirectangular ke meter, relatif ke titik tengah (cukup untuk skala kota)."""
+    lat0 = np.radians(np.mean(lat))
+    x = np.radians(lng - np.mean(lng)) * EARTH_RADIUS_M * np.cos(lat0)
+    y = np.radians(lat - np.mean(lat)) * EARTH_RADIUS_M
+    return x, y
+
+
+def douglas_peucker(x, y, tolerance):
+    """Mask titik yang dipertahankan (Douglas–Peucker, jarak titik ke segmen dalam meter)."""
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        s, e = stack.pop()
+        if e - s < 2:
+            continue
+        px, py = x[s + 1:e], y[s + 1:e]
+        dx, dy = x[e] - x[s], y[e] - y[s]
+        length2 = dx * dx + dy * dy
+        if length2 > 0:
+            u = np.clip(((px - x[s]) * dx + (py - y[s]) * dy) / length2, 0.0, 1.0)
+        else:
+            u = np.zeros(len(px))
+        d = np.hypot(px - (x[s] + u * dx), py - (y[s] + u * dy))
+        i = int(np.argmax(d))
+        if d[i] > tolerance:
+            mid = s + 1 + i
+            keep[mid] = True
+            stack.append((s, mid))
+            stack.append((mid, e))
+    return keep
+
+
+def segment_bounds(t, gap_seconds):
+    """[(awal, akhir_eksklusif)] — pecah di jeda waktu > gap_seconds."""
+    if len(t) == 0:
+        return []
+    cuts = np.flatnonzero(np.diff(t) > gap_seconds) + 1
+    edges = np.concatenate(([0], cuts, [len(t)]))
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def stay_points(x, y, t, radius, min_seconds):
+    """
+    [(awal, akhir_eksklusif)] titik-titik yang berada dalam `radius` meter
+    dari titik awal selama ≥ min_seconds. Jarak ke titik berikutnya dihitung
+    per jendela (64, 128, ...) sampai ada yang keluar radius.
+    """
+    n = len(t)
+    stays = []
+    i = 0
+    while i < n - 1:
+        j, width = i + 1, 64
+        while True:
+            stop = min(n, j + width)
+            far = np.flatnonzero(np.hypot(x[j:stop] - x[i], y[j:stop] - y[i]) > radius)
+            if far.size:
+                j += int(far[0])
+                break
+            if stop == n:
+                j = n
+                break
+            j, width = stop, width * 2
+        if j - i > 1 and t[j - 1] - t[i] >= min_seconds:
+            stays.append((i, j))
+            i = j
+        else:
+            i += 1
+    return stays
+
+
+def encode_polyline(lat, lng):
+    """Encoded polyline Google (presisi 5 desimal)."""
+    coords = np.round(np.column_stack((lat, lng)) * 1e5).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+    out = []
+    for v in values.tolist():
+        while v >= 0x20:
+            out.append(chr((0x20 | (v & 0x1f)) + 63))
+            v >>= 5
+        out.append(chr(v + 63))
+    return ''.join(out)
+
+
+# ============================================================
+# TRACK
+# ============================================================
+
+def _iso(ts):
+    return np.datetime64(int(ts), 's').astype(datetime).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def build_track(t, lat, lng, tolerance, gap_seconds, stay_radius, stay_seconds):
+    """Segmen polyline + stay point dari array titik urut waktu."""
+    result = {'segments': [], 'stay_points': [],
+              'stats': {'raw_points': int(len(t)), 'kept_points': 0}}
+    if len(t) == 0:
+        return result
+    x, y = project(lat, lng)
+    for s, e in segment_bounds(t, gap_seconds):
+        keep = np.flatnonzero(douglas_peucker(x[s:e], y[s:e], tolerance)) + s
+        result['segments'].append({
+            'start': _iso(t[s]), 'end': _iso(t[e - 1]),
+            'raw_points': e - s, 'points': int(len(keep)),
+            'polyline': encode_polyline(lat[keep], lng[keep]),
+        })
+        result['stats']['kept_points'] += int(len(keep))
+        # Per segmen: singgah tidak boleh menyeberangi jeda tanpa data
+        for a, b in stay_points(x[s:e], y[s:e], t[s:e], stay_radius, stay_seconds):
+            a, b = a + s, b + s
+            result['stay_points'].append({
+                'lat': round(float(np.mean(lat[a:b])), 6), 'lng': round(float(np.mean(lng[a:b])), 6),
+                'arrive': _iso(t[a]), 'leave': _iso(t[b - 1]),
+                'minutes': round(float(t[b - 1] - t[a]) / 60, 1), 'points': b - a,
+            })
+    return result
+
+
+def get_track(anggota_id, start, end, tolerance=None, gap_minutes=None, stay_radius=None, stay_minutes=None):
+    """Track siap peta untuk tanggal [start, end], dari cache kalau titiknya belum berubah."""
+    config = current_app.config
+    tolerance = float(tolerance if tolerance is not None else config.get('TRACK_TOLERANCE_METERS', 15))
+    gap_minutes = float(gap_minutes if gap_minutes is not None else config.get('TRACK_GAP_MINUTES', 30))
+    stay_radius = float(stay_radius if stay_radius is not None else config.get('TRACK_STAY_RADIUS_METERS', 50))
+    stay_minutes = float(stay_minutes if stay_minutes is not None else config.get('TRACK_STAY_MINUTES', 10))
+    cache_size = config.get('TRACK_CACHE_SIZE', 256)
+
+    key = (anggota_id, start, end, tolerance, gap_minutes, stay_radius, stay_minutes)
+    version = _version(anggota_id, start, end)
+    if cache_size > 0:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached and cached[0] == version:
+                _cache.move_to_end(key)
+                return dict(cached[1], cached=True)
+
+    t, lat, lng = load_points(anggota_id, start, end)
+    result = build_track(t, lat, lng, tolerance, gap_minutes * 60, stay_radius, stay_minutes * 60)
+    result['params'] = {'start': start.isoformat(), 'end': end.isoformat(), 'tolerance_m': tolerance,
+                        'gap_minutes': gap_minutes, 'stay_radius_m': stay_radius, 'stay_minutes': stay_minutes}
+    if cache_size > 0:
+        with _cache_lock:
+            _cache[key] = (version, result)
+            _cache.move_to_end(key)
+            while len(_cache) > cache_size:
+                _cache.popitem(last=False)
+    return dict(result, cached=False)